@@ -1,23 +1,51 @@
+import click
 from flask import Flask, render_template, jsonify, request
 from flask_cors import CORS
 from config import Config
 from database import db
 from sqlalchemy import text
-import jwt
-from auth_utils import decode_access_token
+from auth_utils import authenticate_request
+from attendance_counters import reconcile_enrollment_counters
+from attendance_report import REFRESH_LOCK_WAIT_SECONDS, refresh_all_once, start_refresh_scheduler
+from cgpa import recompute_cohort
+from cache import notify_write
+from pool_metrics import TimedQueuePool, install_pool_listeners
+from replicas import PRIMARY_UNTIL_HEADER, init_read_replicas
+from sql_metrics import init_sql_metrics
+from logging_setup import REQUEST_ID_HEADER, init_logging
+from json_provider import init_json_provider
 
 # Initialize Flask app
 app = Flask(__name__)
 app.config.from_object(Config)
+# Time connection checkouts for /api/admin/pool
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {**Config.SQLALCHEMY_ENGINE_OPTIONS, 'poolclass': TimedQueuePool}
+# Flask-SQLAlchemy only applies SQLALCHEMY_ENGINE_OPTIONS to the primary; give replica binds the same pool
+app.config['SQLALCHEMY_BINDS'] = {key: {'url': url, **app.config['SQLALCHEMY_ENGINE_OPTIONS']}
+                                  for key, url in Config.SQLALCHEMY_BINDS.items()}
+
+# Queue-backed logging with a request id on every record
+init_logging(app)
+
+# Serialize rows, Decimals and dates without the stdlib encoder's per-object fallbacks
+init_json_provider(app)
 
 # Enable CORS for all routes
-CORS(app)
+CORS(app, expose_headers=[PRIMARY_UNTIL_HEADER, 'Server-Timing', REQUEST_ID_HEADER])
 
 # Initialize database with app
 db.init_app(app)
+with app.app_context():
+    install_pool_listeners(db.engine)
+    # Each replica bind reports under its own name
+    for bind_key in app.config.get('SQLALCHEMY_BINDS') or {}:
+        install_pool_listeners(db.engines[bind_key], bind_key)
+
+# Count and time each request's SQL (before the auth hook, so rejected requests are timed too)
+init_sql_metrics(app)
 
 # Import routes
-from routes import auth, users, departments, students, faculty, courses, enrollments, attendance, grades
+from routes import auth, users, departments, students, faculty, courses, enrollments, attendance, grades, admin
 
 # Register blueprints
 app.register_blueprint(auth.bp)
@@ -29,6 +57,10 @@ app.register_blueprint(courses.bp)
 app.register_blueprint(enrollments.bp)
 app.register_blueprint(attendance.bp)
 app.register_blueprint(grades.bp)
+app.register_blueprint(admin.bp)
+
+# Keep the low-attendance summary table fresh in the background (from the first request on)
+start_refresh_scheduler(app)
 
 
 @app.before_request
@@ -50,27 +82,11 @@ def authenticate_api_requests():
     if path in public_routes or (path == '/api/users/' and request.method == 'POST'):
         return None
 
-    auth_header = request.headers.get('Authorization', '')
-    if not auth_header.startswith('Bearer '):
-        return jsonify({'error': 'Authorization token is missing'}), 401
+    return authenticate_request()
 
-    token = auth_header.split(' ', 1)[1].strip()
-    if not token:
-        return jsonify({'error': 'Authorization token is missing'}), 401
+# Send read-only requests to healthy replicas (registered after the auth hook, which sets request.user)
+init_read_replicas(app)
 
-    try:
-        payload = decode_access_token(token)
-    except jwt.ExpiredSignatureError:
-        return jsonify({'error': 'Token has expired'}), 401
-    except jwt.InvalidTokenError:
-        return jsonify({'error': 'Invalid token'}), 401
-
-    request.user = {
-        'user_id': payload.get('sub'),
-        'role': payload.get('role'),
-    }
-
-    return None
 
 @app.route('/')
 def index():
@@ -101,11 +117,42 @@ def not_found(error):
 
 @app.errorhandler(500)
 def internal_error(error):
+    # Flask has already logged the traceback through app.logger
     db.session.rollback()
-    print(f"ERROR 500: {str(error)}")  # Log the error
-    import traceback
-    traceback.print_exc()  # Print full traceback
     return jsonify({'error': 'Internal server error', 'details': str(error)}), 500
 
+def refresh_attendance_report():
+    # Same lock as the scheduled refresh, so the two never rebuild at once
+    if refresh_all_once(timeout=REFRESH_LOCK_WAIT_SECONDS):
+        print("Attendance report refreshed")
+    else:
+        raise click.ClickException("Another attendance report refresh is still running; try again later")
+
+@app.cli.command('reconcile-attendance')
+def reconcile_attendance_command():
+    """Rebuild enrollment attendance counters from the attendance table."""
+    updated = reconcile_enrollment_counters()
+    db.session.commit()
+    notify_write('enrollments')
+    print(f"Reconciled attendance counters for {updated} enrollments")
+    refresh_attendance_report()
+
+@app.cli.command('refresh-attendance-report')
+def refresh_attendance_report_command():
+    """Rebuild the low-attendance summary table."""
+    refresh_attendance_report()
+
+@app.cli.command('recompute-cgpa')
+@click.option('--department-id', type=int, help='Only students of this department.')
+@click.option('--batch', help='Only students of this batch, e.g. 2024-2028.')
+@click.option('--chunk-size', type=int, help='Students per chunk (CGPA_RECOMPUTE_CHUNK_SIZE).')
+@click.option('--workers', type=int, help='Parallel chunks (CGPA_RECOMPUTE_WORKERS).')
+def recompute_cgpa_command(department_id, batch, chunk_size, workers):
+    """Rebuild student CGPA sums from grades and course credits."""
+    count = recompute_cohort(app, department_id=department_id, batch=batch,
+                             chunk_size=chunk_size, workers=workers)
+    notify_write('students')
+    print(f"Recomputed CGPA for {count} students")
+
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,96 @@
+"""Keeps the enrollments attendance counters in step with attendance writes"""
+from collections import defaultdict
+
+from statements import sql
+
+from database import db
+
+# Counter column bumped for each attendance status (absent only counts as held)
+STATUS_COUNTERS = {
+    'present': 'attended',
+    'late': 'late',
+    'excused': 'excused',
+}
+
+
+def _delta(old_status, new_status):
+    """Return the (held, attended, late, excused) change for one attendance row."""
+    delta = {'held': 0, 'attended': 0, 'late': 0, 'excused': 0}
+    if old_status is not None:
+        delta['held'] -= 1
+        if old_status in STATUS_COUNTERS:
+            delta[STATUS_COUNTERS[old_status]] -= 1
+    if new_status is not None:
+        delta['held'] += 1
+        if new_status in STATUS_COUNTERS:
+            delta[STATUS_COUNTERS[new_status]] += 1
+    return delta['held'], delta['attended'], delta['late'], delta['excused']
+
+
+def apply_attendance_changes(course_id, changes):
+    """Update enrollment counters for a list of (student_id, old_status, new_status).
+
+    old_status is None for a new mark and new_status is None for a deleted
+    one. Students that end up with the same change share one UPDATE, so a
+    whole class session costs a handful of statements. Runs inside the
+    caller's transaction and does not commit; the low-attendance summary
+    is refreshed once the caller's notify_write('attendance') runs.
+    """
+    groups = defaultdict(list)
+    for student_id, old_status, new_status in changes:
+        delta = _delta(old_status, new_status)
+        if any(delta):
+            groups[delta].append(student_id)
+
+    # MySQL evaluates single-table SET assignments left to right, so the
+    # percentage below already sees the updated counters.
+    update_query = sql("""
+        UPDATE enrollments
+        SET classes_held = classes_held + :held,
+            classes_attended = classes_attended + :attended,
+            classes_late = classes_late + :late,
+            classes_excused = classes_excused + :excused,
+            attendance_percentage = CASE WHEN classes_held > 0
+                THEN ROUND(classes_attended * 100 / classes_held, 2)
+                ELSE 0 END
+        WHERE course_id = :course_id AND student_id IN :student_ids
+    """, 'student_ids')
+
+    for (held, attended, late, excused), student_ids in groups.items():
+        db.session.execute(update_query, {
+            'held': held,
+            'attended': attended,
+            'late': late,
+            'excused': excused,
+            'course_id': course_id,
+            'student_ids': student_ids
+        })
+
+
+def reconcile_enrollment_counters():
+    """Rebuild every enrollment's counters from the attendance table.
+
+    Returns the number of enrollment rows changed. Does not commit.
+    """
+    reconcile_query = sql("""
+        UPDATE enrollments e
+        LEFT JOIN (
+            SELECT
+                student_id,
+                course_id,
+                COUNT(*) as held,
+                SUM(CASE WHEN status = 'present' THEN 1 ELSE 0 END) as attended,
+                SUM(CASE WHEN status = 'late' THEN 1 ELSE 0 END) as late,
+                SUM(CASE WHEN status = 'excused' THEN 1 ELSE 0 END) as excused
+            FROM attendance
+            GROUP BY student_id, course_id
+        ) a ON a.student_id = e.student_id AND a.course_id = e.course_id
+        SET e.classes_held = COALESCE(a.held, 0),
+            e.classes_attended = COALESCE(a.attended, 0),
+            e.classes_late = COALESCE(a.late, 0),
+            e.classes_excused = COALESCE(a.excused, 0),
+            e.attendance_percentage = CASE WHEN a.held > 0
+                THEN ROUND(a.attended * 100 / a.held, 2)
+                ELSE 0 END
+    """)
+    return db.session.execute(reconcile_query).rowcount
@@ -0,0 +1,188 @@
+"""Precomputed per-student attendance averages behind the low-attendance report"""
+import logging
+import threading
+import time
+
+from statements import sql
+
+from cache import on_write
+from config import Config
+from database import db
+
+logger = logging.getLogger(__name__)
+
+REFRESH_LOCK_NAME = 'student_attendance_summary_refresh'
+# How long the CLI commands wait for a scheduled refresh to finish
+REFRESH_LOCK_WAIT_SECONDS = 60
+
+SUMMARY_TABLE = 'student_attendance_summary'
+STAGING_TABLE = 'student_attendance_summary_next'
+RETIRED_TABLE = 'student_attendance_summary_old'
+
+SUMMARY_SELECT = """
+    SELECT
+        s.student_id,
+        s.department_id,
+        AVG(e.attendance_percentage) as avg_attendance,
+        COUNT(*) as total_courses,
+        NOW() as refreshed_at
+    FROM students s
+    INNER JOIN enrollments e ON s.student_id = e.student_id
+    WHERE s.status = 'active' {student_filter}
+    GROUP BY s.student_id, s.department_id
+"""
+
+
+def refresh_students(student_ids, executor=None):
+    """Recompute the summary rows of the given students on `executor`. Does not commit."""
+    executor = executor or db.session
+    student_ids = list(set(student_ids))
+    if not student_ids:
+        return
+
+    delete_query = sql(f"""
+        DELETE FROM {SUMMARY_TABLE} WHERE student_id IN :student_ids
+    """, 'student_ids')
+    insert_query = sql(f"""
+        INSERT INTO {SUMMARY_TABLE}
+        (student_id, department_id, avg_attendance, total_courses, refreshed_at)
+        {SUMMARY_SELECT.format(student_filter='AND s.student_id IN :student_ids')}
+    """, 'student_ids')
+
+    executor.execute(delete_query, {'student_ids': student_ids})
+    executor.execute(insert_query, {'student_ids': student_ids})
+
+
+def refresh_committed(student_ids):
+    """Refresh the summary rows of students whose writes have just been committed.
+
+    Runs in its own short READ COMMITTED transaction, where the INSERT ...
+    SELECT is a non-locking read of enrollments. Inside the write's own
+    REPEATABLE READ transaction it would take shared locks on the student's
+    enrollments in every course, and two bulk marks of courses sharing
+    students would deadlock. A failed refresh is logged; the next scheduled
+    rebuild repairs the row.
+    """
+    student_ids = sorted(set(student_ids))
+    if not student_ids:
+        return
+    try:
+        with db.engine.connect() as conn:
+            conn.execution_options(isolation_level='READ COMMITTED')
+            refresh_students(student_ids, conn)
+            conn.commit()
+    except Exception:
+        logger.exception('Attendance summary refresh failed for %d students', len(student_ids))
+
+
+@on_write('attendance', 'enrollments')
+def _refresh_written_students(table, student_id=None, student_ids=(), **keys):
+    refresh_committed([student_id, *student_ids] if student_id is not None else student_ids)
+
+
+def refresh_all(conn):
+    """Rebuild the whole summary table in the staging table and swap it in. Commits on `conn`.
+
+    The source rows are read under READ COMMITTED, so the INSERT ... SELECT
+    is a non-locking read of enrollments and students, and the live table
+    is only touched by the atomic RENAME TABLE: attendance and enrollment
+    writes never wait on a rebuild. After the swap, every student whose row
+    differs between the new table and the retired one (which writers kept
+    refreshing during the rebuild, including removing rows) is refreshed
+    again on the new one.
+    """
+    conn.execution_options(isolation_level='READ COMMITTED')
+    conn.execute(sql(f"CREATE TABLE IF NOT EXISTS {STAGING_TABLE} LIKE {SUMMARY_TABLE}"))
+    conn.execute(sql(f"TRUNCATE TABLE {STAGING_TABLE}"))
+    conn.execute(sql(f"""
+        INSERT INTO {STAGING_TABLE}
+        (student_id, department_id, avg_attendance, total_courses, refreshed_at)
+        {SUMMARY_SELECT.format(student_filter='')}
+    """))
+    conn.commit()
+
+    conn.execute(sql(f"""
+        RENAME TABLE {SUMMARY_TABLE} TO {RETIRED_TABLE},
+                     {STAGING_TABLE} TO {SUMMARY_TABLE},
+                     {RETIRED_TABLE} TO {STAGING_TABLE}
+    """))
+    # The retired copy now holds what writers refreshed during the rebuild; <=> is NULL-safe equality
+    changed_query = sql(f"""
+        SELECT n.student_id
+        FROM {SUMMARY_TABLE} n
+        LEFT JOIN {STAGING_TABLE} o ON o.student_id = n.student_id
+        WHERE NOT (o.department_id <=> n.department_id
+                   AND o.avg_attendance <=> n.avg_attendance
+                   AND o.total_courses <=> n.total_courses)
+        UNION
+        SELECT o.student_id
+        FROM {STAGING_TABLE} o
+        LEFT JOIN {SUMMARY_TABLE} n ON n.student_id = o.student_id
+        WHERE n.student_id IS NULL
+    """)
+    changed = [row.student_id for row in conn.execute(changed_query)]
+    refresh_students(changed, conn)
+    conn.commit()
+
+
+def refresh_all_once(timeout=0, max_age=None):
+    """Run one full refresh unless another process keeps the refresh lock for over `timeout` seconds.
+
+    With `max_age`, the rebuild is also skipped when the last one (the
+    oldest refreshed_at in the live table) is less than `max_age` seconds
+    old, so workers that each run the scheduler rebuild once per interval
+    between them. Returns whether a rebuild ran.
+    """
+    with db.engine.connect() as conn:
+        locked = conn.execute(
+            sql("SELECT GET_LOCK(:name, :timeout)"), {'name': REFRESH_LOCK_NAME, 'timeout': timeout}
+        ).scalar()
+        conn.rollback()
+        if not locked:
+            return False
+        try:
+            if max_age is not None and conn.execute(sql(f"""
+                SELECT MIN(refreshed_at) > NOW() - INTERVAL :max_age SECOND FROM {SUMMARY_TABLE}
+            """), {'max_age': max_age}).scalar():
+                return False
+            refresh_all(conn)
+        finally:
+            conn.rollback()
+            conn.execute(sql("SELECT RELEASE_LOCK(:name)"), {'name': REFRESH_LOCK_NAME})
+            conn.commit()
+    return True
+
+
+def start_refresh_scheduler(app):
+    """Refresh the summary table every ATTENDANCE_REPORT_REFRESH_SECONDS in a daemon thread.
+
+    The thread starts with the first request the app serves, so `flask`
+    CLI commands and helper processes that import the app never run it.
+    Every worker process runs one; a worker skips its turn when another
+    has rebuilt the table within the interval.
+    """
+    interval = Config.ATTENDANCE_REPORT_REFRESH_SECONDS
+    if interval <= 0:
+        return
+
+    lock = threading.Lock()
+    started = False
+
+    def run():
+        while True:
+            with app.app_context():
+                try:
+                    refresh_all_once(max_age=interval)
+                except Exception:
+                    logger.exception('Attendance report refresh failed')
+            time.sleep(interval)
+
+    @app.before_request
+    def start_scheduler():
+        nonlocal started
+        if started:
+            return
+        with lock:
+            if not started:
+                threading.Thread(target=run, name='attendance-report-refresh', daemon=True).start()
+                started = True
@@ -1,9 +1,17 @@
 import datetime
+import hashlib
+import threading
+import time
+from collections import OrderedDict
 from functools import wraps
 
 import jwt
 from flask import current_app, jsonify, request
 
+# Recently verified tokens: sha256(token) -> decoded payload, least recently used first
+_verified_tokens = OrderedDict()
+_verified_tokens_lock = threading.Lock()
+
 
 def generate_access_token(user_id, role, expires_in_seconds):
     """Generate JWT access token."""
@@ -22,31 +30,73 @@ def decode_access_token(token):
     return jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=['HS256'])
 
 
+def verify_access_token(token):
+    """Decode a token, reusing the payload of a recent verification of the same token.
+
+    Cached payloads are dropped once their `exp` has passed, so an expired
+    token is always re-checked and rejected by jwt.decode.
+    """
+    digest = hashlib.sha256(token.encode()).digest()
+    now = time.time()
+
+    with _verified_tokens_lock:
+        payload = _verified_tokens.get(digest)
+        if payload is not None:
+            if payload['exp'] > now:
+                _verified_tokens.move_to_end(digest)
+                return payload
+            del _verified_tokens[digest]
+
+    payload = decode_access_token(token)
+
+    max_size = current_app.config.get('TOKEN_CACHE_SIZE', 0)
+    if max_size > 0 and 'exp' in payload:
+        with _verified_tokens_lock:
+            _verified_tokens[digest] = payload
+            while len(_verified_tokens) > max_size:
+                _verified_tokens.popitem(last=False)
+    return payload
+
+
+def authenticate_request():
+    """Verify the bearer token once per request and store its claims on request.user.
+
+    Returns None on success or an error response tuple to send back.
+    """
+    if getattr(request, 'user', None) is not None:
+        return None
+
+    auth_header = request.headers.get('Authorization', '')
+    if not auth_header.startswith('Bearer '):
+        return jsonify({'error': 'Authorization token is missing'}), 401
+
+    token = auth_header.split(' ', 1)[1].strip()
+    if not token:
+        return jsonify({'error': 'Authorization token is missing'}), 401
+
+    try:
+        payload = verify_access_token(token)
+    except jwt.ExpiredSignatureError:
+        return jsonify({'error': 'Token has expired'}), 401
+    except jwt.InvalidTokenError:
+        return jsonify({'error': 'Invalid token'}), 401
+
+    request.user = {
+        'user_id': payload.get('sub'),
+        'role': payload.get('role'),
+    }
+    return None
+
+
 def token_required(allowed_roles=None):
     """Decorator to protect routes with bearer token auth."""
 
     def decorator(view_func):
         @wraps(view_func)
         def wrapper(*args, **kwargs):
-            auth_header = request.headers.get('Authorization', '')
-            if not auth_header.startswith('Bearer '):
-                return jsonify({'error': 'Authorization token is missing'}), 401
-
-            token = auth_header.split(' ', 1)[1].strip()
-            if not token:
-                return jsonify({'error': 'Authorization token is missing'}), 401
-
-            try:
-                payload = decode_access_token(token)
-            except jwt.ExpiredSignatureError:
-                return jsonify({'error': 'Token has expired'}), 401
-            except jwt.InvalidTokenError:
-                return jsonify({'error': 'Invalid token'}), 401
-
-            request.user = {
-                'user_id': payload.get('sub'),
-                'role': payload.get('role'),
-            }
+            error = authenticate_request()
+            if error is not None:
+                return error
 
             if allowed_roles and request.user['role'] not in allowed_roles:
                 return jsonify({'error': 'Forbidden: insufficient permissions'}), 403
@@ -0,0 +1,83 @@
+"""Per-request cost of bearer token checks on a decorated /api/ view.
+
+A minimal Flask app runs the same hooks as app.py (the before_request
+authenticate_request() plus a token_required view), so the numbers are
+the auth overhead alone. Compared:
+
+  none          no auth at all (baseline)
+  decode twice  the old path, jwt.decode in the hook and again in the decorator
+  once          one verification per request, verified-token cache off
+  once+cache    one verification per request, served from the verified-token LRU
+
+    python bench/auth_overhead.py --requests 20000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask, jsonify, request  # noqa: E402
+
+import auth_utils  # noqa: E402
+from auth_utils import authenticate_request, decode_access_token, generate_access_token, token_required  # noqa: E402
+
+
+def build_app(mode, cache_size):
+    app = Flask(__name__)
+    app.config['SECRET_KEY'] = 'bench-secret'
+    app.config['TOKEN_CACHE_SIZE'] = cache_size
+
+    if mode == 'decode twice':
+        def old_hook():
+            token = request.headers['Authorization'].split(' ', 1)[1]
+            decode_access_token(token)
+
+        def old_required(view):
+            def wrapper():
+                token = request.headers['Authorization'].split(' ', 1)[1]
+                request.user = decode_access_token(token)
+                return view()
+            return wrapper
+
+        app.before_request(old_hook)
+        app.add_url_rule('/api/me', 'me', old_required(lambda: jsonify({'ok': True})))
+    elif mode == 'none':
+        app.add_url_rule('/api/me', 'me', lambda: jsonify({'ok': True}))
+    else:
+        app.before_request(authenticate_request)
+        app.add_url_rule('/api/me', 'me', token_required(['admin'])(lambda: jsonify({'ok': True})))
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--requests', type=int, default=20000)
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    modes = (('none', 0), ('decode twice', 0), ('once', 0), ('once+cache', 4096))
+    print(f'{args.requests} requests, best of {args.repeats}')
+    baseline = None
+    for mode, cache_size in modes:
+        app = build_app(mode, cache_size)
+        with app.app_context():
+            headers = {'Authorization': f'Bearer {generate_access_token(1, "admin", expires_in_seconds=3600)}'}
+        client = app.test_client()
+        auth_utils._verified_tokens.clear()
+        best = None
+        for _ in range(args.repeats):
+            started = time.perf_counter()
+            for _ in range(args.requests):
+                client.get('/api/me', headers=headers)
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        per_request = best / args.requests * 1e6
+        if baseline is None:
+            baseline = per_request
+        print(f'{mode:<14} {per_request:8.1f} us/request  auth overhead {per_request - baseline:7.1f} us')
+
+
+if __name__ == '__main__':
+    main()
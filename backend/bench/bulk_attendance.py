@@ -0,0 +1,85 @@
+"""Marking a class session: one POST /api/attendance/ per student against one POST /api/attendance/bulk.
+
+Runs against a running server. The course's roster (up to --students
+enrolled students) is marked --sessions times each way, each session on
+a new date counting back from --start-date, so every mark is a fresh
+insert. Use a scratch database: the marks are left in place.
+
+    python bench/bulk_attendance.py --url http://localhost:5000 --token <admin jwt> \
+        --course-id 1 --marked-by 1 --students 120
+"""
+import argparse
+import datetime
+import json
+import time
+import urllib.request
+
+
+def call(args, method, path, body=None):
+    request = urllib.request.Request(
+        args.url.rstrip('/') + path,
+        data=json.dumps(body).encode() if body is not None else None,
+        method=method,
+        headers={'Authorization': f'Bearer {args.token}', 'Content-Type': 'application/json'},
+    )
+    with urllib.request.urlopen(request, timeout=120) as response:
+        return json.loads(response.read())
+
+
+def roster(args):
+    student_ids, page = [], 1
+    while len(student_ids) < args.students:
+        body = call(args, 'GET', f'/api/enrollments/?course_id={args.course_id}'
+                                 f'&per_page=1000&page={page}&include_total=false')
+        student_ids += [row['student_id'] for row in body['enrollments']]
+        if not body['has_more']:
+            break
+        page += 1
+    return student_ids[:args.students]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--url', default='http://localhost:5000')
+    parser.add_argument('--token', required=True, help='Bearer token (admin or the course faculty)')
+    parser.add_argument('--course-id', type=int, required=True)
+    parser.add_argument('--marked-by', type=int, required=True, help='faculty_id recorded on the marks')
+    parser.add_argument('--students', type=int, default=120)
+    parser.add_argument('--sessions', type=int, default=5)
+    parser.add_argument('--start-date', default='2030-12-31', help='Latest date used; earlier days follow')
+    args = parser.parse_args()
+
+    student_ids = roster(args)
+    print(f'course {args.course_id}: {len(student_ids)} students, {args.sessions} sessions each way')
+    dates = iter(datetime.date.fromisoformat(args.start_date) - datetime.timedelta(days=n) for n in range(10000))
+
+    per_row = []
+    for _ in range(args.sessions):
+        date = next(dates).isoformat()
+        started = time.perf_counter()
+        for student_id in student_ids:
+            call(args, 'POST', '/api/attendance/', {
+                'student_id': student_id, 'course_id': args.course_id, 'attendance_date': date,
+                'status': 'present', 'marked_by': args.marked_by,
+            })
+        per_row.append(time.perf_counter() - started)
+
+    bulk = []
+    for _ in range(args.sessions):
+        date = next(dates).isoformat()
+        started = time.perf_counter()
+        result = call(args, 'POST', '/api/attendance/bulk', {
+            'course_id': args.course_id, 'attendance_date': date, 'marked_by': args.marked_by,
+            'records': [{'student_id': student_id, 'status': 'present'} for student_id in student_ids],
+        })
+        bulk.append(time.perf_counter() - started)
+        if result['failed']:
+            print(f'bulk session {date}: {result["failed"]} rows failed')
+
+    for label, timings in (('per-row POST', per_row), ('bulk POST', bulk)):
+        median = sorted(timings)[len(timings) // 2]
+        print(f'{label:<14} {median * 1000:9.1f} ms per session  {len(student_ids) / median:9.0f} marks/s')
+
+
+if __name__ == '__main__':
+    main()
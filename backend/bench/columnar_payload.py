@@ -0,0 +1,89 @@
+"""Body size and encode time of a list page in each negotiated format.
+
+--rows enrollments-shaped Rows (ids, enrollment number, student and
+course names, a status and a date) are fetched from an in-memory sqlite
+database, then passed through columnar.list_response() exactly as the
+routes do, once per format. Gzipped sizes are shown too, since most
+deployments compress responses.
+
+    python bench/columnar_payload.py --rows 1000
+"""
+import argparse
+import gzip
+import os
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask  # noqa: E402
+from sqlalchemy import Date, column, create_engine, text  # noqa: E402
+
+from columnar import list_response, msgpack  # noqa: E402
+from json_provider import init_json_provider  # noqa: E402
+
+FORMATS = (
+    ('json', ''),
+    ('columnar', '?format=columnar'),
+    ('columnar + dictionary', '?format=columnar&dictionary=true'),
+    ('msgpack', '?format=msgpack'),
+    ('msgpack + dictionary', '?format=msgpack&dictionary=true'),
+)
+
+
+def fetch_rows(count, courses=40):
+    engine = create_engine('sqlite://')
+    with engine.connect() as connection:
+        connection.execute(text("""
+            CREATE TABLE enrollments (student_id INTEGER, course_id INTEGER, enrollment_number TEXT,
+                                      student_first_name TEXT, student_last_name TEXT, course_code TEXT,
+                                      course_name TEXT, status TEXT, enrollment_date DATE)
+        """))
+        connection.execute(text('INSERT INTO enrollments VALUES (:s, :c, :n, :f, :l, :code, :name, :status, :d)'), [
+            {'s': n, 'c': n % courses, 'n': f'EN{n:08d}', 'f': f'First{n % 500}', 'l': f'Last{n}',
+             'code': f'CS{n % courses:03d}', 'name': f'Course number {n % courses}',
+             'status': ('enrolled', 'completed', 'dropped')[n % 3],
+             'd': (date(2024, 8, 1) + timedelta(days=n % 30)).isoformat()}
+            for n in range(count)
+        ])
+        statement = text('SELECT * FROM enrollments').columns(
+            *(column(name) for name in ('student_id', 'course_id', 'enrollment_number', 'student_first_name',
+                                        'student_last_name', 'course_code', 'course_name', 'status')),
+            column('enrollment_date', Date),
+        )
+        rows = connection.execute(statement).fetchall()
+    engine.dispose()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--rows', type=int, default=1000)
+    parser.add_argument('--repeats', type=int, default=50)
+    args = parser.parse_args()
+
+    rows = fetch_rows(args.rows)
+    app = Flask(__name__)
+    init_json_provider(app)
+    body = {'enrollments': rows, 'page': 1, 'per_page': args.rows, 'has_more': True}
+
+    print(f'{args.rows}-row enrollments page, {type(app.json).__name__}, median of {args.repeats}')
+    print(f'{"format":<22} {"bytes":>9} {"gzipped":>9} {"encode ms":>10}')
+    for name, query in FORMATS:
+        if name.startswith('msgpack') and msgpack is None:
+            print(f'{name:<22} skipped: msgpack is not installed')
+            continue
+        timings = []
+        with app.test_request_context('/api/enrollments/' + query):
+            for _ in range(args.repeats):
+                started = time.perf_counter()
+                response, _ = list_response(body, 'enrollments')
+                data = response.get_data()
+                timings.append(time.perf_counter() - started)
+        median = sorted(timings)[len(timings) // 2]
+        print(f'{name:<22} {len(data):9d} {len(gzip.compress(data)):9d} {median * 1000:10.2f}')
+
+
+if __name__ == '__main__':
+    main()
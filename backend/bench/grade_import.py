@@ -0,0 +1,126 @@
+"""10k-row grade import: the vectorized batch path against one request per grade.
+
+Without --url only the grade arithmetic is compared in process:
+compute_grades (one NumPy searchsorted over the boundaries) against the
+per-row letter ladder create_grade runs. With --url the rows also go to a
+running server, once as a single POST /api/grades/import and then as one
+PUT /api/grades/<student_id>/<course_id> per row. The course needs --rows
+enrolled students, and both runs overwrite its grades, so use a scratch
+database.
+
+    python bench/grade_import.py
+    python bench/grade_import.py --url http://localhost:5000 --token <admin jwt> --course-id 1
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import grading  # noqa: E402
+from grading import calculate_letter_grade, compute_grades  # noqa: E402
+
+
+def per_row(marks):
+    """What create_grade does for one grade, repeated for every row."""
+    results = []
+    for internal1, internal2, external in marks:
+        internal_average = (internal1 + internal2) / 2
+        total_marks = internal_average + external
+        percentage = total_marks if total_marks > 0 else 0
+        results.append((total_marks, percentage, calculate_letter_grade(percentage) if total_marks > 0 else None))
+    return results
+
+
+def best_of(repeats, fn, *args):
+    best = None
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn(*args)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def compare_arithmetic(marks, repeats):
+    print(f'{len(marks)} rows, best of {repeats}')
+    print(f'{"per-row ladder":<24} {best_of(repeats, per_row, marks) * 1000:8.2f} ms')
+    if grading.np is not None:
+        print(f'{"compute_grades (numpy)":<24} {best_of(repeats, compute_grades, marks) * 1000:8.2f} ms')
+    numpy, grading.np = grading.np, None
+    try:
+        print(f'{"compute_grades (bisect)":<24} {best_of(repeats, compute_grades, marks) * 1000:8.2f} ms')
+    finally:
+        grading.np = numpy
+
+
+def call(args, method, path, body=None):
+    request = urllib.request.Request(
+        args.url.rstrip('/') + path,
+        data=json.dumps(body).encode() if body is not None else None,
+        method=method,
+        headers={'Authorization': f'Bearer {args.token}', 'Content-Type': 'application/json'},
+    )
+    with urllib.request.urlopen(request, timeout=600) as response:
+        return json.loads(response.read())
+
+
+def roster(args):
+    student_ids, page = [], 1
+    while len(student_ids) < args.rows:
+        body = call(args, 'GET', f'/api/enrollments/?course_id={args.course_id}'
+                                 f'&per_page=1000&page={page}&include_total=false')
+        student_ids += [row['student_id'] for row in body['enrollments']]
+        if not body['has_more']:
+            break
+        page += 1
+    return student_ids[:args.rows]
+
+
+def compare_server(args, marks):
+    student_ids = roster(args)
+    if len(student_ids) < len(marks):
+        print(f'course {args.course_id} has only {len(student_ids)} enrolled students; using that many rows')
+    records = [
+        {'student_id': student_id, 'internal1_marks': i1, 'internal2_marks': i2, 'external_marks': ex}
+        for student_id, (i1, i2, ex) in zip(student_ids, marks)
+    ]
+
+    started = time.perf_counter()
+    result = call(args, 'POST', '/api/grades/import', {'course_id': args.course_id, 'records': records})
+    batch = time.perf_counter() - started
+    print(f'{"POST /api/grades/import":<28} {batch:8.2f} s  '
+          f'({result["created"]} created, {result["updated"]} updated, {result["failed"]} failed)')
+
+    started = time.perf_counter()
+    for record in records:
+        call(args, 'PUT', f'/api/grades/{record["student_id"]}/{args.course_id}', record)
+    single = time.perf_counter() - started
+    print(f'{"PUT per grade":<28} {single:8.2f} s  ({len(records) / single:.0f} grades/s)')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--url', help='Running server to import into as well')
+    parser.add_argument('--token', help='Bearer token for --url (admin, or the course faculty)')
+    parser.add_argument('--course-id', type=int, help='Course to import into with --url')
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    marks = [(round(rng.uniform(0, 50), 2), round(rng.uniform(0, 50), 2), round(rng.uniform(0, 50), 2))
+             for _ in range(args.rows)]
+    compare_arithmetic(marks, args.repeats)
+    if args.url:
+        if not args.token or args.course_id is None:
+            parser.error('--url needs --token and --course-id')
+        compare_server(args, marks)
+
+
+if __name__ == '__main__':
+    main()
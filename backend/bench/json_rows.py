@@ -0,0 +1,93 @@
+"""Encoding a large listing response: dict per row with the stdlib encoder, Rows with the stdlib encoder, and orjson.
+
+--rows result rows shaped like a grades listing (ints, strings, a
+Decimal, a date and a datetime) are fetched once from an in-memory sqlite
+database as real SQLAlchemy Row objects, then encoded into a response
+body three ways:
+
+  dict + stdlib   [dict(row._mapping) ...] through Flask's default provider (the old path)
+  rows + stdlib   the Rows as-is through RowJSONProvider (FAST_JSON=false)
+  rows + orjson   the Rows as-is through OrjsonProvider (the default when orjson is installed)
+
+    python bench/json_rows.py --rows 100000
+"""
+import argparse
+import os
+import sys
+import time
+import warnings
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask  # noqa: E402
+from flask.json.provider import DefaultJSONProvider  # noqa: E402
+from sqlalchemy import Date, DateTime, Numeric, column, create_engine, text  # noqa: E402
+
+from json_provider import OrjsonProvider, RowJSONProvider, orjson  # noqa: E402
+
+
+def fetch_rows(count):
+    engine = create_engine('sqlite://')
+    start = datetime(2024, 9, 2, 9, 0)
+    with engine.connect() as connection:
+        connection.execute(text("""
+            CREATE TABLE grades (student_id INTEGER, course_id INTEGER, enrollment_number TEXT,
+                                 letter_grade TEXT, total_marks NUMERIC(5, 2), graded_on DATE, updated_at DATETIME)
+        """))
+        connection.execute(text('INSERT INTO grades VALUES (:s, :c, :n, :l, :t, :d, :u)'), [
+            {'s': n, 'c': n % 200, 'n': f'EN{n:08d}', 'l': 'ABCDF'[n % 5], 't': f'{n % 10000 / 100:.2f}',
+             'd': (start + timedelta(days=n % 90)).date().isoformat(),
+             'u': (start + timedelta(seconds=n * 37)).isoformat(sep=' ')}
+            for n in range(count)
+        ])
+        statement = text('SELECT * FROM grades').columns(
+            column('student_id'), column('course_id'), column('enrollment_number'), column('letter_grade'),
+            column('total_marks', Numeric(5, 2)), column('graded_on', Date), column('updated_at', DateTime),
+        )
+        with warnings.catch_warnings():
+            # sqlite has no native Decimal; the values still come back as Decimal
+            warnings.simplefilter('ignore')
+            rows = connection.execute(statement).fetchall()
+    engine.dispose()
+    return rows
+
+
+def best_seconds(repeats, fn):
+    best = None
+    for _ in range(repeats):
+        started = time.perf_counter()
+        body = fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, len(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    rows = fetch_rows(args.rows)
+    app = Flask(__name__)
+    default, row_provider = DefaultJSONProvider(app), RowJSONProvider(app)
+    modes = [
+        ('dict + stdlib', lambda: default.response({'grades': [dict(row._mapping) for row in rows]}).get_data()),
+        ('rows + stdlib', lambda: row_provider.response({'grades': rows}).get_data()),
+    ]
+    if orjson is not None:
+        fast = OrjsonProvider(app)
+        modes.append(('rows + orjson', lambda: fast.response({'grades': rows}).get_data()))
+    else:
+        print('orjson is not installed; skipping the orjson provider')
+
+    print(f'{args.rows} rows, best of {args.repeats}')
+    with app.app_context():
+        for mode, encode in modes:
+            seconds, size = best_seconds(args.repeats, encode)
+            print(f'{mode:<14} {seconds * 1000:8.0f} ms  {args.rows / seconds:10.0f} rows/s  {size / 1e6:6.1f} MB')
+
+
+if __name__ == '__main__':
+    main()
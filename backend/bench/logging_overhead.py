@@ -0,0 +1,128 @@
+"""Time spent on the request thread per log line: print, a direct StreamHandler and the queue pipeline.
+
+--threads workers each write --lines lines, as concurrent requests would,
+to --output (default a temporary file; pass /dev/stderr to include a
+terminal). --write-delay-ms makes every write block for that long, like a
+full pipe or a slow log shipper. Compared:
+
+  print          print(..., flush=True), the old debugging output
+  stream         logging with a StreamHandler on the calling thread
+  queue          logging_setup's QueueHandler, written by the listener thread
+  debug off      logger.debug() below LOG_LEVEL, the cost of leaving calls in
+
+Per-line time is wall time on the workers only: the queue mode's listener
+keeps writing afterwards, and that is timed separately as the drain.
+
+    python bench/logging_overhead.py --threads 8 --lines 20000
+    python bench/logging_overhead.py --lines 200 --write-delay-ms 1
+"""
+import argparse
+import logging
+import os
+import queue
+import sys
+import tempfile
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from logging_setup import RequestIdFilter  # noqa: E402
+
+FORMAT = '%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s'
+
+
+class SlowStream:
+    """File wrapper whose writes block for `delay` seconds, like a backed-up pipe."""
+
+    def __init__(self, stream, delay):
+        self.stream = stream
+        self.delay = delay
+
+    def write(self, text):
+        time.sleep(self.delay)
+        return self.stream.write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+    def close(self):
+        self.stream.close()
+
+
+def run_workers(threads, lines, emit):
+    barrier = threading.Barrier(threads + 1)
+
+    def worker(n):
+        barrier.wait()
+        for i in range(lines):
+            emit(n, i)
+
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for thread in workers:
+        thread.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for thread in workers:
+        thread.join()
+    return time.perf_counter() - started
+
+
+def fresh_logger(handler):
+    logger = logging.getLogger('bench.logging_overhead')
+    logger.handlers = [handler]
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    handler.addFilter(RequestIdFilter())
+    return logger
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--lines', type=int, default=20000, help='Lines per thread')
+    parser.add_argument('--output', help='Defaults to a temporary file')
+    parser.add_argument('--write-delay-ms', type=float, default=0)
+    args = parser.parse_args()
+
+    path = args.output or os.path.join(tempfile.mkdtemp(), 'bench.log')
+    stream = open(path, 'a', buffering=1)
+    if args.write_delay_ms:
+        stream = SlowStream(stream, args.write_delay_ms / 1000)
+    total = args.threads * args.lines
+    message = 'GET /api/grades/ student_id=%s course_id=%s'
+    results = []
+
+    def report(mode, elapsed, drain=None):
+        line = f'{mode:<10} {elapsed / total * 1e6:8.2f} us/line on the workers'
+        if drain is not None:
+            line += f'  (listener drained {drain * 1000:.0f} ms later)'
+        results.append(line)
+
+    report('print', run_workers(args.threads, args.lines,
+                                lambda n, i: print(message % (n, i), file=stream, flush=True)))
+
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(logging.Formatter(FORMAT))
+    logger = fresh_logger(handler)
+    report('stream', run_workers(args.threads, args.lines, lambda n, i: logger.info(message, n, i)))
+
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, handler)
+    listener.start()
+    logger = fresh_logger(QueueHandler(log_queue))
+    elapsed = run_workers(args.threads, args.lines, lambda n, i: logger.info(message, n, i))
+    started = time.perf_counter()
+    listener.stop()
+    report('queue', elapsed, time.perf_counter() - started)
+
+    report('debug off', run_workers(args.threads, args.lines, lambda n, i: logger.debug(message, n, i)))
+
+    stream.close()
+    print(f'{args.threads} threads x {args.lines} lines -> {path}, write delay {args.write_delay_ms} ms')
+    print('\n'.join(results))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""Login storm against a running API: many concurrent logins, with health probes alongside.
+
+Reports login throughput, latency percentiles and status codes, and the
+latency of /api/health while the storm runs, which shows whether password
+hashing is starving other requests (compare PASSWORD_HASH_WORKERS=0 with
+a process pool).
+
+    python bench/login_storm.py --url http://localhost:5000 \
+        --email student@university.edu --password secret --role student \
+        --concurrency 100 --requests 2000
+"""
+import argparse
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def timed_request(url, body=None):
+    """Return (status, seconds) for one request."""
+    data = json.dumps(body).encode() if body is not None else None
+    request = urllib.request.Request(url, data=data, headers={'Content-Type': 'application/json'})
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=60) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except OSError:
+        status = 'error'
+    return status, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--url', default='http://localhost:5000')
+    parser.add_argument('--email', required=True)
+    parser.add_argument('--password', required=True)
+    parser.add_argument('--role', default='student')
+    parser.add_argument('--concurrency', type=int, default=100)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--probe-interval', type=float, default=0.05, help='Seconds between health probes')
+    args = parser.parse_args()
+
+    login_url = args.url.rstrip('/') + '/api/auth/login'
+    health_url = args.url.rstrip('/') + '/api/health'
+    body = {'email': args.email, 'password': args.password, 'role': args.role}
+
+    probes = []
+    storming = threading.Event()
+    storming.set()
+
+    def probe():
+        while storming.is_set():
+            probes.append(timed_request(health_url)[1])
+            time.sleep(args.probe_interval)
+
+    prober = threading.Thread(target=probe, daemon=True)
+    prober.start()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(lambda _: timed_request(login_url, body), range(args.requests)))
+    elapsed = time.perf_counter() - started
+    storming.clear()
+    prober.join()
+
+    latencies = [seconds for _, seconds in results]
+    statuses = Counter(status for status, _ in results)
+    print(f'{args.requests} logins, {args.concurrency} concurrent, {elapsed:.2f} s '
+          f'({args.requests / elapsed:.1f} logins/s)')
+    print(f'login latency ms: p50 {percentile(latencies, 0.5) * 1000:.0f}  '
+          f'p95 {percentile(latencies, 0.95) * 1000:.0f}  p99 {percentile(latencies, 0.99) * 1000:.0f}')
+    print('status codes:', dict(sorted(statuses.items(), key=str)))
+    print(f'health latency ms during storm ({len(probes)} probes): p50 {percentile(probes, 0.5) * 1000:.0f}  '
+          f'p95 {percentile(probes, 0.95) * 1000:.0f}  max {max(probes, default=0) * 1000:.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""100 simultaneous identical requests to an aggregate endpoint, with and without single_flight.
+
+By default the endpoint is simulated in process: each run holds one of
+--pool-size "connections" for --query-ms, like a heavy GROUP BY holding a
+pooled MySQL connection. With --url the callers hit a running server
+instead (e.g. /api/grades/statistics/distribution with an admin token),
+which shows the server as configured.
+
+    python bench/single_flight.py
+    python bench/single_flight.py --url http://localhost:5000/api/grades/statistics/distribution --token <jwt>
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask, jsonify  # noqa: E402
+
+from singleflight import single_flight  # noqa: E402
+
+
+def simultaneous(count, call):
+    """Run `call` from `count` threads released together; return (wall seconds, per-call seconds)."""
+    barrier = threading.Barrier(count + 1)
+    latencies = [0.0] * count
+
+    def worker(i):
+        barrier.wait()
+        started = time.perf_counter()
+        call()
+        latencies[i] = time.perf_counter() - started
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - started, sorted(latencies)
+
+
+def report(label, wall, latencies, executions=None):
+    p50 = latencies[len(latencies) // 2] * 1000
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000
+    runs = f'{executions:4d} executions  ' if executions is not None else ''
+    print(f'{label:<16} {runs}wall {wall * 1000:7.0f} ms  p50 {p50:7.0f} ms  p99 {p99:7.0f} ms')
+
+
+def simulated(args):
+    app = Flask(__name__)
+    connections = threading.BoundedSemaphore(args.pool_size)
+    executions = {'plain': 0, 'coalesced': 0}
+
+    def heavy_query(name):
+        with connections:
+            executions[name] += 1
+            time.sleep(args.query_ms / 1000)
+        return jsonify({'distribution': []})
+
+    app.add_url_rule('/plain', 'plain', lambda: heavy_query('plain'))
+    app.add_url_rule('/coalesced', 'coalesced', single_flight()(lambda: heavy_query('coalesced')))
+
+    print(f'{args.callers} simultaneous callers, {args.query_ms} ms query, pool of {args.pool_size} connections')
+    for name in ('plain', 'coalesced'):
+        wall, latencies = simultaneous(args.callers, lambda: app.test_client().get(f'/{name}'))
+        report(name, wall, latencies, executions[name])
+
+
+def remote(args):
+    def call():
+        request = urllib.request.Request(args.url, headers={'Authorization': f'Bearer {args.token}'})
+        with urllib.request.urlopen(request, timeout=120) as response:
+            response.read()
+
+    print(f'{args.callers} simultaneous callers against {args.url}')
+    wall, latencies = simultaneous(args.callers, call)
+    report('server', wall, latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--callers', type=int, default=100)
+    parser.add_argument('--query-ms', type=int, default=200)
+    parser.add_argument('--pool-size', type=int, default=10)
+    parser.add_argument('--url', help='Endpoint of a running server to call instead of the simulation')
+    parser.add_argument('--token', help='Bearer token for --url')
+    args = parser.parse_args()
+    if args.url:
+        remote(args)
+    else:
+        simulated(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""Building a text() clause per call against statements.sql(), alone and through execute().
+
+The statements are the shapes the list endpoints send: a short lookup,
+a joined listing and a listing with an expanding IN list. "build" is the
+clause construction alone; "execute" runs it on an in-memory sqlite
+database with the tables empty, so the time is SQLAlchemy's overhead and
+not the query.
+
+    python bench/statement_memo.py --calls 20000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import bindparam, create_engine, text  # noqa: E402
+
+from statements import sql  # noqa: E402
+
+TABLES = (
+    'CREATE TABLE users (user_id INTEGER PRIMARY KEY, first_name TEXT, last_name TEXT, email TEXT)',
+    'CREATE TABLE students (student_id INTEGER PRIMARY KEY, user_id INTEGER, enrollment_number TEXT)',
+    'CREATE TABLE courses (course_id INTEGER PRIMARY KEY, course_code TEXT, course_name TEXT)',
+    'CREATE TABLE grades (student_id INTEGER, course_id INTEGER, total_marks REAL, letter_grade TEXT)',
+)
+
+STATEMENTS = {
+    'lookup': ('SELECT * FROM courses WHERE course_id = :course_id', (), {'course_id': 1}),
+    'listing': ("""
+        SELECT g.*, s.enrollment_number, u.first_name as student_first_name, u.last_name as student_last_name
+        FROM grades g
+        INNER JOIN students s ON g.student_id = s.student_id
+        INNER JOIN users u ON s.user_id = u.user_id
+        WHERE g.course_id = :course_id AND g.letter_grade = :letter_grade
+        ORDER BY g.student_id, g.course_id
+        LIMIT :limit OFFSET :offset
+    """, (), {'course_id': 1, 'letter_grade': 'A', 'limit': 51, 'offset': 0}),
+    'in-list': ("""
+        SELECT course_id, course_code, course_name FROM courses
+        WHERE course_id IN :course_ids ORDER BY course_id
+    """, ('course_ids',), {'course_ids': list(range(1, 51))}),
+}
+
+
+def build_text(statement, expanding):
+    clause = text(statement)
+    if expanding:
+        clause = clause.bindparams(*(bindparam(name, expanding=True) for name in expanding))
+    return clause
+
+
+def per_call_us(calls, fn):
+    best = None
+    for _ in range(3):
+        started = time.perf_counter()
+        for _ in range(calls):
+            fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best / calls * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--calls', type=int, default=20000)
+    args = parser.parse_args()
+
+    engine = create_engine('sqlite://')
+    with engine.connect() as connection:
+        for table in TABLES:
+            connection.execute(text(table))
+
+        print(f'best of 3 x {args.calls} calls, us per call')
+        print(f'{"statement":<10} {"text() build":>13} {"sql() build":>12} {"text() execute":>15} '
+              f'{"sql() execute":>14}')
+        for name, (statement, expanding, params) in STATEMENTS.items():
+            sql(statement, *expanding)
+            timings = (
+                per_call_us(args.calls, lambda: build_text(statement, expanding)),
+                per_call_us(args.calls, lambda: sql(statement, *expanding)),
+                per_call_us(args.calls, lambda: connection.execute(build_text(statement, expanding), params).all()),
+                per_call_us(args.calls, lambda: connection.execute(sql(statement, *expanding), params).all()),
+            )
+            print(f'{name:<10} {timings[0]:13.2f} {timings[1]:12.2f} {timings[2]:15.2f} {timings[3]:14.2f}')
+    engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""Small in-process caches shared by the route modules"""
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+
+class TTLCache:
+    """Thread-safe dict cache whose entries expire after `ttl_seconds`."""
+
+    def __init__(self, ttl_seconds, maxsize=1024):
+        self.ttl_seconds = ttl_seconds
+        self.maxsize = maxsize
+        # Every entry shares one TTL, so insertion order is also expiry order
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return default
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+            elif len(self._data) >= self.maxsize:
+                # Drop the entry closest to expiry to make room
+                self._data.popitem(last=False)
+            self._data[key] = (time.monotonic() + self.ttl_seconds, value)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+# Callbacks run after a committed write, keyed by table name
+_write_listeners = defaultdict(list)
+
+
+def on_write(*tables):
+    """Register a function called as listener(table, **keys) after writes to `tables`."""
+    def decorator(listener):
+        for table in tables:
+            _write_listeners[table].append(listener)
+        return listener
+    return decorator
+
+
+def notify_write(table, **keys):
+    """Tell every cache that depends on `table` that it just changed.
+
+    Write endpoints call this right after commit. `keys` carries whatever
+    identifies the changed rows (student_id, course_id, ...) so listeners
+    can drop only the entries they need to.
+    """
+    for listener in _write_listeners.get(table, ()):
+        listener(table, **keys)
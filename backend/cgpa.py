@@ -0,0 +1,164 @@
+"""Keeps students.cgpa in step with grade writes, plus a chunked cohort recompute"""
+import logging
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from config import Config
+from database import db
+from grading import GRADE_POINTS
+from statements import sql
+
+logger = logging.getLogger(__name__)
+
+# Grade points as SQL, for the recompute; ungraded rows (NULL letter) get NULL and are skipped
+_POINTS_CASE = 'CASE g.letter_grade {} END'.format(
+    ' '.join(f"WHEN '{letter}' THEN {points}" for letter, points in GRADE_POINTS.items())
+)
+
+
+def _delta(credits, old_letter, new_letter):
+    """Return the (grade_points_total, graded_credits) change for one grade row."""
+    points = graded = 0
+    if old_letter in GRADE_POINTS:
+        points -= credits * GRADE_POINTS[old_letter]
+        graded -= credits
+    if new_letter in GRADE_POINTS:
+        points += credits * GRADE_POINTS[new_letter]
+        graded += credits
+    return points, graded
+
+
+def lock_course(course_id, exclusive=False):
+    """Lock a course row and return its credits (0 when there is no such course).
+
+    Grade writes take the lock shared and credit changes exclusively,
+    before touching any grade row of the course, so every CGPA write
+    locks the course, then its grades, then students rows in that order.
+    """
+    query = sql("SELECT credits FROM courses WHERE course_id = :course_id " +
+                ("FOR UPDATE" if exclusive else "FOR SHARE"))
+    return db.session.execute(query, {'course_id': course_id}).scalar() or 0
+
+
+def apply_grade_changes(course_id, changes, credits=None):
+    """Update the CGPA sums of a list of (student_id, old_letter, new_letter) for one course.
+
+    old_letter is None for a new grade and new_letter is None for a
+    deleted one. `credits` is the course's, from lock_course(); it is
+    read (and locked) here when not given. Students with the same change
+    share one UPDATE. Runs inside the caller's transaction and does not
+    commit.
+    """
+    if credits is None:
+        credits = lock_course(course_id)
+
+    groups = defaultdict(list)
+    for student_id, old_letter, new_letter in changes:
+        delta = _delta(credits, old_letter, new_letter)
+        if any(delta):
+            groups[delta].append(student_id)
+
+    # Several UPDATEs would lock students in delta order, which deadlocks against
+    # another course's import; take every row in key order first
+    if len(groups) > 1:
+        lock_query = sql("""
+            SELECT student_id FROM students
+            WHERE student_id IN :student_ids
+            ORDER BY student_id
+            FOR UPDATE
+        """, 'student_ids')
+        locked = [student_id for student_ids in groups.values() for student_id in student_ids]
+        db.session.execute(lock_query, {'student_ids': locked})
+
+    # MySQL evaluates single-table SET assignments left to right, so cgpa sees the new sums
+    update_query = sql("""
+        UPDATE students
+        SET grade_points_total = grade_points_total + :points,
+            graded_credits = graded_credits + :credits,
+            cgpa = CASE WHEN graded_credits > 0
+                THEN ROUND(grade_points_total / graded_credits, 2)
+                ELSE 0 END
+        WHERE student_id IN :student_ids
+    """, 'student_ids')
+
+    for (points, graded), student_ids in groups.items():
+        db.session.execute(update_query, {'points': points, 'credits': graded, 'student_ids': student_ids})
+
+
+def graded_students(course_id, lock=False):
+    """Ids of the students holding a grade in a course (whose CGPA depends on its credits).
+
+    With `lock`, the grade rows are locked so no regrade slips in before
+    the caller recomputes those students; take lock_course() first.
+    """
+    query = sql("SELECT student_id FROM grades WHERE course_id = :course_id" + (" FOR UPDATE" if lock else ""))
+    return [row.student_id for row in db.session.execute(query, {'course_id': course_id})]
+
+
+def recompute_students(student_ids, executor=None):
+    """Rebuild the CGPA sums of the given students from grades and course credits. Does not commit."""
+    executor = executor or db.session
+    student_ids = list(set(student_ids))
+    if not student_ids:
+        return 0
+
+    recompute_query = sql(f"""
+        UPDATE students s
+        LEFT JOIN (
+            SELECT
+                g.student_id,
+                SUM(c.credits * {_POINTS_CASE}) as points,
+                SUM(CASE WHEN {_POINTS_CASE} IS NOT NULL THEN c.credits ELSE 0 END) as credits
+            FROM grades g
+            INNER JOIN courses c ON g.course_id = c.course_id
+            WHERE g.student_id IN :student_ids
+            GROUP BY g.student_id
+        ) t ON t.student_id = s.student_id
+        SET s.grade_points_total = COALESCE(t.points, 0),
+            s.graded_credits = COALESCE(t.credits, 0),
+            s.cgpa = CASE WHEN t.credits > 0 THEN ROUND(t.points / t.credits, 2) ELSE 0 END
+        WHERE s.student_id IN :student_ids
+    """, 'student_ids')
+    return executor.execute(recompute_query, {'student_ids': student_ids}).rowcount
+
+
+def recompute_cohort(app, department_id=None, batch=None, chunk_size=None, workers=None):
+    """Recompute every student of a cohort (all students by default) in parallel chunks.
+
+    Students are split into chunks of CGPA_RECOMPUTE_CHUNK_SIZE ids, and
+    CGPA_RECOMPUTE_WORKERS threads each recompute and commit one chunk at
+    a time on their own connection. Chunks never share a student, so they
+    do not wait on each other's row locks. Returns the number of students
+    processed.
+    """
+    chunk_size = chunk_size or Config.CGPA_RECOMPUTE_CHUNK_SIZE
+    workers = workers or Config.CGPA_RECOMPUTE_WORKERS
+
+    conditions = []
+    params = {}
+    if department_id:
+        conditions.append("department_id = :department_id")
+        params['department_id'] = department_id
+    if batch:
+        conditions.append("batch = :batch")
+        params['batch'] = batch
+    where_clause = "WHERE " + " AND ".join(conditions) if conditions else ""
+
+    with app.app_context():
+        ids_query = sql(f"SELECT student_id FROM students {where_clause} ORDER BY student_id")
+        student_ids = [row.student_id for row in db.session.execute(ids_query, params)]
+        db.session.remove()
+    chunks = [student_ids[i:i + chunk_size] for i in range(0, len(student_ids), chunk_size)]
+
+    def run(chunk):
+        with app.app_context():
+            with db.engine.begin() as conn:
+                recompute_students(chunk, conn)
+        return len(chunk)
+
+    done = 0
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='cgpa-recompute') as pool:
+        for count in pool.map(run, chunks):
+            done += count
+            logger.info('Recomputed CGPA for %d of %d students', done, len(student_ids))
+    return done
@@ -0,0 +1,92 @@
+"""Columnar and MessagePack encodings for the large list endpoints"""
+from flask import current_app, jsonify, request
+
+from json_provider import encode_default
+
+try:
+    import msgpack
+except ImportError:  # optional dependency; ?format=msgpack answers 406 without it
+    msgpack = None
+
+COLUMNAR_MIMETYPE = 'application/vnd.university.columnar+json'
+MSGPACK_MIMETYPES = ('application/msgpack', 'application/x-msgpack')
+
+FORMATS = ('json', 'columnar', 'msgpack')
+
+# Below this many rows the dictionaries cost more than they save
+DICTIONARY_MIN_ROWS = 16
+
+
+def response_format():
+    """Return 'json', 'columnar' or 'msgpack' from ?format= or the Accept header."""
+    requested = request.args.get('format')
+    if requested in FORMATS:
+        return requested
+    best = request.accept_mimetypes.best_match(('application/json', COLUMNAR_MIMETYPE) + MSGPACK_MIMETYPES)
+    if best == COLUMNAR_MIMETYPE:
+        return 'columnar'
+    if best in MSGPACK_MIMETYPES:
+        return 'msgpack'
+    return 'json'
+
+
+def to_columnar(rows, dictionary=False):
+    """Turn query rows (or dicts) into {columns, rows} with each row as a plain list.
+
+    With `dictionary`, string columns holding fewer distinct values than
+    half the row count (department and course names, statuses, ...) are
+    sent once under `dictionaries` and replaced by indexes into that list.
+    Nulls stay null.
+    """
+    if not rows:
+        return {'columns': [], 'rows': []}
+    if isinstance(rows[0], dict):
+        # Rows enriched in Python (see reference.attach) all share one key order
+        columns = list(rows[0])
+        rows = [tuple(row.values()) for row in rows]
+    else:
+        columns = list(rows[0]._fields)
+    if not dictionary or len(rows) < DICTIONARY_MIN_ROWS:
+        return {'columns': columns, 'rows': [tuple(row) for row in rows]}
+
+    values_by_column = list(zip(*rows))
+    dictionaries = {}
+    for position, values in enumerate(values_by_column):
+        present = [value for value in values if value is not None]
+        if not present or not all(type(value) is str for value in present):
+            continue
+        distinct = list(dict.fromkeys(present))
+        if len(distinct) * 2 > len(rows):
+            continue
+        index = {value: i for i, value in enumerate(distinct)}
+        values_by_column[position] = [None if value is None else index[value] for value in values]
+        dictionaries[columns[position]] = distinct
+
+    body = {'columns': columns, 'rows': list(zip(*values_by_column))}
+    if dictionaries:
+        body['dictionaries'] = dictionaries
+    return body
+
+
+def list_response(body, key, status=200):
+    """jsonify a list body, or send body[key] columnar / as MessagePack when negotiated.
+
+    The other fields of the body (page, total, next_cursor, ...) are kept
+    as they are. ?dictionary=true turns on dictionary encoding.
+    """
+    fmt = response_format()
+    if fmt == 'json':
+        response = jsonify(body)
+    else:
+        if fmt == 'msgpack' and msgpack is None:
+            return jsonify({'error': 'MessagePack responses are not available on this server'}), 406
+        dictionary = request.args.get('dictionary', 'false').lower() == 'true'
+        body = {**body, key: to_columnar(body[key], dictionary)}
+        if fmt == 'msgpack':
+            response = current_app.response_class(msgpack.packb(body, default=encode_default),
+                                                  mimetype=MSGPACK_MIMETYPES[0])
+        else:
+            response = jsonify(body)
+            response.mimetype = COLUMNAR_MIMETYPE
+    response.vary.add('Accept')
+    return response, status
@@ -0,0 +1,143 @@
+"""ETag revalidation backed by per-table version counters"""
+import hashlib
+import logging
+import threading
+import time
+from functools import wraps
+
+from flask import current_app, make_response, request
+from werkzeug.http import is_resource_modified
+
+from cache import TTLCache, on_write
+from config import Config
+from database import db
+from statements import sql
+
+logger = logging.getLogger(__name__)
+
+# Tables with a row in table_versions; writes to them bump it. Enrollments,
+# attendance and grades are left out: they are written all day, and bumping one
+# shared row after each write would serialize them and empty every cache over
+# them. Caches that read those tables drop the keys a write touches instead.
+VERSIONED_TABLES = ('departments', 'courses', 'faculty', 'users', 'students')
+
+
+class TableVersions:
+    """This worker's copy of table_versions, re-read at most every TABLE_VERSIONS_TTL_SECONDS.
+
+    A write in this worker drops the copy at once. Writes made by other
+    workers show up once the copy expires, so a revalidation can answer
+    304 for at most that long after someone else's write.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._versions = {}
+        self._fetched_at = None
+
+    def get(self, tables):
+        """Return [version per table] for `tables`."""
+        with self._lock:
+            fresh = self._fetched_at is not None and \
+                time.monotonic() - self._fetched_at < Config.TABLE_VERSIONS_TTL_SECONDS
+            versions = self._versions
+        if not fresh:
+            # Always the primary: a lagging replica would pin the pre-write versions for a whole TTL
+            with db.engine.connect() as conn:
+                rows = conn.execute(sql("SELECT table_name, version FROM table_versions")).fetchall()
+            versions = {row.table_name: row.version for row in rows}
+            with self._lock:
+                self._versions = versions
+                self._fetched_at = time.monotonic()
+
+        return [versions.get(table, 0) for table in tables]
+
+    def bump(self, table):
+        """Advance `table`'s version after a committed write."""
+        try:
+            db.session.execute(sql("""
+                UPDATE table_versions SET version = version + 1, updated_at = NOW()
+                WHERE table_name = :table_name
+            """), {'table_name': table})
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.warning('Could not bump table_versions for %s: %s', table, e)
+        with self._lock:
+            self._fetched_at = None
+
+
+table_versions = TableVersions()
+
+
+@on_write(*VERSIONED_TABLES)
+def _bump_version(table, **keys):
+    table_versions.bump(table)
+
+
+class VersionedCache:
+    """A TTLCache whose entries also go stale once one of `tables` is written.
+
+    Each entry keeps the table_versions it was built under and is rebuilt
+    when they have moved on. A write through this worker is seen at once
+    and one through another worker within TABLE_VERSIONS_TTL_SECONDS, which
+    an in-process on_write listener alone cannot offer.
+    """
+
+    def __init__(self, tables, ttl_seconds, maxsize=1024):
+        self.tables = tables
+        self._entries = TTLCache(ttl_seconds=ttl_seconds, maxsize=maxsize)
+
+    def get_or_build(self, key, build):
+        """Return the entry for `key`, or build() it; a None result is not cached."""
+        versions = table_versions.get(self.tables)
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == versions:
+            return entry[1]
+
+        # Versions are read before building: a write in between only costs one extra rebuild
+        value = build()
+        if value is not None:
+            self._entries.set(key, (versions, value))
+        return value
+
+    def discard(self, key):
+        self._entries.delete(key)
+
+    def clear(self):
+        self._entries.clear()
+
+
+def _etag(versions):
+    # Query string and Accept are part of the key: they change the body
+    key = f"{request.full_path}|{request.headers.get('Accept', '')}|{versions}"
+    return hashlib.blake2b(key.encode(), digest_size=12).hexdigest()
+
+
+def conditional(*tables, cache_control=None):
+    """Serve the view with an ETag built from the versions of `tables`.
+
+    A matching If-None-Match gets a 304 before the view runs, so no query
+    is made beyond the occasional table_versions refresh. No Last-Modified
+    is sent: HTTP dates have one-second precision, so a write in the same
+    second as an earlier response would still answer If-Modified-Since
+    with a 304. `cache_control` defaults to DEFAULT_CACHE_CONTROL.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            etag = _etag(table_versions.get(tables))
+
+            if not is_resource_modified(request.environ, etag=etag):
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag, weak=True)
+            response.headers['Cache-Control'] = cache_control or Config.DEFAULT_CACHE_CONTROL
+            response.vary.add('Accept')
+            return response
+        return wrapper
+    return decorator
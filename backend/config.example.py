@@ -20,11 +20,83 @@ class Config:
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SQLALCHEMY_ECHO = os.environ.get('SQLALCHEMY_ECHO', 'false').lower() == 'true'
 
+    # Connection pool, per worker process (size + overflow connections at most)
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE') or 10)
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW') or 20)
+    # Seconds a request waits for a free connection before failing
+    DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT') or 30)
+    # Keep this below MySQL's wait_timeout so idle connections are replaced before the server drops them
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE') or 1800)
+    DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', 'true').lower() == 'true'
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': DB_POOL_SIZE,
+        'max_overflow': DB_MAX_OVERFLOW,
+        'pool_timeout': DB_POOL_TIMEOUT,
+        'pool_recycle': DB_POOL_RECYCLE,
+        'pool_pre_ping': DB_POOL_PRE_PING,
+    }
+
+    # Read replicas: comma-separated SQLAlchemy URLs. GET requests read from a healthy
+    # replica; writes, and a user's reads right after their own write, use the primary.
+    DB_REPLICA_URLS = [url.strip() for url in (os.environ.get('DB_REPLICA_URLS') or '').split(',') if url.strip()]
+    SQLALCHEMY_BINDS = {f'replica_{i}': url for i, url in enumerate(DB_REPLICA_URLS)}
+    DB_REPLICA_STICKY_SECONDS = int(os.environ.get('DB_REPLICA_STICKY_SECONDS') or 5)
+    DB_REPLICA_HEALTH_CHECK_SECONDS = int(os.environ.get('DB_REPLICA_HEALTH_CHECK_SECONDS') or 10)
+
+    # Logging: records are queued and written by a background thread
+    LOG_LEVEL = (os.environ.get('LOG_LEVEL') or 'INFO').upper()
+    LOG_FORMAT = (os.environ.get('LOG_FORMAT') or 'text').lower()  # 'text' or 'json'
+
+    # Statements slower than this are written to the slow-query log (0 disables)
+    SLOW_QUERY_MS = int(os.environ.get('SLOW_QUERY_MS') or 200)
+    # File for the slow-query log; stderr when unset
+    SLOW_QUERY_LOG_FILE = os.environ.get('SLOW_QUERY_LOG_FILE') or ''
+
     # Token configuration
     ACCESS_TOKEN_EXPIRES_SECONDS = int(os.environ.get('ACCESS_TOKEN_EXPIRES_SECONDS') or 3600)
+    # Verified tokens remembered per worker so repeat requests skip signature checks (0 disables)
+    TOKEN_CACHE_SIZE = int(os.environ.get('TOKEN_CACHE_SIZE') or 4096)
+
+    # Password hashing: werkzeug method string, e.g. 'scrypt:32768:8:1' or 'pbkdf2:sha256:600000'.
+    # Stored hashes made with other parameters are upgraded on the next successful login.
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD') or 'scrypt:32768:8:1'
+    # Processes used to hash/verify off the request thread (0 = hash inline)
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS') or 0)
+    PASSWORD_HASH_TIMEOUT_SECONDS = int(os.environ.get('PASSWORD_HASH_TIMEOUT_SECONDS') or 10)
 
     # Pagination
     ITEMS_PER_PAGE = 20
+    MAX_ITEMS_PER_PAGE = int(os.environ.get('MAX_ITEMS_PER_PAGE') or 1000)
+    # How long ?include_total=estimate may reuse a count for the same filters
+    COUNT_CACHE_TTL_SECONDS = int(os.environ.get('COUNT_CACHE_TTL_SECONDS') or 30)
+
+    # Encode JSON responses with orjson when it is installed (same output as the default encoder)
+    FAST_JSON = os.environ.get('FAST_JSON', 'true').lower() == 'true'
+
+    # Rows fetched per server-side cursor batch when streaming NDJSON
+    STREAM_BATCH_SIZE = int(os.environ.get('STREAM_BATCH_SIZE') or 1000)
+
+    # Background rebuild interval for the low-attendance summary table (0 disables)
+    ATTENDANCE_REPORT_REFRESH_SECONDS = int(os.environ.get('ATTENDANCE_REPORT_REFRESH_SECONDS') or 300)
+
+    # Upper bound on how long cached department stats live between writes
+    DEPARTMENT_STATS_CACHE_SECONDS = int(os.environ.get('DEPARTMENT_STATS_CACHE_SECONDS') or 300)
+    # How long a cached faculty/student dashboard can miss enrollment, attendance and
+    # grade writes made through other workers (this worker's writes drop it at once)
+    DASHBOARD_CACHE_SECONDS = int(os.environ.get('DASHBOARD_CACHE_SECONDS') or 30)
+    # Room for every student refreshing at once on results day
+    STUDENT_DASHBOARD_CACHE_SIZE = int(os.environ.get('STUDENT_DASHBOARD_CACHE_SIZE') or 20000)
+
+    # `flask recompute-cgpa`: students per transaction and parallel connections
+    CGPA_RECOMPUTE_CHUNK_SIZE = int(os.environ.get('CGPA_RECOMPUTE_CHUNK_SIZE') or 500)
+    CGPA_RECOMPUTE_WORKERS = int(os.environ.get('CGPA_RECOMPUTE_WORKERS') or 4)
+
+    # How long a worker trusts its copy of table_versions before re-reading it for ETags
+    TABLE_VERSIONS_TTL_SECONDS = int(os.environ.get('TABLE_VERSIONS_TTL_SECONDS') or 2)
+    # Cache-Control for conditional (ETag) endpoints that do not set their own
+    DEFAULT_CACHE_CONTROL = os.environ.get('DEFAULT_CACHE_CONTROL') or 'no-cache'
+    # Longest a request waits on an identical in-flight one before running the view itself
+    SINGLE_FLIGHT_WAIT_SECONDS = int(os.environ.get('SINGLE_FLIGHT_WAIT_SECONDS') or 30)
 
     # Session configuration
     PERMANENT_SESSION_LIFETIME = 3600  # 1 hour
@@ -1,5 +1,23 @@
 """Database initialization module"""
+from flask import g, has_request_context
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
+
+
+class RoutingSession(Session):
+    """Session that sends a read-only request's queries to the replica picked for it.
+
+    replicas.py stores that engine on g.read_replica; everything else,
+    including flushes, CLI commands and background jobs, uses the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and has_request_context():
+            replica = g.get('read_replica')
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
 
 # Create database instance
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
@@ -0,0 +1,54 @@
+"""Grade arithmetic shared by the single-grade endpoints and the batch import"""
+from bisect import bisect_right
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency; the import falls back to bisect per row
+    np = None
+
+# Lower bounds (inclusive) of each letter above F, and the letters they start
+GRADE_BOUNDARIES = (45, 50, 55, 60, 65, 70, 75, 80, 85, 90)
+GRADE_LETTERS = ('F', 'D', 'C-', 'C', 'C+', 'B-', 'B', 'B+', 'A-', 'A', 'A+')
+
+# Points per letter on the 10-point scale the CGPA is computed on
+GRADE_POINTS = {
+    'A+': 10, 'A': 9, 'A-': 8.5, 'B+': 8, 'B': 7.5, 'B-': 7,
+    'C+': 6.5, 'C': 6, 'C-': 5.5, 'D': 5, 'F': 0,
+}
+
+# Each of internal1, internal2 and external is out of 50
+MAX_MARKS = 50
+
+
+def calculate_letter_grade(percentage):
+    """Calculate letter grade based on percentage"""
+    return GRADE_LETTERS[bisect_right(GRADE_BOUNDARIES, percentage)]
+
+
+def compute_grades(marks):
+    """Compute (total_marks, percentage, letter_grade) for each (internal1, internal2, external).
+
+    Same rules as create_grade: total = average of the two internals +
+    external, and a zero total gets percentage 0 and no letter. With NumPy
+    the whole batch is done in a few array operations, the letter lookup
+    being one searchsorted over GRADE_BOUNDARIES.
+    """
+    if not marks:
+        return []
+    if np is None:
+        results = []
+        for internal1, internal2, external in marks:
+            total = (internal1 + internal2) / 2 + external
+            if total > 0:
+                results.append((total, total, calculate_letter_grade(total)))
+            else:
+                results.append((total, 0, None))
+        return results
+
+    array = np.asarray(marks, dtype=np.float64)
+    total = (array[:, 0] + array[:, 1]) / 2 + array[:, 2]
+    graded = total > 0
+    percentage = np.where(graded, total, 0)
+    letters = np.asarray(GRADE_LETTERS, dtype=object)[np.searchsorted(GRADE_BOUNDARIES, percentage, side='right')]
+    letters[~graded] = None
+    return list(zip(total.tolist(), percentage.tolist(), letters.tolist()))
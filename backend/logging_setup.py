@@ -0,0 +1,112 @@
+"""Asynchronous logging: request threads enqueue records, one listener thread writes them"""
+import atexit
+import json
+import logging
+import queue
+import sys
+import uuid
+from logging.handlers import QueueHandler, QueueListener
+
+from flask import g, has_request_context, request
+from flask.logging import default_handler
+
+from config import Config
+
+REQUEST_ID_HEADER = 'X-Request-ID'
+
+# Attributes every LogRecord has; anything else was passed through `extra`
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'request_id'}
+
+_log_queue = queue.SimpleQueue()
+_listener = None
+
+
+class RequestIdFilter(logging.Filter):
+    """Stamp each record with the id of the request that logged it ('-' outside requests)."""
+
+    def filter(self, record):
+        record.request_id = g.get('request_id', '-') if has_request_context() else '-'
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, including any `extra` fields."""
+
+    def format(self, record):
+        entry = {
+            'ts': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'request_id': getattr(record, 'request_id', '-'),
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def _build_formatter():
+    if Config.LOG_FORMAT == 'json':
+        return JsonFormatter()
+    return logging.Formatter('%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s')
+
+
+def _output_handlers():
+    formatter = _build_formatter()
+    console = logging.StreamHandler(sys.stderr)
+    console.setFormatter(formatter)
+    handlers = [console]
+
+    if Config.SLOW_QUERY_LOG_FILE:
+        # Slow queries go to their own file instead of the console
+        console.addFilter(lambda record: not record.name.startswith('university.slow_query'))
+        slow_file = logging.FileHandler(Config.SLOW_QUERY_LOG_FILE)
+        slow_file.setFormatter(formatter)
+        slow_file.addFilter(logging.Filter('university.slow_query'))
+        handlers.append(slow_file)
+    return handlers
+
+
+def _assign_request_id():
+    g.request_id = request.headers.get(REQUEST_ID_HEADER) or uuid.uuid4().hex
+
+
+def _echo_request_id(response):
+    if 'request_id' in g:
+        response.headers[REQUEST_ID_HEADER] = g.request_id
+    return response
+
+
+def init_logging(app):
+    """Route every logger through a queue drained by a background QueueListener.
+
+    Request threads only pay for building the record and a queue put; the
+    stream and file writes happen on the listener thread. Records below
+    LOG_LEVEL (DEBUG is off by default) are dropped before any formatting.
+    """
+    global _listener
+
+    queue_handler = QueueHandler(_log_queue)
+    queue_handler.addFilter(RequestIdFilter())
+
+    root = logging.getLogger()
+    root.handlers = [queue_handler]
+    root.setLevel(Config.LOG_LEVEL)
+    # LOG_LEVEL=DEBUG is for our own modules; SQL echo has its own switch (SQLALCHEMY_ECHO)
+    # (the instrumented pool logs under its own module name)
+    if not Config.SQLALCHEMY_ECHO:
+        for name in ('sqlalchemy', 'pool_metrics.TimedQueuePool'):
+            logging.getLogger(name).setLevel(logging.WARNING)
+    # Flask's own stderr handler would bypass the queue
+    app.logger.removeHandler(default_handler)
+
+    if _listener is None:
+        _listener = QueueListener(_log_queue, *_output_handlers(), respect_handler_level=True)
+        _listener.start()
+        atexit.register(_listener.stop)
+
+    app.before_request(_assign_request_id)
+    app.after_request(_echo_request_id)
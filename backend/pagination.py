@@ -0,0 +1,141 @@
+"""Pagination helpers shared by the list endpoints"""
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from flask import request
+from statements import sql
+
+from config import Config
+from database import db
+
+TOTAL_MODES = ('exact', 'estimate', 'false')
+
+
+class InvalidCursor(ValueError):
+    """Raised when an `after` cursor cannot be decoded."""
+
+
+def get_page_args(default_per_page=Config.ITEMS_PER_PAGE):
+    """Read page/per_page query args and return (page, per_page, offset)."""
+    page = request.args.get('page', 1, type=int)
+    per_page = request.args.get('per_page', default_per_page, type=int)
+    page = max(page, 1)
+    per_page = min(max(per_page, 1), Config.MAX_ITEMS_PER_PAGE)
+    return page, per_page, (page - 1) * per_page
+
+
+def _encode_token(values):
+    raw = json.dumps(values, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def _decode_token(token):
+    padded = token + '=' * (-len(token) % 4)
+    return json.loads(base64.urlsafe_b64decode(padded.encode()))
+
+
+def encode_cursor(created_at, row_id):
+    """Build an opaque cursor token from the (created_at, id) sort key."""
+    if isinstance(created_at, datetime):
+        created_at = created_at.isoformat()
+    return _encode_token([created_at, row_id])
+
+
+def decode_cursor(token):
+    """Decode a cursor token back into (created_at, id)."""
+    try:
+        created_at, row_id = _decode_token(token)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (binascii.Error, ValueError, TypeError):
+        raise InvalidCursor('Invalid cursor')
+
+
+def encode_rank_cursor(score, row_id):
+    """Build an opaque cursor token from a (relevance score, id) sort key."""
+    return _encode_token([score, row_id])
+
+
+def decode_rank_cursor(token):
+    """Decode a rank cursor token back into (score, id)."""
+    try:
+        score, row_id = _decode_token(token)
+        return float(score), int(row_id)
+    except (binascii.Error, ValueError, TypeError):
+        raise InvalidCursor('Invalid cursor')
+
+
+def next_cursor(rows, per_page, created_at_key, id_key):
+    """Return the cursor for the page after `rows`, or None on the last page.
+
+    Callers fetch per_page + 1 rows; the extra row only tells us that
+    another page exists and is trimmed from `rows` in place.
+    """
+    if len(rows) <= per_page:
+        return None
+    del rows[per_page:]
+    last = rows[-1]._mapping
+    return encode_cursor(last[created_at_key], last[id_key])
+
+
+def get_total_mode(default='exact'):
+    """Read ?include_total=exact|estimate|false."""
+    mode = (request.args.get('include_total') or default).lower()
+    if mode not in TOTAL_MODES:
+        raise ValueError(f"include_total must be one of: {', '.join(TOTAL_MODES)}")
+    return mode
+
+
+def resolve_total(mode, count_query, params, count_cache, table_name):
+    """Return (total, estimated) for a list query according to `mode`.
+
+    `estimate` serves a recently cached count for the same filter set.
+    On a miss an unfiltered listing falls back to the table statistics
+    kept by MySQL, and a filtered one runs the exact count once and
+    caches it for the next callers.
+    """
+    if mode == 'false':
+        return None, False
+
+    key = tuple(sorted(params.items()))
+    if mode == 'estimate':
+        cached = count_cache.get(key)
+        if cached is not None:
+            return cached, True
+        if not params:
+            stats_query = sql("""
+                SELECT TABLE_ROWS FROM information_schema.TABLES
+                WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table_name
+            """)
+            estimate = db.session.execute(stats_query, {'table_name': table_name}).scalar()
+            if estimate is not None:
+                return int(estimate), True
+
+    total = db.session.execute(count_query, params).scalar()
+    count_cache.set(key, total)
+    return total, mode == 'estimate'
+
+
+def has_more(rows, per_page):
+    """Trim the extra look-ahead row and report whether another page exists."""
+    if len(rows) <= per_page:
+        return False
+    del rows[per_page:]
+    return True
+
+
+def page_response(key, rows, page, per_page, more, total=None, total_estimated=False):
+    """Build the body shared by the offset-paginated listings."""
+    response = {
+        key: rows,
+        'page': page,
+        'per_page': per_page,
+        'has_more': more
+    }
+    if total is not None:
+        response['total'] = total
+        response['pages'] = (total + per_page - 1) // per_page if total > 0 else 0
+        if total_estimated:
+            response['total_estimated'] = True
+    return response
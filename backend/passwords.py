@@ -0,0 +1,73 @@
+"""Password hashing with a configurable cost and optional off-thread verification"""
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from functools import lru_cache
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from config import Config
+
+_pool = None
+_pool_lock = threading.Lock()
+# Bounds how many hash jobs may be queued for the pool at once
+_pool_slots = threading.BoundedSemaphore(max(Config.PASSWORD_HASH_WORKERS, 1) * 4)
+
+
+class PasswordHasherBusy(RuntimeError):
+    """Raised when the hashing pool has no free slot, or no result, within the timeout."""
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn avoids forking a multi-threaded web worker
+            _pool = ProcessPoolExecutor(
+                max_workers=Config.PASSWORD_HASH_WORKERS,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return _pool
+
+
+def _run(func, *args):
+    """Run a CPU-heavy hash function inline or in the bounded process pool."""
+    if Config.PASSWORD_HASH_WORKERS <= 0:
+        return func(*args)
+
+    timeout = Config.PASSWORD_HASH_TIMEOUT_SECONDS
+    if not _pool_slots.acquire(timeout=timeout):
+        raise PasswordHasherBusy('Password hashing is busy, try again shortly')
+    try:
+        future = _get_pool().submit(func, *args)
+    except BaseException:
+        _pool_slots.release()
+        raise
+    # The slot belongs to the job, not the caller: a caller that gives up leaves it taken until the job ends
+    future.add_done_callback(lambda _: _pool_slots.release())
+    try:
+        return future.result(timeout=timeout)
+    except FutureTimeoutError:
+        future.cancel()
+        raise PasswordHasherBusy('Password hashing is busy, try again shortly') from None
+
+
+@lru_cache(maxsize=None)
+def _method_prefix(method):
+    """Return the stored prefix (e.g. 'pbkdf2:sha256:600000') that `method` produces."""
+    return generate_password_hash('', method=method).split('$', 1)[0]
+
+
+def hash_password(password):
+    """Hash a password with the configured PASSWORD_HASH_METHOD."""
+    return _run(generate_password_hash, password, Config.PASSWORD_HASH_METHOD)
+
+
+def verify_password(password_hash, password):
+    """Check a password against its stored hash."""
+    return _run(check_password_hash, password_hash, password)
+
+
+def needs_rehash(password_hash):
+    """True when a stored hash was made with a different method or cost than configured."""
+    return password_hash.split('$', 1)[0] != _method_prefix(Config.PASSWORD_HASH_METHOD)
@@ -0,0 +1,155 @@
+"""Connection pool telemetry served by /api/admin/pool"""
+import os
+import threading
+import time
+from bisect import bisect_left
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+# Upper bounds of the histogram buckets; the last bucket catches everything above
+WAIT_MS_BUCKETS = (0.1, 0.5, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+COUNT_BUCKETS = (0, 1, 2, 4, 8, 16, 32, 64, 128)
+
+
+class Histogram:
+    """Per-bucket (not cumulative) counts plus count/sum/max of the observed values."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def snapshot(self):
+        bounds = list(self.buckets) + ['+Inf']
+        return {
+            'buckets': [{'le': le, 'count': n} for le, n in zip(bounds, self.counts)],
+            'count': self.count,
+            'sum': round(self.total, 3),
+            'max': round(self.max, 3),
+        }
+
+
+class PoolMetrics:
+    """Counters and histograms fed by one engine's pool events, in one worker process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.events = {'connect': 0, 'checkout': 0, 'checkin': 0, 'invalidate': 0, 'timeout': 0}
+            self.checkout_wait_ms = Histogram(WAIT_MS_BUCKETS)
+            self.checked_out = Histogram(COUNT_BUCKETS)
+            self.overflow = Histogram(COUNT_BUCKETS)
+            self.started_at = time.time()
+
+    def record_event(self, name):
+        with self._lock:
+            self.events[name] += 1
+
+    def record_wait(self, seconds):
+        with self._lock:
+            self.checkout_wait_ms.observe(seconds * 1000)
+
+    def record_checkout(self, pool):
+        with self._lock:
+            self.events['checkout'] += 1
+            self.checked_out.observe(pool.checkedout())
+            self.overflow.observe(max(pool.overflow(), 0))
+
+    def snapshot(self, pool):
+        with self._lock:
+            return {
+                'pid': os.getpid(),
+                'since': self.started_at,
+                'pool': {
+                    'size': pool.size(),
+                    'checked_out': pool.checkedout(),
+                    'checked_in': pool.checkedin(),
+                    # QueuePool reports unopened slots as negative overflow
+                    'overflow': max(pool.overflow(), 0),
+                    'max_overflow': pool._max_overflow,
+                    'timeout': pool.timeout(),
+                    'recycle': pool._recycle,
+                    'pre_ping': pool._pre_ping,
+                },
+                'events': dict(self.events),
+                'checkout_wait_ms': self.checkout_wait_ms.snapshot(),
+                'checked_out_at_checkout': self.checked_out.snapshot(),
+                'overflow_at_checkout': self.overflow.snapshot(),
+            }
+
+
+# Metrics per engine: 'primary' and each replica bind name
+pool_metrics = {}
+
+_wait_depth = threading.local()
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waits for a connection.
+
+    The time covers waiting on the queue and opening a new connection when
+    the pool grows, but not the pre-ping done afterwards. Waits go to the
+    PoolMetrics that install_pool_listeners gave the pool, so every engine
+    reports its own.
+    """
+
+    metrics = None
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+    def _do_get(self):
+        # QueuePool._do_get retries by calling itself; only time the outer call
+        depth = getattr(_wait_depth, 'value', 0)
+        _wait_depth.value = depth + 1
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            if depth == 0 and self.metrics is not None:
+                self.metrics.record_event('timeout')
+            raise
+        finally:
+            _wait_depth.value = depth
+            if depth == 0 and self.metrics is not None:
+                self.metrics.record_wait(time.perf_counter() - started)
+
+
+def install_pool_listeners(engine, name='primary'):
+    """Attach the counting listeners to an engine's pool, reported under `name`."""
+    metrics = pool_metrics.setdefault(name, PoolMetrics())
+    pool = engine.pool
+    if isinstance(pool, TimedQueuePool):
+        pool.metrics = metrics
+
+    @event.listens_for(pool, 'connect')
+    def _on_connect(dbapi_connection, connection_record):
+        metrics.record_event('connect')
+
+    @event.listens_for(pool, 'checkout')
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        # engine.pool, not `pool`: dispose() swaps in a recreated pool
+        metrics.record_checkout(engine.pool)
+
+    @event.listens_for(pool, 'checkin')
+    def _on_checkin(dbapi_connection, connection_record):
+        metrics.record_event('checkin')
+
+    @event.listens_for(pool, 'invalidate')
+    def _on_invalidate(dbapi_connection, connection_record, exception):
+        metrics.record_event('invalidate')
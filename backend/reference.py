@@ -0,0 +1,93 @@
+"""In-process copies of the small dimension tables, attached to list rows in Python"""
+import threading
+
+from sqlalchemy.engine import Row
+
+from conditional import table_versions
+from database import db
+from statements import sql
+
+# Dimension name -> (query keyed by its first column, tables whose versions it depends on)
+DIMENSIONS = {
+    'departments': (
+        "SELECT department_id, department_name, department_code FROM departments",
+        ('departments',),
+    ),
+    'courses': (
+        "SELECT course_id, course_code, course_name, faculty_id FROM courses",
+        ('courses',),
+    ),
+    'faculty': (
+        """
+        SELECT f.faculty_id, f.designation, u.first_name, u.last_name
+        FROM faculty f
+        INNER JOIN users u ON f.user_id = u.user_id
+        """,
+        ('faculty', 'users'),
+    ),
+}
+
+
+class ReferenceData:
+    """Dimension lookups reloaded whenever their table_versions counters move.
+
+    The versions come from the same per-worker copy of table_versions the
+    ETags use, so a write made through another worker is picked up within
+    TABLE_VERSIONS_TTL_SECONDS and one made through this worker at once.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaded = {}
+
+    def lookup(self, name):
+        """Return {key: row} for dimension `name`, reloading it if it changed."""
+        query, tables = DIMENSIONS[name]
+        versions = table_versions.get(tables)
+        with self._lock:
+            entry = self._loaded.get(name)
+        if entry is not None and entry[0] == versions:
+            return entry[1]
+
+        # Versions are read before loading: a write in between only causes one extra reload
+        # From the primary too, so a lagging replica's rows are never stored under the new versions
+        with db.engine.connect() as conn:
+            mapping = {row[0]: row for row in conn.execute(sql(query)).fetchall()}
+        with self._lock:
+            self._loaded[name] = (versions, mapping)
+        return mapping
+
+    def clear(self):
+        with self._lock:
+            self._loaded.clear()
+
+
+reference_data = ReferenceData()
+
+
+def attach(rows, name, key, **fields):
+    """Add `fields` (output column=dimension column) from dimension `name` to each row.
+
+    Rows are matched on their `key` column; rows with no match get None,
+    like a LEFT JOIN. Returns the rows as dicts, updated in place when they
+    already are.
+    """
+    if not rows:
+        return []
+    mapping = reference_data.lookup(name)
+    outputs, columns = tuple(fields), tuple(fields.values())
+    missing = (None,) * len(outputs)
+    keys = rows[0]._fields if isinstance(rows[0], Row) else None
+    result = []
+    for row in rows:
+        if keys is not None:
+            row = dict(zip(keys, row))
+        found = mapping.get(row[key])
+        row.update(zip(outputs, missing if found is None else [getattr(found, column) for column in columns]))
+        result.append(row)
+    return result
+
+
+def with_course_names(rows):
+    """attach() course_code and course_name by course_id."""
+    return attach(rows, 'courses', 'course_id', course_code='course_code', course_name='course_name')
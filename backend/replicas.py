@@ -0,0 +1,143 @@
+"""Read-replica routing for read-only requests, with read-your-writes stickiness"""
+import itertools
+import logging
+import multiprocessing
+import threading
+import time
+
+from flask import g, request
+from sqlalchemy import event, text
+
+from cache import TTLCache
+from config import Config
+from database import db
+
+logger = logging.getLogger(__name__)
+
+# Sent after a write and echoed back by clients that may hit another worker
+PRIMARY_UNTIL_HEADER = 'X-DB-Primary-Until'
+
+READ_METHODS = ('GET', 'HEAD')
+# Read paths that must always see the primary
+PRIMARY_ONLY_PATHS = ('/api/health', '/api/admin/')
+
+# Users who wrote within the last DB_REPLICA_STICKY_SECONDS, per worker
+_recent_writers = TTLCache(ttl_seconds=Config.DB_REPLICA_STICKY_SECONDS, maxsize=100000)
+
+
+class ReplicaSet:
+    """Replica engines with their health flags, picked round-robin."""
+
+    def __init__(self):
+        self.engines = []
+        self._healthy = {}
+        self._cycle = None
+        self._lock = threading.Lock()
+
+    def configure(self, engines):
+        with self._lock:
+            self.engines = list(engines)
+            # Unchecked replicas stay out of rotation until the first health check passes
+            self._healthy = {engine: False for engine in self.engines}
+            self._cycle = itertools.cycle(self.engines)
+
+    def mark(self, engine, healthy):
+        with self._lock:
+            self._healthy[engine] = healthy
+
+    def pick(self):
+        """Return the next healthy replica engine, or None to use the primary."""
+        with self._lock:
+            for _ in range(len(self.engines)):
+                engine = next(self._cycle)
+                if self._healthy[engine]:
+                    return engine
+        return None
+
+    def check_all(self):
+        """Run SELECT 1 against every replica and update its health flag."""
+        for engine in self.engines:
+            try:
+                with engine.connect() as conn:
+                    conn.execute(text('SELECT 1'))
+                self.mark(engine, True)
+            except Exception as e:
+                logger.warning('Read replica %s failed its health check: %s', engine.url.host, e)
+                self.mark(engine, False)
+
+    def status(self):
+        with self._lock:
+            return [
+                {'host': engine.url.host, 'database': engine.url.database, 'healthy': self._healthy[engine]}
+                for engine in self.engines
+            ]
+
+
+replicas = ReplicaSet()
+
+
+def _stick_to_primary():
+    """True when this request must read its own recent writes."""
+    user = getattr(request, 'user', None)
+    if user and _recent_writers.get(user['user_id']):
+        return True
+    primary_until = request.headers.get(PRIMARY_UNTIL_HEADER, type=float)
+    return primary_until is not None and primary_until > time.time()
+
+
+def route_request():
+    """before_request hook: pick a replica for read-only API requests."""
+    g.read_replica = None
+    if request.method not in READ_METHODS or not request.path.startswith('/api/'):
+        return None
+    if request.path.startswith(PRIMARY_ONLY_PATHS) or _stick_to_primary():
+        return None
+    g.read_replica = replicas.pick()
+    return None
+
+
+def record_write(response):
+    """after_request hook: keep a user's reads on the primary right after their write."""
+    if request.method in READ_METHODS or request.method == 'OPTIONS' or response.status_code >= 400:
+        return response
+    user = getattr(request, 'user', None)
+    if user:
+        _recent_writers.set(user['user_id'], True)
+    response.headers[PRIMARY_UNTIL_HEADER] = f"{time.time() + Config.DB_REPLICA_STICKY_SECONDS:.3f}"
+    return response
+
+
+def _watch_disconnects(engine):
+    @event.listens_for(engine, 'handle_error')
+    def _on_error(context):
+        # Take a replica out of rotation as soon as it drops; the health check brings it back
+        if context.is_disconnect:
+            replicas.mark(engine, False)
+
+
+def init_read_replicas(app):
+    """Route reads to the SQLALCHEMY_BINDS replica_* engines and health-check them in a daemon thread."""
+    with app.app_context():
+        engines = [db.engines[key] for key in sorted(app.config.get('SQLALCHEMY_BINDS') or {})
+                   if key.startswith('replica_')]
+    if not engines:
+        return None
+
+    replicas.configure(engines)
+    for engine in engines:
+        _watch_disconnects(engine)
+    app.before_request(route_request)
+    app.after_request(record_write)
+
+    # Skip helper processes (e.g. the password hashing pool) that re-import the app
+    if multiprocessing.parent_process() is not None:
+        return None
+
+    def run():
+        while True:
+            replicas.check_all()
+            time.sleep(Config.DB_REPLICA_HEALTH_CHECK_SECONDS)
+
+    thread = threading.Thread(target=run, name='read-replica-health', daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,48 @@
+from flask import Blueprint, jsonify
+from database import db
+from auth_utils import token_required
+from pool_metrics import pool_metrics
+from replicas import replicas
+from sql_metrics import endpoint_stats
+
+bp = Blueprint('admin', __name__, url_prefix='/api/admin')
+
+
+# METRICS - Connection pool state, checkout histograms and replica health for this worker
+@bp.route('/pool', methods=['GET'])
+@token_required(['admin'])
+def get_pool_metrics():
+    try:
+        snapshot = pool_metrics['primary'].snapshot(db.engine.pool)
+        snapshot['replicas'] = replicas.status()
+        snapshot['replica_pools'] = {
+            name: metrics.snapshot(db.engines[name].pool)
+            for name, metrics in pool_metrics.items() if name != 'primary'
+        }
+        return jsonify(snapshot), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+# METRICS - Start a fresh measurement window
+@bp.route('/pool/reset', methods=['POST'])
+@token_required(['admin'])
+def reset_pool_metrics():
+    for metrics in pool_metrics.values():
+        metrics.reset()
+    return jsonify({'message': 'Pool metrics reset'}), 200
+
+
+# METRICS - Statements and database time per endpoint, busiest first
+@bp.route('/queries', methods=['GET'])
+@token_required(['admin'])
+def get_query_metrics():
+    return jsonify({'endpoints': endpoint_stats.snapshot()}), 200
+
+
+# METRICS - Start a fresh per-endpoint measurement window
+@bp.route('/queries/reset', methods=['POST'])
+@token_required(['admin'])
+def reset_query_metrics():
+    endpoint_stats.reset()
+    return jsonify({'message': 'Query metrics reset'}), 200
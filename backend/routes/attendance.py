@@ -1,44 +1,65 @@
 from flask import Blueprint, request, jsonify
 from database import db
-from sqlalchemy import text
+from statements import sql
+from config import Config
+from writes import written_row
+from cache import TTLCache, on_write, notify_write
+from pagination import get_page_args, get_total_mode, resolve_total, has_more, page_response
+from streaming import wants_ndjson, stream_ndjson
+from columnar import list_response
+from reference import with_course_names
+from attendance_counters import apply_attendance_changes
 
 bp = Blueprint('attendance', __name__, url_prefix='/api/attendance')
 
+# Recent COUNT(*) results keyed by filter set, cleared on writes
+count_cache = TTLCache(ttl_seconds=Config.COUNT_CACHE_TTL_SECONDS)
+
+
+@on_write('attendance')
+def _clear_count_cache(table, **keys):
+    count_cache.clear()
+
+ATTENDANCE_STATUSES = ('present', 'absent', 'late', 'excused')
+
 # CREATE
 @bp.route('/', methods=['POST'])
 def create_attendance():
     try:
         data = request.get_json()
         
-        insert_query = text("""
+        insert_query = sql("""
             INSERT INTO attendance 
             (student_id, course_id, attendance_date, status, marked_by, notes, created_at)
             VALUES 
             (:student_id, :course_id, :attendance_date, :status, :marked_by, :notes, NOW())
         """)
         
-        result = db.session.execute(insert_query, {
+        values = {
             'student_id': data['student_id'],
             'course_id': data['course_id'],
             'attendance_date': data['attendance_date'],
             'status': data['status'],
             'marked_by': data['marked_by'],
             'notes': data.get('notes')
-        })
+        }
+        db.session.execute(insert_query, values)
+        apply_attendance_changes(data['course_id'], [(data['student_id'], None, data['status'])])
         
         db.session.commit()
+        notify_write('attendance', student_id=data['student_id'], course_id=data['course_id'])
         
-        # Composite key - fetch by student_id, course_id, and attendance_date
-        select_query = text("SELECT * FROM attendance WHERE student_id = :student_id AND course_id = :course_id AND attendance_date = :attendance_date")
-        attendance = db.session.execute(select_query, {
+        # Echo the written values; re-read only for ?return=representation
+        select_query = sql("SELECT * FROM attendance WHERE student_id = :student_id AND course_id = :course_id AND attendance_date = :attendance_date")
+        attendance = written_row(values, select_query, {
             'student_id': data['student_id'],
             'course_id': data['course_id'],
             'attendance_date': data['attendance_date']
-        }).fetchone()
+        })
         
         return jsonify({
             'message': 'Attendance marked successfully',
-            'attendance': dict(attendance._mapping)
+            'attendance': attendance
         }), 201
         
     except Exception as e:
@@ -46,6 +67,111 @@ def create_attendance():
         return jsonify({'error': str(e)}), 500
 
 
+# BULK CREATE - Mark a whole class session in one transaction
+@bp.route('/bulk', methods=['POST'])
+def bulk_mark_attendance():
+    try:
+        data = request.get_json()
+        
+        required_fields = ['course_id', 'attendance_date', 'marked_by', 'records']
+        for field in required_fields:
+            if field not in data:
+                return jsonify({'error': f'Missing required field: {field}'}), 400
+        if not isinstance(data['records'], list) or not data['records']:
+            return jsonify({'error': 'records must be a non-empty list'}), 400
+        
+        # Validate each row up front so one bad entry does not sink the batch
+        results = []
+        valid = {}
+        for record in data['records']:
+            student_id = record.get('student_id') if isinstance(record, dict) else None
+            status = record.get('status') if isinstance(record, dict) else None
+            result = {'student_id': student_id, 'status': status}
+            if not isinstance(student_id, int):
+                result.update(outcome='error', error='student_id must be an integer')
+            elif status not in ATTENDANCE_STATUSES:
+                result.update(outcome='error', error=f"status must be one of: {', '.join(ATTENDANCE_STATUSES)}")
+            elif student_id in valid:
+                result.update(outcome='error', error='Duplicate student_id in request')
+            else:
+                valid[student_id] = (result, record.get('notes'))
+            results.append(result)
+        
+        # One query tells us who is enrolled and who already has a mark for this date.
+        # Locking the enrollment rows makes concurrent or repeated submissions for the
+        # session queue up, so each sees the marks the previous one wrote.
+        existing = {}
+        if valid:
+            lookup_query = sql("""
+                SELECT e.student_id, a.status
+                FROM enrollments e
+                LEFT JOIN attendance a
+                    ON a.student_id = e.student_id
+                    AND a.course_id = e.course_id
+                    AND a.attendance_date = :attendance_date
+                WHERE e.course_id = :course_id AND e.student_id IN :student_ids
+                FOR UPDATE
+            """, 'student_ids')
+            rows = db.session.execute(lookup_query, {
+                'course_id': data['course_id'],
+                'attendance_date': data['attendance_date'],
+                'student_ids': list(valid)
+            }).fetchall()
+            existing = {row.student_id: row.status for row in rows}
+        
+        values = []
+        params = {
+            'course_id': data['course_id'],
+            'attendance_date': data['attendance_date'],
+            'marked_by': data['marked_by']
+        }
+        for i, (student_id, (result, notes)) in enumerate(valid.items()):
+            if student_id not in existing:
+                result.update(outcome='error', error='Student is not enrolled in this course')
+                continue
+            values.append(f"(:student_id_{i}, :course_id, :attendance_date, :status_{i}, :marked_by, :notes_{i}, NOW())")
+            params[f'student_id_{i}'] = student_id
+            params[f'status_{i}'] = result['status']
+            params[f'notes_{i}'] = notes
+            result['outcome'] = 'updated' if existing[student_id] is not None else 'created'
+        
+        if not values:
+            return jsonify({'error': 'No valid attendance records', 'results': results}), 400
+        
+        # Single multi-row upsert for the whole session
+        upsert_query = sql(f"""
+            INSERT INTO attendance 
+            (student_id, course_id, attendance_date, status, marked_by, notes, created_at)
+            VALUES 
+            {', '.join(values)}
+            ON DUPLICATE KEY UPDATE
+                status = VALUES(status),
+                marked_by = VALUES(marked_by),
+                notes = VALUES(notes)
+        """)
+        
+        written = [student_id for student_id, (result, notes) in valid.items() if result['outcome'] != 'error']
+        db.session.execute(upsert_query, params)
+        apply_attendance_changes(data['course_id'], [
+            (student_id, existing[student_id], valid[student_id][0]['status']) for student_id in written
+        ])
+        db.session.commit()
+        notify_write('attendance', course_id=data['course_id'], student_ids=written)
+        
+        outcomes = [result['outcome'] for result in results]
+        return jsonify({
+            'message': 'Attendance marked successfully',
+            'created': outcomes.count('created'),
+            'updated': outcomes.count('updated'),
+            'failed': outcomes.count('error'),
+            'results': results
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+
 # READ - Get all
 @bp.route('/', methods=['GET'])
 def get_attendance():
@@ -69,27 +195,39 @@ def get_attendance():
         
         where_clause = "WHERE " + " AND ".join(conditions) if conditions else ""
         
-        query = text(f"""
+        select_sql = f"""
             SELECT 
                 a.*,
                 s.enrollment_number,
                 u.first_name as student_first_name,
-                u.last_name as student_last_name,
-                c.course_code,
-                c.course_name
+                u.last_name as student_last_name
             FROM attendance a
             INNER JOIN students s ON a.student_id = s.student_id
             INNER JOIN users u ON s.user_id = u.user_id
-            INNER JOIN courses c ON a.course_id = c.course_id
             {where_clause}
-            ORDER BY a.attendance_date DESC
-        """)
+            ORDER BY a.attendance_date DESC, a.course_id, a.student_id
+        """
         
-        attendance = db.session.execute(query, params).fetchall()
+        # Stream every matching row when asked for NDJSON, otherwise return one page
+        if wants_ndjson():
+            return stream_ndjson(sql(select_sql), params, transform=with_course_names)
         
-        return jsonify({
-            'attendance': [dict(row._mapping) for row in attendance]
-        }), 200
+        page, per_page, offset = get_page_args()
+        try:
+            total_mode = get_total_mode(default='false')
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        query = sql(select_sql + "LIMIT :limit OFFSET :offset")
+        count_query = sql(f"SELECT COUNT(*) as total FROM attendance a {where_clause}")
+        
+        attendance = db.session.execute(query, {**params, 'limit': per_page + 1, 'offset': offset}).fetchall()
+        more = has_more(attendance, per_page)
+        # Course names come from the reference cache instead of a join
+        attendance = with_course_names(attendance)
+        total, total_estimated = resolve_total(total_mode, count_query, params, count_cache, 'attendance')
+        
+        return list_response(page_response('attendance', attendance, page, per_page, more, total, total_estimated), 'attendance')
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -99,7 +237,7 @@ def get_attendance():
 @bp.route('/<int:student_id>/<int:course_id>/<string:attendance_date>', methods=['GET'])
 def get_single_attendance(student_id, course_id, attendance_date):
     try:
-        query = text("SELECT * FROM attendance WHERE student_id = :student_id AND course_id = :course_id AND attendance_date = :attendance_date")
+        query = sql("SELECT * FROM attendance WHERE student_id = :student_id AND course_id = :course_id AND attendance_date = :attendance_date")
         attendance = db.session.execute(query, {
             'student_id': student_id,
             'course_id': course_id,
@@ -134,14 +272,30 @@ def update_attendance(student_id, course_id, attendance_date):
         if not set_clauses:
             return jsonify({'error': 'No fields to update'}), 400
         
-        update_query = text(f"""
+        # Lock the row and read its current status so the enrollment counters can be adjusted
+        if 'status' in data:
+            current_query = sql("""
+                SELECT status FROM attendance
+                WHERE student_id = :student_id AND course_id = :course_id AND attendance_date = :attendance_date
+                FOR UPDATE
+            """)
+            old_status = db.session.execute(current_query, {
+                'student_id': student_id,
+                'course_id': course_id,
+                'attendance_date': attendance_date
+            }).scalar()
+        
+        update_query = sql(f"""
             UPDATE attendance 
             SET {', '.join(set_clauses)}
             WHERE student_id = :student_id AND course_id = :course_id AND attendance_date = :attendance_date
         """)
         
         db.session.execute(update_query, params)
+        if 'status' in data and old_status is not None:
+            apply_attendance_changes(course_id, [(student_id, old_status, data['status'])])
         db.session.commit()
+        notify_write('attendance', student_id=student_id, course_id=course_id)
         
         return jsonify({'message': 'Attendance updated successfully'}), 200
         
@@ -154,13 +308,24 @@ def update_attendance(student_id, course_id, attendance_date):
 @bp.route('/<int:student_id>/<int:course_id>/<string:attendance_date>', methods=['DELETE'])
 def delete_attendance(student_id, course_id, attendance_date):
     try:
-        delete_query = text("DELETE FROM attendance WHERE student_id = :student_id AND course_id = :course_id AND attendance_date = :attendance_date")
-        result = db.session.execute(delete_query, {
+        key = {
             'student_id': student_id,
             'course_id': course_id,
             'attendance_date': attendance_date
-        })
+        }
+        current_query = sql("""
+            SELECT status FROM attendance
+            WHERE student_id = :student_id AND course_id = :course_id AND attendance_date = :attendance_date
+            FOR UPDATE
+        """)
+        old_status = db.session.execute(current_query, key).scalar()
+        
+        delete_query = sql("DELETE FROM attendance WHERE student_id = :student_id AND course_id = :course_id AND attendance_date = :attendance_date")
+        result = db.session.execute(delete_query, key)
+        if result.rowcount:
+            apply_attendance_changes(course_id, [(student_id, old_status, None)])
         db.session.commit()
+        notify_write('attendance', student_id=student_id, course_id=course_id)
         
         if result.rowcount == 0:
             return jsonify({'error': 'Attendance not found'}), 404
@@ -176,7 +341,37 @@ def delete_attendance(student_id, course_id, attendance_date):
 @bp.route('/summary/<int:student_id>/<int:course_id>', methods=['GET'])
 def get_attendance_summary(student_id, course_id):
     try:
-        query = text("""
+        # Enrolled students read the counters maintained on every attendance write
+        counters_query = sql("""
+            SELECT classes_held, classes_attended, classes_late, classes_excused, attendance_percentage
+            FROM enrollments
+            WHERE student_id = :student_id AND course_id = :course_id
+        """)
+        counters = db.session.execute(counters_query, {
+            'student_id': student_id,
+            'course_id': course_id
+        }).fetchone()
+        
+        if counters:
+            held = counters.classes_held or 0
+            present = counters.classes_attended or 0
+            late = counters.classes_late or 0
+            excused = counters.classes_excused or 0
+            return jsonify({
+                'summary': {
+                    'student_id': student_id,
+                    'course_id': course_id,
+                    'total_classes': held,
+                    'present': present,
+                    'absent': held - present - late - excused,
+                    'late': late,
+                    'excused': excused,
+                    'attendance_percentage': round(float(counters.attendance_percentage or 0), 2)
+                }
+            }), 200
+        
+        # Not enrolled - fall back to scanning the attendance history
+        query = sql("""
             SELECT 
                 COUNT(*) as total_classes,
                 SUM(CASE WHEN status = 'present' THEN 1 ELSE 0 END) as present,
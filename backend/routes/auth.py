@@ -1,11 +1,13 @@
+import logging
 from flask import Blueprint, request, jsonify
 from database import db
-from sqlalchemy import text
-from werkzeug.security import check_password_hash
+from statements import sql
+from passwords import verify_password, needs_rehash, hash_password, PasswordHasherBusy
 from config import Config
 from auth_utils import generate_access_token, token_required
 
 bp = Blueprint('auth', __name__, url_prefix='/api/auth')
+logger = logging.getLogger(__name__)
 
 @bp.route('/login', methods=['POST'])
 def login():
@@ -21,7 +23,7 @@ def login():
             return jsonify({'error': 'Email, password, and role are required'}), 400
         
         # Query user by email and role
-        query = text("""
+        query = sql("""
             SELECT user_id, email, password_hash, role, first_name, last_name, is_active
             FROM users
             WHERE email = :email AND role = :role
@@ -36,8 +38,24 @@ def login():
             return jsonify({'error': 'Account is inactive'}), 401
         
         # Verify password
-        if not check_password_hash(user.password_hash, password):
-            return jsonify({'error': 'Invalid credentials'}), 401
+        try:
+            if not verify_password(user.password_hash, password):
+                return jsonify({'error': 'Invalid credentials'}), 401
+        except PasswordHasherBusy as e:
+            return jsonify({'error': str(e)}), 503
+        
+        # Upgrade hashes made with an older method or cost while we have the plain password.
+        # Best effort: if the hashing pool is busy the upgrade waits for a later login.
+        if needs_rehash(user.password_hash):
+            try:
+                rehash_query = sql("UPDATE users SET password_hash = :password_hash WHERE user_id = :user_id")
+                db.session.execute(rehash_query, {
+                    'password_hash': hash_password(password),
+                    'user_id': user.user_id
+                })
+                db.session.commit()
+            except PasswordHasherBusy:
+                pass
         
         # Return user data (without password hash)
         user_data = {
@@ -50,13 +68,13 @@ def login():
         
         # Add student_id or faculty_id based on role
         if user.role == 'student':
-            student_query = text("SELECT student_id, department_id FROM students WHERE user_id = :user_id")
+            student_query = sql("SELECT student_id, department_id FROM students WHERE user_id = :user_id")
             student = db.session.execute(student_query, {'user_id': user.user_id}).fetchone()
             if student:
                 user_data['student_id'] = student.student_id
                 user_data['department_id'] = student.department_id
         elif user.role == 'faculty':
-            faculty_query = text("SELECT faculty_id, department_id FROM faculty WHERE user_id = :user_id")
+            faculty_query = sql("SELECT faculty_id, department_id FROM faculty WHERE user_id = :user_id")
             faculty = db.session.execute(faculty_query, {'user_id': user.user_id}).fetchone()
             if faculty:
                 user_data['faculty_id'] = faculty.faculty_id
@@ -75,7 +93,7 @@ def login():
         }), 200
         
     except Exception as e:
-        print(f"Login error: {str(e)}")
+        logger.exception('Login failed')
         return jsonify({'error': 'Login failed'}), 500
 
 
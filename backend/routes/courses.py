@@ -1,8 +1,16 @@
+import logging
 from flask import Blueprint, request, jsonify
 from database import db
-from sqlalchemy import text
+from statements import sql
+from writes import written_row
+from columnar import list_response
+from reference import attach
+from cgpa import graded_students, lock_course, recompute_students
+from cache import notify_write
+from conditional import conditional
 
 bp = Blueprint('courses', __name__, url_prefix='/api/courses')
+logger = logging.getLogger(__name__)
 
 # CREATE
 @bp.route('/', methods=['POST'])
@@ -10,14 +18,14 @@ def create_course():
     try:
         data = request.get_json()
         
-        insert_query = text("""
+        insert_query = sql("""
             INSERT INTO courses 
             (course_code, course_name, department_id, faculty_id, semester, credits, max_students, total_classes, created_at)
             VALUES 
             (:course_code, :course_name, :department_id, :faculty_id, :semester, :credits, :max_students, :total_classes, NOW())
         """)
         
-        result = db.session.execute(insert_query, {
+        values = {
             'course_code': data['course_code'],
             'course_name': data['course_name'],
             'department_id': data['department_id'],
@@ -26,16 +34,19 @@ def create_course():
             'credits': data.get('credits', 3),
             'max_students': data.get('max_students', 60),
             'total_classes': data.get('total_classes', 45)
-        })
+        }
+        result = db.session.execute(insert_query, values)
         
         db.session.commit()
+        notify_write('courses', course_id=result.lastrowid)
         
-        select_query = text("SELECT * FROM courses WHERE course_id = :id")
-        course = db.session.execute(select_query, {'id': result.lastrowid}).fetchone()
+        # Echo the written values; re-read only for ?return=representation
+        select_query = sql("SELECT * FROM courses WHERE course_id = :id")
+        course = written_row({'course_id': result.lastrowid, **values}, select_query, {'id': result.lastrowid})
         
         return jsonify({
             'message': 'Course created successfully',
-            'course': dict(course._mapping)
+            'course': course
         }), 201
         
     except Exception as e:
@@ -45,9 +56,10 @@ def create_course():
 
 # READ - Get all
 @bp.route('/', methods=['GET'])
+@conditional('courses', 'departments', 'faculty', 'users')
 def get_courses():
     try:
-        query = text("""
+        query = sql("""
             SELECT 
                 c.course_id,
                 c.course_code,
@@ -58,28 +70,23 @@ def get_courses():
                 c.credits,
                 c.max_students,
                 c.total_classes,
-                c.created_at,
-                d.department_name,
-                f.designation,
-                u.first_name as faculty_first_name,
-                u.last_name as faculty_last_name
+                c.created_at
             FROM courses c
-            INNER JOIN departments d ON c.department_id = d.department_id
-            LEFT JOIN faculty f ON c.faculty_id = f.faculty_id
-            LEFT JOIN users u ON f.user_id = u.user_id
             ORDER BY c.course_code
         """)
         
         courses = db.session.execute(query).fetchall()
+        # Department and faculty names come from the reference cache instead of joins
+        courses = attach(courses, 'departments', 'department_id', department_name='department_name')
+        courses = attach(courses, 'faculty', 'faculty_id', designation='designation',
+                         faculty_first_name='first_name', faculty_last_name='last_name')
         
-        return jsonify({
-            'courses': [dict(row._mapping) for row in courses]
-        }), 200
+        return list_response({
+            'courses': courses
+        }, 'courses')
         
     except Exception as e:
-        print(f"Error fetching courses: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception('get_courses failed')
         return jsonify({'error': str(e)}), 500
 
 
@@ -87,7 +94,7 @@ def get_courses():
 @bp.route('/<int:course_id>', methods=['GET'])
 def get_course(course_id):
     try:
-        query = text("SELECT * FROM courses WHERE course_id = :id")
+        query = sql("SELECT * FROM courses WHERE course_id = :id")
         course = db.session.execute(query, {'id': course_id}).fetchone()
         
         if not course:
@@ -121,14 +128,21 @@ def update_course(course_id):
         if not set_clauses:
             return jsonify({'error': 'No fields to update'}), 400
         
-        update_query = text(f"""
+        update_query = sql(f"""
             UPDATE courses 
             SET {', '.join(set_clauses)}
             WHERE course_id = :course_id
         """)
         
         db.session.execute(update_query, params)
+        # Credits weigh every grade of the course in its students' CGPA; the UPDATE above
+        # holds the course row, and the grade rows stay locked until the recompute commits
+        regraded = graded_students(course_id, lock=True) if 'credits' in data else []
+        recompute_students(regraded)
         db.session.commit()
+        notify_write('courses', course_id=course_id)
+        if regraded:
+            notify_write('students', student_ids=regraded)
         
         return jsonify({'message': 'Course updated successfully'}), 200
         
@@ -141,9 +155,21 @@ def update_course(course_id):
 @bp.route('/<int:course_id>', methods=['DELETE'])
 def delete_course(course_id):
     try:
-        delete_query = text("DELETE FROM courses WHERE course_id = :id")
+        # Deleting the course cascades to its grades, which leave their students' CGPA
+        lock_course(course_id, exclusive=True)
+        regraded = graded_students(course_id, lock=True)
+        # ... and to its enrollments, which leave their students' attendance summary
+        enrolled_query = sql("SELECT student_id FROM enrollments WHERE course_id = :course_id")
+        enrolled = [row.student_id for row in db.session.execute(enrolled_query, {'course_id': course_id})]
+        delete_query = sql("DELETE FROM courses WHERE course_id = :id")
         result = db.session.execute(delete_query, {'id': course_id})
+        recompute_students(regraded)
         db.session.commit()
+        notify_write('courses', course_id=course_id)
+        if regraded:
+            notify_write('students', student_ids=regraded)
+        if enrolled:
+            notify_write('enrollments', course_id=course_id, student_ids=enrolled)
         
         if result.rowcount == 0:
             return jsonify({'error': 'Course not found'}), 404
@@ -1,38 +1,53 @@
 from flask import Blueprint, request, jsonify
 from database import db
-from sqlalchemy import text
+from statements import sql
+from config import Config
+from writes import written_row
+from cache import notify_write
+from conditional import VersionedCache, conditional
+from singleflight import single_flight
 
 bp = Blueprint('departments', __name__, url_prefix='/api/departments')
 
+# Department head counts, served until any worker writes a department, student, faculty or course
+stats_cache = VersionedCache(
+    ('departments', 'students', 'faculty', 'courses'),
+    ttl_seconds=Config.DEPARTMENT_STATS_CACHE_SECONDS
+)
+
+
 # CREATE
 @bp.route('/', methods=['POST'])
 def create_department():
     try:
         data = request.get_json()
         
-        insert_query = text("""
+        insert_query = sql("""
             INSERT INTO departments 
             (department_code, department_name, head_of_department, contact_email, is_active, created_at)
             VALUES 
             (:department_code, :department_name, :head_of_department, :contact_email, :is_active, NOW())
         """)
         
-        result = db.session.execute(insert_query, {
+        values = {
             'department_code': data['department_code'],
             'department_name': data['department_name'],
             'head_of_department': data.get('head_of_department'),
             'contact_email': data.get('contact_email'),
             'is_active': data.get('is_active', True)
-        })
+        }
+        result = db.session.execute(insert_query, values)
         
         db.session.commit()
+        notify_write('departments', department_id=result.lastrowid)
         
-        select_query = text("SELECT * FROM departments WHERE department_id = :id")
-        dept = db.session.execute(select_query, {'id': result.lastrowid}).fetchone()
+        # Echo the written values; re-read only for ?return=representation
+        select_query = sql("SELECT * FROM departments WHERE department_id = :id")
+        dept = written_row({'department_id': result.lastrowid, **values}, select_query, {'id': result.lastrowid})
         
         return jsonify({
             'message': 'Department created successfully',
-            'department': dict(dept._mapping)
+            'department': dept
         }), 201
         
     except Exception as e:
@@ -42,13 +57,14 @@ def create_department():
 
 # READ - Get all
 @bp.route('/', methods=['GET'])
+@conditional('departments')
 def get_departments():
     try:
-        query = text("SELECT * FROM departments ORDER BY department_name")
+        query = sql("SELECT * FROM departments ORDER BY department_name")
         departments = db.session.execute(query).fetchall()
         
         return jsonify({
-            'departments': [dict(row._mapping) for row in departments]
+            'departments': departments
         }), 200
         
     except Exception as e:
@@ -59,7 +75,7 @@ def get_departments():
 @bp.route('/<int:department_id>', methods=['GET'])
 def get_department(department_id):
     try:
-        query = text("SELECT * FROM departments WHERE department_id = :id")
+        query = sql("SELECT * FROM departments WHERE department_id = :id")
         dept = db.session.execute(query, {'id': department_id}).fetchone()
         
         if not dept:
@@ -93,7 +109,7 @@ def update_department(department_id):
         if not set_clauses:
             return jsonify({'error': 'No fields to update'}), 400
         
-        update_query = text(f"""
+        update_query = sql(f"""
             UPDATE departments 
             SET {', '.join(set_clauses)}
             WHERE department_id = :department_id
@@ -101,6 +117,7 @@ def update_department(department_id):
         
         db.session.execute(update_query, params)
         db.session.commit()
+        notify_write('departments', department_id=department_id)
         
         return jsonify({'message': 'Department updated successfully'}), 200
         
@@ -113,9 +130,10 @@ def update_department(department_id):
 @bp.route('/<int:department_id>', methods=['DELETE'])
 def delete_department(department_id):
     try:
-        delete_query = text("DELETE FROM departments WHERE department_id = :id")
+        delete_query = sql("DELETE FROM departments WHERE department_id = :id")
         result = db.session.execute(delete_query, {'id': department_id})
         db.session.commit()
+        notify_write('departments', department_id=department_id)
         
         if result.rowcount == 0:
             return jsonify({'error': 'Department not found'}), 404
@@ -127,31 +145,73 @@ def delete_department(department_id):
         return jsonify({'error': str(e)}), 500
 
 
+# STATISTICS - Every department in one query
+@bp.route('/stats', methods=['GET'])
+@single_flight()
+def get_all_department_stats():
+    try:
+        def load():
+            # Each count is aggregated on its own before the join, so rows never multiply
+            query = sql("""
+                SELECT 
+                    d.department_id,
+                    d.department_name,
+                    COALESCE(s.total_students, 0) as total_students,
+                    COALESCE(f.total_faculty, 0) as total_faculty,
+                    COALESCE(c.total_courses, 0) as total_courses
+                FROM departments d
+                LEFT JOIN (
+                    SELECT department_id, COUNT(*) as total_students
+                    FROM students GROUP BY department_id
+                ) s ON d.department_id = s.department_id
+                LEFT JOIN (
+                    SELECT department_id, COUNT(*) as total_faculty
+                    FROM faculty GROUP BY department_id
+                ) f ON d.department_id = f.department_id
+                LEFT JOIN (
+                    SELECT department_id, COUNT(*) as total_courses
+                    FROM courses GROUP BY department_id
+                ) c ON d.department_id = c.department_id
+                ORDER BY d.department_name
+            """)
+            
+            rows = db.session.execute(query).fetchall()
+            return [dict(row._mapping) for row in rows]
+        
+        stats = stats_cache.get_or_build('all', load)
+        
+        return jsonify({'stats': stats}), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
 # STATISTICS
 @bp.route('/<int:department_id>/stats', methods=['GET'])
+@single_flight()
 def get_department_stats(department_id):
     try:
-        query = text("""
-            SELECT 
-                d.department_id,
-                d.department_name,
-                COUNT(DISTINCT s.student_id) as total_students,
-                COUNT(DISTINCT f.faculty_id) as total_faculty,
-                COUNT(DISTINCT c.course_id) as total_courses
-            FROM departments d
-            LEFT JOIN students s ON d.department_id = s.department_id
-            LEFT JOIN faculty f ON d.department_id = f.department_id
-            LEFT JOIN courses c ON d.department_id = c.department_id
-            WHERE d.department_id = :id
-            GROUP BY d.department_id, d.department_name
-        """)
-        
-        stats = db.session.execute(query, {'id': department_id}).fetchone()
+        def load():
+            # Independent indexed counts instead of COUNT(DISTINCT) over a students x faculty x courses join
+            query = sql("""
+                SELECT 
+                    d.department_id,
+                    d.department_name,
+                    (SELECT COUNT(*) FROM students s WHERE s.department_id = d.department_id) as total_students,
+                    (SELECT COUNT(*) FROM faculty f WHERE f.department_id = d.department_id) as total_faculty,
+                    (SELECT COUNT(*) FROM courses c WHERE c.department_id = d.department_id) as total_courses
+                FROM departments d
+                WHERE d.department_id = :id
+            """)
+            
+            row = db.session.execute(query, {'id': department_id}).fetchone()
+            return dict(row._mapping) if row else None
         
-        if not stats:
+        stats = stats_cache.get_or_build(department_id, load)
+        if stats is None:
             return jsonify({'error': 'Department not found'}), 404
         
-        return jsonify({'stats': dict(stats._mapping)}), 200
+        return jsonify({'stats': stats}), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
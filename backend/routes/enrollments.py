@@ -1,43 +1,78 @@
 from flask import Blueprint, request, jsonify
 from database import db
-from sqlalchemy import text
+from statements import sql
+from config import Config
+from writes import written_row
+from cache import TTLCache, on_write, notify_write
+from pagination import get_page_args, get_total_mode, resolve_total, has_more, page_response
+from streaming import wants_ndjson, stream_ndjson
+from columnar import list_response
+from reference import with_course_names
 
 bp = Blueprint('enrollments', __name__, url_prefix='/api/enrollments')
 
+# Recent COUNT(*) results keyed by filter set, cleared on writes
+count_cache = TTLCache(ttl_seconds=Config.COUNT_CACHE_TTL_SECONDS)
+
+
+@on_write('enrollments')
+def _clear_count_cache(table, **keys):
+    count_cache.clear()
+
+
+# Kept in step with the attendance table by attendance_counters; clients cannot set them
+COUNTER_FIELDS = ('classes_attended', 'classes_held', 'classes_late', 'classes_excused', 'attendance_percentage')
+
+
+def _counter_fields_error(data):
+    """Return a 400 response naming any counter fields in the body, else None."""
+    supplied = [field for field in COUNTER_FIELDS if field in data]
+    if supplied:
+        return jsonify({
+            'error': f"{', '.join(supplied)} cannot be set; they are derived from attendance records"
+        }), 400
+    return None
+
+
 # CREATE
 @bp.route('/', methods=['POST'])
 def create_enrollment():
     try:
         data = request.get_json()
+        error = _counter_fields_error(data)
+        if error:
+            return error
         
-        insert_query = text("""
+        # The counters start at their column defaults (0) until attendance is marked
+        insert_query = sql("""
             INSERT INTO enrollments 
-            (student_id, course_id, enrollment_date, status, classes_attended, classes_held, attendance_percentage)
+            (student_id, course_id, enrollment_date, status)
             VALUES 
-            (:student_id, :course_id, NOW(), :status, :classes_attended, :classes_held, :attendance_percentage)
+            (:student_id, :course_id, NOW(), :status)
         """)
         
-        result = db.session.execute(insert_query, {
+        values = {
             'student_id': data['student_id'],
             'course_id': data['course_id'],
-            'status': data.get('status', 'enrolled'),
-            'classes_attended': data.get('classes_attended', 0),
-            'classes_held': data.get('classes_held', 0),
-            'attendance_percentage': data.get('attendance_percentage', 0.00)
-        })
+            'status': data.get('status', 'enrolled')
+        }
+        db.session.execute(insert_query, values)
         
         db.session.commit()
+        notify_write('enrollments', student_id=data['student_id'], course_id=data['course_id'])
         
-        # Composite key - fetch by student_id and course_id
-        select_query = text("SELECT * FROM enrollments WHERE student_id = :student_id AND course_id = :course_id")
-        enrollment = db.session.execute(select_query, {
+        # Echo the written values; re-read only for ?return=representation
+        select_query = sql("SELECT * FROM enrollments WHERE student_id = :student_id AND course_id = :course_id")
+        counters = {'classes_attended': 0, 'classes_held': 0, 'classes_late': 0, 'classes_excused': 0,
+                    'attendance_percentage': 0.00}
+        enrollment = written_row({**values, **counters}, select_query, {
             'student_id': data['student_id'],
             'course_id': data['course_id']
-        }).fetchone()
+        })
         
         return jsonify({
             'message': 'Enrollment created successfully',
-            'enrollment': dict(enrollment._mapping)
+            'enrollment': enrollment
         }), 201
         
     except Exception as e:
@@ -64,27 +99,39 @@ def get_enrollments():
         
         where_clause = "WHERE " + " AND ".join(conditions) if conditions else ""
         
-        query = text(f"""
+        select_sql = f"""
             SELECT 
                 e.*,
                 s.enrollment_number,
                 u.first_name as student_first_name,
-                u.last_name as student_last_name,
-                c.course_code,
-                c.course_name
+                u.last_name as student_last_name
             FROM enrollments e
             INNER JOIN students s ON e.student_id = s.student_id
             INNER JOIN users u ON s.user_id = u.user_id
-            INNER JOIN courses c ON e.course_id = c.course_id
             {where_clause}
-            ORDER BY e.enrollment_date DESC
-        """)
+            ORDER BY e.enrollment_date DESC, e.student_id, e.course_id
+        """
         
-        enrollments = db.session.execute(query, params).fetchall()
+        # Stream every matching row when asked for NDJSON, otherwise return one page
+        if wants_ndjson():
+            return stream_ndjson(sql(select_sql), params, transform=with_course_names)
         
-        return jsonify({
-            'enrollments': [dict(row._mapping) for row in enrollments]
-        }), 200
+        page, per_page, offset = get_page_args()
+        try:
+            total_mode = get_total_mode(default='false')
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        query = sql(select_sql + "LIMIT :limit OFFSET :offset")
+        count_query = sql(f"SELECT COUNT(*) as total FROM enrollments e {where_clause}")
+        
+        enrollments = db.session.execute(query, {**params, 'limit': per_page + 1, 'offset': offset}).fetchall()
+        more = has_more(enrollments, per_page)
+        # Course names come from the reference cache instead of a join
+        enrollments = with_course_names(enrollments)
+        total, total_estimated = resolve_total(total_mode, count_query, params, count_cache, 'enrollments')
+        
+        return list_response(page_response('enrollments', enrollments, page, per_page, more, total, total_estimated), 'enrollments')
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -94,7 +141,7 @@ def get_enrollments():
 @bp.route('/<int:student_id>/<int:course_id>', methods=['GET'])
 def get_enrollment(student_id, course_id):
     try:
-        query = text("SELECT * FROM enrollments WHERE student_id = :student_id AND course_id = :course_id")
+        query = sql("SELECT * FROM enrollments WHERE student_id = :student_id AND course_id = :course_id")
         enrollment = db.session.execute(query, {
             'student_id': student_id,
             'course_id': course_id
@@ -114,6 +161,9 @@ def get_enrollment(student_id, course_id):
 def update_enrollment(student_id, course_id):
     try:
         data = request.get_json()
+        error = _counter_fields_error(data)
+        if error:
+            return error
         
         set_clauses = []
         params = {'student_id': student_id, 'course_id': course_id}
@@ -121,37 +171,11 @@ def update_enrollment(student_id, course_id):
         if 'status' in data:
             set_clauses.append("status = :status")
             params['status'] = data['status']
-        if 'classes_attended' in data:
-            set_clauses.append("classes_attended = :classes_attended")
-            params['classes_attended'] = data['classes_attended']
-        if 'classes_held' in data:
-            set_clauses.append("classes_held = :classes_held")
-            params['classes_held'] = data['classes_held']
-        
-        # Auto-calculate attendance percentage
-        if 'classes_attended' in data or 'classes_held' in data:
-            # Get current values if not provided
-            current_query = text("SELECT classes_attended, classes_held FROM enrollments WHERE student_id = :student_id AND course_id = :course_id")
-            current = db.session.execute(current_query, {
-                'student_id': student_id,
-                'course_id': course_id
-            }).fetchone()
-            
-            attended = data.get('classes_attended', current.classes_attended)
-            held = data.get('classes_held', current.classes_held)
-            
-            if held > 0:
-                percentage = (attended / held) * 100
-            else:
-                percentage = 0.00
-            
-            set_clauses.append("attendance_percentage = :attendance_percentage")
-            params['attendance_percentage'] = percentage
         
         if not set_clauses:
             return jsonify({'error': 'No fields to update'}), 400
         
-        update_query = text(f"""
+        update_query = sql(f"""
             UPDATE enrollments 
             SET {', '.join(set_clauses)}
             WHERE student_id = :student_id AND course_id = :course_id
@@ -159,6 +183,7 @@ def update_enrollment(student_id, course_id):
         
         db.session.execute(update_query, params)
         db.session.commit()
+        notify_write('enrollments', student_id=student_id, course_id=course_id)
         
         return jsonify({'message': 'Enrollment updated successfully'}), 200
         
@@ -171,12 +196,13 @@ def update_enrollment(student_id, course_id):
 @bp.route('/<int:student_id>/<int:course_id>', methods=['DELETE'])
 def delete_enrollment(student_id, course_id):
     try:
-        delete_query = text("DELETE FROM enrollments WHERE student_id = :student_id AND course_id = :course_id")
+        delete_query = sql("DELETE FROM enrollments WHERE student_id = :student_id AND course_id = :course_id")
         result = db.session.execute(delete_query, {
             'student_id': student_id,
             'course_id': course_id
         })
         db.session.commit()
+        notify_write('enrollments', student_id=student_id, course_id=course_id)
         
         if result.rowcount == 0:
             return jsonify({'error': 'Enrollment not found'}), 404
@@ -1,39 +1,64 @@
 from flask import Blueprint, request, jsonify
+from config import Config
 from database import db
-from sqlalchemy import text
+from statements import sql
+from writes import written_row
+from cache import on_write, notify_write
+from conditional import VersionedCache, conditional
+from reference import attach, reference_data
 
 bp = Blueprint('faculty', __name__, url_prefix='/api/faculty')
 
+# Faculty dashboards keyed by faculty_id, rebuilt once a faculty, courses, students, users or departments
+# write moves table_versions. Enrollment, attendance and grade writes drop just the course's teacher
+dashboard_cache = VersionedCache(
+    ('faculty', 'courses', 'students', 'users', 'departments'),
+    ttl_seconds=Config.DASHBOARD_CACHE_SECONDS
+)
+
+
+@on_write('enrollments', 'attendance', 'grades')
+def _drop_faculty_dashboards(table, course_id=None, **keys):
+    course = reference_data.lookup('courses').get(course_id) if course_id is not None else None
+    if course is None:
+        dashboard_cache.clear()
+    else:
+        dashboard_cache.discard(course.faculty_id)
+
+
 # CREATE
 @bp.route('/', methods=['POST'])
 def create_faculty():
     try:
         data = request.get_json()
         
-        insert_query = text("""
+        insert_query = sql("""
             INSERT INTO faculty 
             (user_id, department_id, designation, qualification, joining_date, status, created_at)
             VALUES 
             (:user_id, :department_id, :designation, :qualification, :joining_date, :status, NOW())
         """)
         
-        result = db.session.execute(insert_query, {
+        values = {
             'user_id': data['user_id'],
             'department_id': data['department_id'],
             'designation': data['designation'],
             'qualification': data['qualification'],
             'joining_date': data['joining_date'],
             'status': data.get('status', 'active')
-        })
+        }
+        result = db.session.execute(insert_query, values)
         
         db.session.commit()
+        notify_write('faculty', faculty_id=result.lastrowid)
         
-        select_query = text("SELECT * FROM faculty WHERE faculty_id = :id")
-        faculty = db.session.execute(select_query, {'id': result.lastrowid}).fetchone()
+        # Echo the written values; re-read only for ?return=representation
+        select_query = sql("SELECT * FROM faculty WHERE faculty_id = :id")
+        faculty = written_row({'faculty_id': result.lastrowid, **values}, select_query, {'id': result.lastrowid})
         
         return jsonify({
             'message': 'Faculty created successfully',
-            'faculty': dict(faculty._mapping)
+            'faculty': faculty
         }), 201
         
     except Exception as e:
@@ -43,9 +68,10 @@ def create_faculty():
 
 # READ - Get all
 @bp.route('/', methods=['GET'])
+@conditional('faculty', 'users', 'departments')
 def get_faculty():
     try:
-        query = text("""
+        query = sql("""
             SELECT 
                 f.*,
                 u.first_name,
@@ -61,7 +87,7 @@ def get_faculty():
         faculty = db.session.execute(query).fetchall()
         
         return jsonify({
-            'faculty': [dict(row._mapping) for row in faculty]
+            'faculty': faculty
         }), 200
         
     except Exception as e:
@@ -72,7 +98,7 @@ def get_faculty():
 @bp.route('/<int:faculty_id>', methods=['GET'])
 def get_single_faculty(faculty_id):
     try:
-        query = text("""
+        query = sql("""
             SELECT f.*, u.first_name, u.last_name, u.email, d.department_name
             FROM faculty f
             INNER JOIN users u ON f.user_id = u.user_id
@@ -113,7 +139,7 @@ def update_faculty(faculty_id):
         if not set_clauses:
             return jsonify({'error': 'No fields to update'}), 400
         
-        update_query = text(f"""
+        update_query = sql(f"""
             UPDATE faculty 
             SET {', '.join(set_clauses)}
             WHERE faculty_id = :faculty_id
@@ -121,6 +147,7 @@ def update_faculty(faculty_id):
         
         db.session.execute(update_query, params)
         db.session.commit()
+        notify_write('faculty', faculty_id=faculty_id)
         
         return jsonify({'message': 'Faculty updated successfully'}), 200
         
@@ -133,9 +160,10 @@ def update_faculty(faculty_id):
 @bp.route('/<int:faculty_id>', methods=['DELETE'])
 def delete_faculty(faculty_id):
     try:
-        delete_query = text("DELETE FROM faculty WHERE faculty_id = :id")
+        delete_query = sql("DELETE FROM faculty WHERE faculty_id = :id")
         result = db.session.execute(delete_query, {'id': faculty_id})
         db.session.commit()
+        notify_write('faculty', faculty_id=faculty_id)
         
         if result.rowcount == 0:
             return jsonify({'error': 'Faculty not found'}), 404
@@ -150,7 +178,7 @@ def delete_faculty(faculty_id):
 @bp.route('/<int:faculty_id>/courses', methods=['GET'])
 def get_faculty_courses(faculty_id):
     try:
-        query = text("""
+        query = sql("""
             SELECT 
                 c.course_id,
                 c.course_code,
@@ -160,17 +188,16 @@ def get_faculty_courses(faculty_id):
                 c.semester,
                 c.max_students,
                 c.total_classes,
-                c.created_at,
-                d.department_name
+                c.created_at
             FROM courses c
-            INNER JOIN departments d ON c.department_id = d.department_id
             WHERE c.faculty_id = :faculty_id
             ORDER BY c.course_code
         """)
         
         courses = db.session.execute(query, {'faculty_id': faculty_id}).fetchall()
         
-        course_list = [dict(course._mapping) for course in courses]
+        # Department names come from the reference cache instead of a join
+        course_list = attach(courses, 'departments', 'department_id', department_name='department_name')
         
         return jsonify({
             'courses': course_list,
@@ -179,3 +206,111 @@ def get_faculty_courses(faculty_id):
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
+
+
+# DASHBOARD - Courses, rosters, attendance counters and grades for one faculty member
+@bp.route('/<int:faculty_id>/dashboard', methods=['GET'])
+def get_faculty_dashboard(faculty_id):
+    try:
+        # Rosters carry every student's marks: only admins and the faculty member themselves
+        if request.user['role'] not in ('admin', 'faculty'):
+            return jsonify({'error': 'Forbidden: insufficient permissions'}), 403
+        
+        dashboard = dashboard_cache.get_or_build(faculty_id, lambda: build_faculty_dashboard(faculty_id))
+        if dashboard is None:
+            return jsonify({'error': 'Faculty not found'}), 404
+        
+        # Faculty members may only open their own dashboard
+        if request.user['role'] == 'faculty' and str(dashboard['faculty']['user_id']) != str(request.user['user_id']):
+            return jsonify({'error': 'Forbidden: insufficient permissions'}), 403
+        
+        return jsonify(dashboard), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+def build_faculty_dashboard(faculty_id):
+    """Assemble a faculty dashboard with three set-based queries (faculty, courses, rosters)."""
+    faculty_query = sql("""
+        SELECT f.faculty_id, f.user_id, f.department_id, f.designation, f.status,
+               u.first_name, u.last_name, u.email, d.department_name
+        FROM faculty f
+        INNER JOIN users u ON f.user_id = u.user_id
+        INNER JOIN departments d ON f.department_id = d.department_id
+        WHERE f.faculty_id = :faculty_id
+    """)
+    faculty = db.session.execute(faculty_query, {'faculty_id': faculty_id}).fetchone()
+    if not faculty:
+        return None
+    
+    courses_query = sql("""
+        SELECT 
+            c.course_id,
+            c.course_code,
+            c.course_name,
+            c.department_id,
+            c.credits,
+            c.semester,
+            c.max_students,
+            c.total_classes,
+            c.created_at,
+            d.department_name
+        FROM courses c
+        INNER JOIN departments d ON c.department_id = d.department_id
+        WHERE c.faculty_id = :faculty_id
+        ORDER BY c.course_code
+    """)
+    courses = db.session.execute(courses_query, {'faculty_id': faculty_id}).fetchall()
+    
+    # Every roster of every course in one pass, with counters and grade alongside
+    roster_query = sql("""
+        SELECT 
+            e.course_id,
+            e.student_id,
+            e.status as enrollment_status,
+            e.classes_held,
+            e.classes_attended,
+            e.classes_late,
+            e.classes_excused,
+            e.attendance_percentage,
+            s.user_id,
+            s.enrollment_number,
+            s.semester,
+            u.first_name,
+            u.last_name,
+            u.email,
+            g.internal1_marks,
+            g.internal2_marks,
+            g.external_marks,
+            g.total_marks,
+            g.percentage,
+            g.letter_grade,
+            CASE WHEN g.student_id IS NULL THEN 0 ELSE 1 END as has_grade
+        FROM courses c
+        INNER JOIN enrollments e ON c.course_id = e.course_id
+        INNER JOIN students s ON e.student_id = s.student_id
+        INNER JOIN users u ON s.user_id = u.user_id
+        LEFT JOIN grades g ON e.student_id = g.student_id AND e.course_id = g.course_id
+        WHERE c.faculty_id = :faculty_id
+        ORDER BY e.course_id, u.last_name, u.first_name
+    """)
+    roster = db.session.execute(roster_query, {'faculty_id': faculty_id}).fetchall()
+    
+    grade_fields = ('internal1_marks', 'internal2_marks', 'external_marks', 'total_marks', 'percentage', 'letter_grade')
+    students_by_course = {}
+    for row in roster:
+        fields = dict(row._mapping)
+        grade = {k: fields.pop(k) for k in grade_fields}
+        fields['grade'] = grade if fields.pop('has_grade') else None
+        course_id = fields.pop('course_id')
+        students_by_course.setdefault(course_id, []).append(fields)
+    
+    course_list = []
+    for course in courses:
+        course_list.append({**dict(course._mapping), 'students': students_by_course.get(course.course_id, [])})
+    
+    return {
+        'faculty': dict(faculty._mapping),
+        'courses': course_list
+    }
@@ -1,8 +1,33 @@
+import csv
+import io
+import logging
+import math
 from flask import Blueprint, request, jsonify
 from database import db
-from sqlalchemy import text
+from statements import sql
+from config import Config
+from writes import written_row
+from cache import TTLCache, on_write, notify_write
+from pagination import get_page_args, get_total_mode, resolve_total, has_more, page_response
+from streaming import wants_ndjson, stream_ndjson
+from columnar import list_response
+from reference import with_course_names
+from singleflight import single_flight
+from grading import MAX_MARKS, calculate_letter_grade, compute_grades
+from auth_utils import token_required
+from cgpa import apply_grade_changes, lock_course
 
 bp = Blueprint('grades', __name__, url_prefix='/api/grades')
+logger = logging.getLogger(__name__)
+
+# Recent COUNT(*) results keyed by filter set, cleared on writes
+count_cache = TTLCache(ttl_seconds=Config.COUNT_CACHE_TTL_SECONDS)
+
+
+@on_write('grades')
+def _clear_count_cache(table, **keys):
+    count_cache.clear()
+
 
 # CREATE
 @bp.route('/', methods=['POST'])
@@ -27,18 +52,17 @@ def create_grade():
         # Calculate letter grade based on percentage
         letter_grade = calculate_letter_grade(percentage) if total_marks > 0 else None
         
-        # Debug logging
-        print(f"DEBUG CREATE - Internal1: {internal1_marks}, Internal2: {internal2_marks}, External: {external_marks}")
-        print(f"DEBUG CREATE - Internal Avg: {internal_average:.2f}, Total: {total_marks:.2f}/100, Percentage: {percentage:.2f}%, Grade: {letter_grade}")
+        logger.debug('create_grade internal1=%s internal2=%s external=%s internal_avg=%.2f total=%.2f grade=%s',
+                     internal1_marks, internal2_marks, external_marks, internal_average, total_marks, letter_grade)
         
-        insert_query = text("""
+        insert_query = sql("""
             INSERT INTO grades 
             (student_id, course_id, internal1_marks, internal2_marks, external_marks, total_marks, percentage, letter_grade)
             VALUES 
             (:student_id, :course_id, :internal1_marks, :internal2_marks, :external_marks, :total_marks, :percentage, :letter_grade)
         """)
         
-        result = db.session.execute(insert_query, {
+        values = {
             'student_id': data['student_id'],
             'course_id': data['course_id'],
             'internal1_marks': internal1_marks,
@@ -47,20 +71,25 @@ def create_grade():
             'total_marks': total_marks,
             'percentage': percentage,
             'letter_grade': letter_grade
-        })
+        }
+        # Course first, then the grade row: the order a credit change locks them in
+        credits = lock_course(data['course_id'])
+        db.session.execute(insert_query, values)
+        apply_grade_changes(data['course_id'], [(data['student_id'], None, letter_grade)], credits)
         
         db.session.commit()
+        notify_write('grades', student_id=data['student_id'], course_id=data['course_id'])
         
-        # Composite key - fetch by student_id and course_id
-        select_query = text("SELECT * FROM grades WHERE student_id = :student_id AND course_id = :course_id")
-        grade = db.session.execute(select_query, {
+        # Echo the written values; re-read only for ?return=representation
+        select_query = sql("SELECT * FROM grades WHERE student_id = :student_id AND course_id = :course_id")
+        grade = written_row(values, select_query, {
             'student_id': data['student_id'],
             'course_id': data['course_id']
-        }).fetchone()
+        })
         
         return jsonify({
             'message': 'Grade created successfully',
-            'grade': dict(grade._mapping)
+            'grade': grade
         }), 201
         
     except Exception as e:
@@ -68,6 +97,184 @@ def create_grade():
         return jsonify({'error': str(e)}), 500
 
 
+# Columns read from each imported row, in the order compute_grades expects
+GRADE_IMPORT_MARK_FIELDS = ('internal1_marks', 'internal2_marks', 'external_marks')
+
+
+# BULK CREATE - Import a course's marks from CSV or JSON in one transaction
+@bp.route('/import', methods=['POST'])
+@token_required(['admin', 'faculty'])
+def import_grades():
+    """Upsert grades for many students of one course.
+
+    Accepts a CSV upload (`file` field, or a text/csv body) with columns
+    student_id, internal1_marks, internal2_marks, external_marks, or JSON
+    {"course_id", "records": [...]} / a bare JSON array. course_id may also
+    come from the query string. Returns one result per input row.
+    """
+    try:
+        course_id, records = _read_grade_import()
+        course_id = _parse_id(course_id)
+        if course_id is None:
+            return jsonify({'error': 'course_id must be an integer'}), 400
+        if not isinstance(records, list) or not records:
+            return jsonify({'error': 'records must be a non-empty list'}), 400
+        
+        owner_query = sql("""
+            SELECT f.user_id, c.credits FROM courses c
+            LEFT JOIN faculty f ON f.faculty_id = c.faculty_id
+            WHERE c.course_id = :course_id
+            FOR SHARE OF c
+        """)
+        course = db.session.execute(owner_query, {'course_id': course_id}).fetchone()
+        if not course:
+            return jsonify({'error': 'Course not found'}), 404
+        
+        # Faculty members may only import grades for their own courses
+        if request.user['role'] == 'faculty' and str(course.user_id) != str(request.user['user_id']):
+            return jsonify({'error': 'Forbidden: insufficient permissions'}), 403
+        
+        # Validate each row up front so one bad entry does not sink the batch
+        results = []
+        valid = {}
+        for row_number, record in enumerate(records, start=1):
+            result = {'row': row_number}
+            results.append(result)
+            if not isinstance(record, dict):
+                result.update(outcome='error', error='Each record must be an object')
+                continue
+            student_id = _parse_id(record.get('student_id'))
+            if student_id is None:
+                result.update(outcome='error', error='student_id must be an integer')
+                continue
+            result['student_id'] = student_id
+            try:
+                marks = tuple(_parse_marks(record.get(field)) for field in GRADE_IMPORT_MARK_FIELDS)
+            except ValueError as e:
+                result.update(outcome='error', error=str(e))
+                continue
+            if student_id in valid:
+                result.update(outcome='error', error='Duplicate student_id in request')
+                continue
+            valid[student_id] = (result, marks)
+        
+        # One query tells us who is enrolled and who already has a grade
+        existing = {}
+        if valid:
+            lookup_query = sql("""
+                SELECT e.student_id, g.student_id IS NOT NULL as has_grade, g.letter_grade
+                FROM enrollments e
+                LEFT JOIN grades g ON g.student_id = e.student_id AND g.course_id = e.course_id
+                WHERE e.course_id = :course_id AND e.student_id IN :student_ids
+                FOR UPDATE
+            """, 'student_ids')
+            rows = db.session.execute(lookup_query, {'course_id': course_id, 'student_ids': list(valid)}).fetchall()
+            existing = {row.student_id: (bool(row.has_grade), row.letter_grade) for row in rows}
+        
+        graded = []
+        for student_id, (result, marks) in valid.items():
+            if student_id not in existing:
+                result.update(outcome='error', error='Student is not enrolled in this course')
+                continue
+            graded.append((student_id, result, marks))
+        
+        if not graded:
+            return jsonify({'error': 'No valid grade records', 'results': results}), 400
+        
+        computed = compute_grades([marks for _, _, marks in graded])
+        values = []
+        for (student_id, result, marks), (total_marks, percentage, letter_grade) in zip(graded, computed):
+            values.append({
+                'student_id': student_id,
+                'course_id': course_id,
+                'internal1_marks': marks[0],
+                'internal2_marks': marks[1],
+                'external_marks': marks[2],
+                'total_marks': total_marks,
+                'percentage': percentage,
+                'letter_grade': letter_grade
+            })
+            result.update(
+                outcome='updated' if existing[student_id][0] else 'created',
+                total_marks=total_marks,
+                percentage=percentage,
+                letter_grade=letter_grade
+            )
+        
+        # One upsert statement run over every row (the driver sends multi-row INSERTs)
+        upsert_query = sql("""
+            INSERT INTO grades 
+            (student_id, course_id, internal1_marks, internal2_marks, external_marks, total_marks, percentage, letter_grade)
+            VALUES 
+            (:student_id, :course_id, :internal1_marks, :internal2_marks, :external_marks, :total_marks, :percentage, :letter_grade)
+            ON DUPLICATE KEY UPDATE
+                internal1_marks = VALUES(internal1_marks),
+                internal2_marks = VALUES(internal2_marks),
+                external_marks = VALUES(external_marks),
+                total_marks = VALUES(total_marks),
+                percentage = VALUES(percentage),
+                letter_grade = VALUES(letter_grade)
+        """)
+        db.session.execute(upsert_query, values)
+        apply_grade_changes(course_id, [
+            (value['student_id'], existing[value['student_id']][1], value['letter_grade']) for value in values
+        ], course.credits)
+        db.session.commit()
+        notify_write('grades', course_id=course_id, student_ids=[value['student_id'] for value in values])
+        
+        outcomes = [result['outcome'] for result in results]
+        return jsonify({
+            'message': 'Grades imported successfully',
+            'created': outcomes.count('created'),
+            'updated': outcomes.count('updated'),
+            'failed': outcomes.count('error'),
+            'results': results
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+
+
+def _read_grade_import():
+    """Return (course_id, records) from a CSV upload, a CSV body or a JSON body."""
+    course_id = request.args.get('course_id', type=int)
+    upload = request.files.get('file')
+    if upload is not None or request.mimetype == 'text/csv':
+        text_data = upload.read().decode('utf-8-sig') if upload is not None else request.get_data(as_text=True)
+        if course_id is None:
+            course_id = request.form.get('course_id', type=int)
+        return course_id, list(csv.DictReader(io.StringIO(text_data)))
+    
+    data = request.get_json(silent=True)
+    if isinstance(data, dict):
+        return data.get('course_id', course_id), data.get('records')
+    return course_id, data
+
+
+def _parse_id(value):
+    """JSON sends ints (or digit strings) and CSV sends digit strings; anything else is rejected."""
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.strip().isdigit():
+        return int(value)
+    return None
+
+
+def _parse_marks(value):
+    """Marks default to 0 like create_grade, but must be a number from 0 to MAX_MARKS."""
+    if value is None or value == '':
+        return 0.0
+    try:
+        marks = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'Marks must be numbers, got {value!r}')
+    if math.isnan(marks) or not 0 <= marks <= MAX_MARKS:
+        raise ValueError(f'Marks must be between 0 and {MAX_MARKS}, got {value!r}')
+    return marks
+
+
 # READ - Get all
 @bp.route('/', methods=['GET'])
 def get_grades():
@@ -87,27 +294,39 @@ def get_grades():
         
         where_clause = "WHERE " + " AND ".join(conditions) if conditions else ""
         
-        query = text(f"""
+        select_sql = f"""
             SELECT 
                 g.*,
                 s.enrollment_number,
                 u.first_name as student_first_name,
-                u.last_name as student_last_name,
-                c.course_code,
-                c.course_name
+                u.last_name as student_last_name
             FROM grades g
             INNER JOIN students s ON g.student_id = s.student_id
             INNER JOIN users u ON s.user_id = u.user_id
-            INNER JOIN courses c ON g.course_id = c.course_id
             {where_clause}
-            ORDER BY g.percentage DESC
-        """)
+            ORDER BY g.percentage DESC, g.student_id, g.course_id
+        """
         
-        grades = db.session.execute(query, params).fetchall()
+        # Stream every matching row when asked for NDJSON, otherwise return one page
+        if wants_ndjson():
+            return stream_ndjson(sql(select_sql), params, transform=with_course_names)
         
-        return jsonify({
-            'grades': [dict(row._mapping) for row in grades]
-        }), 200
+        page, per_page, offset = get_page_args()
+        try:
+            total_mode = get_total_mode(default='false')
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        query = sql(select_sql + "LIMIT :limit OFFSET :offset")
+        count_query = sql(f"SELECT COUNT(*) as total FROM grades g {where_clause}")
+        
+        grades = db.session.execute(query, {**params, 'limit': per_page + 1, 'offset': offset}).fetchall()
+        more = has_more(grades, per_page)
+        # Course names come from the reference cache instead of a join
+        grades = with_course_names(grades)
+        total, total_estimated = resolve_total(total_mode, count_query, params, count_cache, 'grades')
+        
+        return list_response(page_response('grades', grades, page, per_page, more, total, total_estimated), 'grades')
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -117,7 +336,7 @@ def get_grades():
 @bp.route('/<int:student_id>/<int:course_id>', methods=['GET'])
 def get_grade(student_id, course_id):
     try:
-        query = text("SELECT * FROM grades WHERE student_id = :student_id AND course_id = :course_id")
+        query = sql("SELECT * FROM grades WHERE student_id = :student_id AND course_id = :course_id")
         grade = db.session.execute(query, {
             'student_id': student_id,
             'course_id': course_id
@@ -138,8 +357,10 @@ def update_grade(student_id, course_id):
     try:
         data = request.get_json()
         
-        # Get current grade
-        current_query = text("SELECT * FROM grades WHERE student_id = :student_id AND course_id = :course_id")
+        # Get current grade, locked so its old letter can be taken out of the CGPA sums
+        # (after the course, the order a credit change locks them in)
+        credits = lock_course(course_id)
+        current_query = sql("SELECT * FROM grades WHERE student_id = :student_id AND course_id = :course_id FOR UPDATE")
         current = db.session.execute(current_query, {
             'student_id': student_id,
             'course_id': course_id
@@ -169,11 +390,10 @@ def update_grade(student_id, course_id):
         # Calculate letter grade
         letter_grade = calculate_letter_grade(percentage) if total_marks > 0 else None
         
-        # Debug logging
-        print(f"DEBUG UPDATE - Internal1: {internal1_marks}, Internal2: {internal2_marks}, External: {external_marks}")
-        print(f"DEBUG UPDATE - Internal Avg: {internal_average:.2f}, Total: {total_marks:.2f}/100, Percentage: {percentage:.2f}%, Grade: {letter_grade}")
+        logger.debug('update_grade internal1=%s internal2=%s external=%s internal_avg=%.2f total=%.2f grade=%s',
+                     internal1_marks, internal2_marks, external_marks, internal_average, total_marks, letter_grade)
         
-        update_query = text("""
+        update_query = sql("""
             UPDATE grades 
             SET internal1_marks = :internal1_marks,
                 internal2_marks = :internal2_marks,
@@ -194,8 +414,10 @@ def update_grade(student_id, course_id):
             'percentage': percentage,
             'letter_grade': letter_grade
         })
+        apply_grade_changes(course_id, [(student_id, current.letter_grade, letter_grade)], credits)
         
         db.session.commit()
+        notify_write('grades', student_id=student_id, course_id=course_id)
         
         return jsonify({'message': 'Grade updated successfully'}), 200
         
@@ -208,16 +430,25 @@ def update_grade(student_id, course_id):
 @bp.route('/<int:student_id>/<int:course_id>', methods=['DELETE'])
 def delete_grade(student_id, course_id):
     try:
-        delete_query = text("DELETE FROM grades WHERE student_id = :student_id AND course_id = :course_id")
-        result = db.session.execute(delete_query, {
-            'student_id': student_id,
-            'course_id': course_id
-        })
-        db.session.commit()
-        
-        if result.rowcount == 0:
+        keys = {'student_id': student_id, 'course_id': course_id}
+        # Lock the row and read its letter so it can be taken back out of the CGPA sums
+        # (after the course, the order a credit change locks them in)
+        credits = lock_course(course_id)
+        current_query = sql("""
+            SELECT letter_grade FROM grades
+            WHERE student_id = :student_id AND course_id = :course_id
+            FOR UPDATE
+        """)
+        current = db.session.execute(current_query, keys).fetchone()
+        if not current:
             return jsonify({'error': 'Grade not found'}), 404
         
+        delete_query = sql("DELETE FROM grades WHERE student_id = :student_id AND course_id = :course_id")
+        db.session.execute(delete_query, keys)
+        apply_grade_changes(course_id, [(student_id, current.letter_grade, None)], credits)
+        db.session.commit()
+        notify_write('grades', student_id=student_id, course_id=course_id)
+        
         return jsonify({'message': 'Grade deleted successfully'}), 200
         
     except Exception as e:
@@ -227,9 +458,10 @@ def delete_grade(student_id, course_id):
 
 # STATISTICS - Grade distribution
 @bp.route('/statistics/distribution', methods=['GET'])
+@single_flight(stale_seconds=30)
 def get_grade_distribution():
     try:
-        query = text("""
+        query = sql("""
             SELECT 
                 letter_grade,
                 COUNT(*) as count
@@ -264,29 +496,3 @@ def get_grade_distribution():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-
-# HELPER FUNCTION
-def calculate_letter_grade(percentage):
-    """Calculate letter grade based on percentage"""
-    if percentage >= 90:
-        return 'A+'
-    elif percentage >= 85:
-        return 'A'
-    elif percentage >= 80:
-        return 'A-'
-    elif percentage >= 75:
-        return 'B+'
-    elif percentage >= 70:
-        return 'B'
-    elif percentage >= 65:
-        return 'B-'
-    elif percentage >= 60:
-        return 'C+'
-    elif percentage >= 55:
-        return 'C'
-    elif percentage >= 50:
-        return 'C-'
-    elif percentage >= 45:
-        return 'D'
-    else:
-        return 'F'
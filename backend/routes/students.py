@@ -1,10 +1,46 @@
 from flask import Blueprint, request, jsonify
 from database import db
-from sqlalchemy import text
+from statements import sql
 from datetime import datetime
+from config import Config
+from cache import TTLCache, on_write, notify_write
+from writes import written_row
+from pagination import get_page_args, decode_cursor, next_cursor, InvalidCursor, get_total_mode, resolve_total, has_more
+from columnar import list_response
+from reference import attach
+from singleflight import single_flight
+from conditional import VersionedCache
+from attendance_report import refresh_committed
 
 bp = Blueprint('students', __name__, url_prefix='/api/students')
 
+# Recent COUNT(*) results keyed by filter set, cleared on writes
+count_cache = TTLCache(ttl_seconds=Config.COUNT_CACHE_TTL_SECONDS)
+
+
+@on_write('students')
+def _clear_count_cache(table, **keys):
+    count_cache.clear()
+
+
+# Student dashboards keyed by student_id, rebuilt once a students, users, departments or courses
+# write moves table_versions. Enrollment, attendance and grade writes drop just the students they touch
+dashboard_cache = VersionedCache(
+    ('students', 'users', 'departments', 'courses'),
+    ttl_seconds=Config.DASHBOARD_CACHE_SECONDS,
+    maxsize=Config.STUDENT_DASHBOARD_CACHE_SIZE
+)
+
+
+@on_write('enrollments', 'attendance', 'grades')
+def _drop_student_dashboards(table, student_id=None, student_ids=None, **keys):
+    if student_id is None and student_ids is None:
+        dashboard_cache.clear()
+        return
+    for changed in [student_id] if student_id is not None else student_ids:
+        dashboard_cache.discard(changed)
+
+
 # CREATE - Add new student using RAW SQL INSERT
 @bp.route('/', methods=['POST'])
 def create_student():
@@ -19,45 +55,48 @@ def create_student():
                 return jsonify({'error': f'Missing required field: {field}'}), 400
         
         # Check if enrollment number already exists using SELECT
-        check_query = text("SELECT student_id FROM students WHERE enrollment_number = :enrollment_number")
+        check_query = sql("SELECT student_id FROM students WHERE enrollment_number = :enrollment_number")
         existing = db.session.execute(check_query, {'enrollment_number': data['enrollment_number']}).fetchone()
         if existing:
             return jsonify({'error': 'Enrollment number already exists'}), 400
         
         # Check if user_id already linked using SELECT
-        check_user_query = text("SELECT student_id FROM students WHERE user_id = :user_id")
+        check_user_query = sql("SELECT student_id FROM students WHERE user_id = :user_id")
         existing_user = db.session.execute(check_user_query, {'user_id': data['user_id']}).fetchone()
         if existing_user:
             return jsonify({'error': 'User already linked to a student'}), 400
         
         # RAW SQL INSERT QUERY
-        insert_query = text("""
+        insert_query = sql("""
             INSERT INTO students 
             (user_id, enrollment_number, department_id, semester, batch, admission_date, cgpa, status, created_at)
             VALUES 
             (:user_id, :enrollment_number, :department_id, :semester, :batch, :admission_date, :cgpa, :status, NOW())
         """)
         
-        result = db.session.execute(insert_query, {
+        values = {
             'user_id': data['user_id'],
             'enrollment_number': data['enrollment_number'],
             'department_id': data['department_id'],
             'semester': data.get('semester', 1),
             'batch': data['batch'],
             'admission_date': data['admission_date'],
-            'cgpa': data.get('cgpa', 0.00),
+            # Derived from grades by the CGPA engine; a new student has none
+            'cgpa': 0.00,
             'status': data.get('status', 'active')
-        })
+        }
+        result = db.session.execute(insert_query, values)
         
         db.session.commit()
+        notify_write('students', student_id=result.lastrowid)
         
-        # Get the inserted student using SELECT
-        select_query = text("SELECT * FROM students WHERE student_id = :id")
-        student = db.session.execute(select_query, {'id': result.lastrowid}).fetchone()
+        # Echo the written values; re-read only for ?return=representation
+        select_query = sql("SELECT * FROM students WHERE student_id = :id")
+        student = written_row({'student_id': result.lastrowid, **values}, select_query, {'id': result.lastrowid})
         
         return jsonify({
             'message': 'Student created successfully',
-            'student': dict(student._mapping)
+            'student': student
         }), 201
         
     except Exception as e:
@@ -75,13 +114,16 @@ def get_students():
         status = request.args.get('status')
         semester = request.args.get('semester', type=int)
         batch = request.args.get('batch')
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 20, type=int)
-        offset = (page - 1) * per_page
+        after = request.args.get('after')
+        page, per_page, offset = get_page_args()
+        try:
+            total_mode = get_total_mode()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
         # Build WHERE clause dynamically
         conditions = []
-        params = {'limit': per_page, 'offset': offset}
+        params = {}
         
         if user_id:
             conditions.append("s.user_id = :user_id")
@@ -99,14 +141,34 @@ def get_students():
             conditions.append("s.batch = :batch")
             params['batch'] = batch
         
+        filter_clause = "WHERE " + " AND ".join(conditions) if conditions else ""
+        count_params = dict(params)
+        
+        # Cursor mode seeks past the last (created_at, student_id) seen instead of using OFFSET
+        if after:
+            try:
+                params['cursor_created_at'], params['cursor_id'] = decode_cursor(after)
+            except InvalidCursor as e:
+                return jsonify({'error': str(e)}), 400
+            conditions.append(
+                "(s.created_at < :cursor_created_at"
+                " OR (s.created_at = :cursor_created_at AND s.student_id < :cursor_id))"
+            )
+            limit_clause = "LIMIT :limit"
+        else:
+            limit_clause = "LIMIT :limit OFFSET :offset"
+            params['offset'] = offset
+        params['limit'] = per_page + 1
+        
         where_clause = "WHERE " + " AND ".join(conditions) if conditions else ""
         
         # RAW SQL SELECT with INNER JOIN
-        query = text(f"""
+        query = sql(f"""
             SELECT 
                 s.student_id,
                 s.user_id,
                 s.enrollment_number,
+                s.department_id,
                 s.semester,
                 s.batch,
                 s.admission_date,
@@ -115,34 +177,42 @@ def get_students():
                 s.created_at,
                 u.first_name,
                 u.last_name,
-                u.email,
-                d.department_name,
-                d.department_code
+                u.email
             FROM students s
             INNER JOIN users u ON s.user_id = u.user_id
-            INNER JOIN departments d ON s.department_id = d.department_id
             {where_clause}
-            ORDER BY s.created_at DESC
-            LIMIT :limit OFFSET :offset
+            ORDER BY s.created_at DESC, s.student_id DESC
+            {limit_clause}
         """)
         
         # Count total records
-        count_query = text(f"""
+        count_query = sql(f"""
             SELECT COUNT(*) as total 
             FROM students s 
-            {where_clause}
+            {filter_clause}
         """)
         
         students = db.session.execute(query, params).fetchall()
-        total = db.session.execute(count_query, {k: v for k, v in params.items() if k not in ['limit', 'offset']}).scalar()
-        
-        return jsonify({
-            'students': [dict(row._mapping) for row in students],
+        cursor = next_cursor(students, per_page, 'created_at', 'student_id')
+        # Department names come from the reference cache instead of a join
+        students = attach(students, 'departments', 'department_id',
+                          department_name='department_name', department_code='department_code')
+        total, total_estimated = resolve_total(total_mode, count_query, count_params, count_cache, 'students')
+        
+        response = {
+            'students': students,
             'total': total,
-            'page': page,
             'per_page': per_page,
-            'pages': (total + per_page - 1) // per_page if total > 0 else 0
-        }), 200
+            'next_cursor': cursor
+        }
+        if total_estimated:
+            response['total_estimated'] = True
+        if not after:
+            response['page'] = page
+            if total is not None:
+                response['pages'] = (total + per_page - 1) // per_page if total > 0 else 0
+        
+        return list_response(response, 'students')
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -153,7 +223,7 @@ def get_students():
 def get_student(student_id):
     """Get a single student by ID using SELECT with JOIN"""
     try:
-        query = text("""
+        query = sql("""
             SELECT 
                 s.student_id,
                 s.user_id,
@@ -194,7 +264,7 @@ def get_student(student_id):
 def get_student_by_enrollment(enrollment_number):
     """Get a student by enrollment number using SELECT"""
     try:
-        query = text("""
+        query = sql("""
             SELECT 
                 s.*,
                 u.first_name,
@@ -231,7 +301,7 @@ def update_student(student_id):
         
         if 'enrollment_number' in data:
             # Check if enrollment number already exists for another student
-            check_query = text("""
+            check_query = sql("""
                 SELECT student_id FROM students 
                 WHERE enrollment_number = :enrollment_number AND student_id != :student_id
             """)
@@ -257,9 +327,6 @@ def update_student(student_id):
         if 'admission_date' in data:
             set_clauses.append("admission_date = :admission_date")
             params['admission_date'] = data['admission_date']
-        if 'cgpa' in data:
-            set_clauses.append("cgpa = :cgpa")
-            params['cgpa'] = data['cgpa']
         if 'status' in data:
             set_clauses.append("status = :status")
             params['status'] = data['status']
@@ -268,7 +335,7 @@ def update_student(student_id):
             return jsonify({'error': 'No fields to update'}), 400
         
         # RAW SQL UPDATE
-        update_query = text(f"""
+        update_query = sql(f"""
             UPDATE students 
             SET {', '.join(set_clauses)}
             WHERE student_id = :student_id
@@ -276,17 +343,21 @@ def update_student(student_id):
         
         result = db.session.execute(update_query, params)
         db.session.commit()
+        notify_write('students', student_id=student_id)
+        # Only active students are in the low-attendance summary, under their department
+        if 'status' in data or 'department_id' in data:
+            refresh_committed([student_id])
         
         if result.rowcount == 0:
             return jsonify({'error': 'Student not found'}), 404
         
-        # Get updated student
-        select_query = text("SELECT * FROM students WHERE student_id = :student_id")
-        student = db.session.execute(select_query, {'student_id': student_id}).fetchone()
+        # Echo the changed fields; re-read only for ?return=representation
+        select_query = sql("SELECT * FROM students WHERE student_id = :student_id")
+        student = written_row(params, select_query, {'student_id': student_id})
         
         return jsonify({
             'message': 'Student updated successfully',
-            'student': dict(student._mapping)
+            'student': student
         }), 200
         
     except Exception as e:
@@ -300,13 +371,15 @@ def delete_student(student_id):
     """Delete a student using DELETE query"""
     try:
         # RAW SQL DELETE
-        delete_query = text("""
+        delete_query = sql("""
             DELETE FROM students 
             WHERE student_id = :student_id
         """)
         
         result = db.session.execute(delete_query, {'student_id': student_id})
         db.session.commit()
+        notify_write('students', student_id=student_id)
+        refresh_committed([student_id])
         
         if result.rowcount == 0:
             return jsonify({'error': 'Student not found'}), 404
@@ -323,80 +396,209 @@ def delete_student(student_id):
 def get_student_profile(student_id):
     """Get complete student profile using complex SELECT with multiple JOINs"""
     try:
-        # Complex query with multiple JOINs and aggregation
-        query = text("""
-            SELECT 
-                s.student_id,
-                s.enrollment_number,
-                s.semester,
-                s.batch,
-                s.admission_date,
-                s.cgpa,
-                s.status,
-                u.email,
-                u.first_name,
-                u.last_name,
-                u.phone,
-                u.date_of_birth,
-                d.department_id,
-                d.department_name,
-                d.department_code,
-                d.contact_email as dept_contact,
-                COUNT(DISTINCT e.enrollment_id) as total_enrollments,
-                AVG(e.attendance_percentage) as avg_attendance
-            FROM students s
-            INNER JOIN users u ON s.user_id = u.user_id
-            INNER JOIN departments d ON s.department_id = d.department_id
-            LEFT JOIN enrollments e ON s.student_id = e.student_id
-            WHERE s.student_id = :student_id
-            GROUP BY s.student_id, s.enrollment_number, s.semester, s.batch, s.admission_date,
-                     s.cgpa, s.status, u.email, u.first_name, u.last_name, u.phone, u.date_of_birth,
-                     d.department_id, d.department_name, d.department_code, d.contact_email
-        """)
-        
-        profile = db.session.execute(query, {'student_id': student_id}).fetchone()
+        profile = fetch_student_profile(student_id)
         
         if not profile:
             return jsonify({'error': 'Student not found'}), 404
         
-        return jsonify({'profile': dict(profile._mapping)}), 200
+        return jsonify({'profile': profile}), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+def fetch_student_profile(student_id):
+    """Return the profile row of a student as a dict, or None."""
+    # Complex query with multiple JOINs and aggregation
+    query = sql("""
+        SELECT 
+            s.student_id,
+            s.user_id,
+            s.enrollment_number,
+            s.semester,
+            s.batch,
+            s.admission_date,
+            s.cgpa,
+            s.graded_credits,
+            s.status,
+            u.email,
+            u.first_name,
+            u.last_name,
+            u.phone,
+            u.date_of_birth,
+            d.department_id,
+            d.department_name,
+            d.department_code,
+            d.contact_email as dept_contact,
+            COUNT(e.course_id) as total_enrollments,
+            AVG(e.attendance_percentage) as avg_attendance
+        FROM students s
+        INNER JOIN users u ON s.user_id = u.user_id
+        INNER JOIN departments d ON s.department_id = d.department_id
+        LEFT JOIN enrollments e ON s.student_id = e.student_id
+        WHERE s.student_id = :student_id
+        GROUP BY s.student_id, s.user_id, s.enrollment_number, s.semester, s.batch, s.admission_date,
+                 s.cgpa, s.graded_credits, s.status, u.email, u.first_name, u.last_name, u.phone, u.date_of_birth,
+                 d.department_id, d.department_name, d.department_code, d.contact_email
+    """)
+    
+    profile = db.session.execute(query, {'student_id': student_id}).fetchone()
+    return dict(profile._mapping) if profile else None
+
+
+# DASHBOARD - Profile, enrollments, grades and attendance summaries in one response
+@bp.route('/<int:student_id>/dashboard', methods=['GET'])
+def get_student_dashboard(student_id):
+    try:
+        dashboard = dashboard_cache.get_or_build(student_id, lambda: build_student_dashboard(student_id))
+        if dashboard is None:
+            return jsonify({'error': 'Student not found'}), 404
+        
+        # Students may only open their own dashboard
+        if request.user['role'] == 'student' and str(dashboard['profile']['user_id']) != str(request.user['user_id']):
+            return jsonify({'error': 'Forbidden: insufficient permissions'}), 403
+        
+        return jsonify(dashboard), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
+def build_student_dashboard(student_id):
+    """Assemble a student dashboard with one query per table instead of one call per course."""
+    profile = fetch_student_profile(student_id)
+    if not profile:
+        return None
+    
+    # Enrollment counters double as the per-course attendance summaries
+    enrollments_query = sql("""
+        SELECT 
+            e.student_id,
+            e.course_id,
+            e.enrollment_date,
+            e.status,
+            e.classes_held,
+            e.classes_attended,
+            e.classes_late,
+            e.classes_excused,
+            e.attendance_percentage,
+            c.course_code,
+            c.course_name,
+            c.credits,
+            c.semester
+        FROM enrollments e
+        INNER JOIN courses c ON e.course_id = c.course_id
+        WHERE e.student_id = :student_id
+        ORDER BY c.course_code
+    """)
+    enrollments = db.session.execute(enrollments_query, {'student_id': student_id}).fetchall()
+    
+    grades_query = sql("""
+        SELECT 
+            g.student_id,
+            g.course_id,
+            g.internal1_marks,
+            g.internal2_marks,
+            g.external_marks,
+            g.total_marks,
+            g.percentage,
+            g.letter_grade,
+            c.course_code,
+            c.course_name,
+            c.credits
+        FROM grades g
+        INNER JOIN courses c ON g.course_id = c.course_id
+        WHERE g.student_id = :student_id
+        ORDER BY c.course_code
+    """)
+    grades = db.session.execute(grades_query, {'student_id': student_id}).fetchall()
+    
+    attendance = []
+    for row in enrollments:
+        held = row.classes_held or 0
+        present = row.classes_attended or 0
+        late = row.classes_late or 0
+        excused = row.classes_excused or 0
+        attendance.append({
+            'course_id': row.course_id,
+            'total_classes': held,
+            'present': present,
+            'absent': held - present - late - excused,
+            'late': late,
+            'excused': excused,
+            'attendance_percentage': round(float(row.attendance_percentage or 0), 2)
+        })
+    
+    return {
+        'profile': profile,
+        'enrollments': [dict(row._mapping) for row in enrollments],
+        'grades': [dict(row._mapping) for row in grades],
+        'attendance': attendance
+    }
+
+
 # ADVANCED QUERY - Students with low attendance
 @bp.route('/low-attendance', methods=['GET'])
+@single_flight(stale_seconds=30)
 def students_with_low_attendance():
-    """Get students with attendance below threshold using complex SELECT"""
+    """Get students with attendance below threshold from the precomputed summary table"""
     try:
         threshold = request.args.get('threshold', 75, type=float)
+        department_id = request.args.get('department_id', type=int)
+        page, per_page, offset = get_page_args()
         
-        query = text("""
+        conditions = ["sas.avg_attendance < :threshold"]
+        params = {'threshold': threshold}
+        if department_id:
+            conditions.append("sas.department_id = :department_id")
+            params['department_id'] = department_id
+        where_clause = "WHERE " + " AND ".join(conditions)
+        
+        # Range scan over idx_avg_attendance / idx_department_avg instead of GROUP BY per request
+        query = sql(f"""
             SELECT 
-                s.student_id,
+                sas.student_id,
                 s.enrollment_number,
                 u.first_name,
                 u.last_name,
                 d.department_name,
-                AVG(e.attendance_percentage) as avg_attendance,
-                COUNT(e.enrollment_id) as total_courses
-            FROM students s
+                sas.avg_attendance,
+                sas.total_courses
+            FROM student_attendance_summary sas
+            INNER JOIN students s ON sas.student_id = s.student_id
             INNER JOIN users u ON s.user_id = u.user_id
-            INNER JOIN departments d ON s.department_id = d.department_id
-            INNER JOIN enrollments e ON s.student_id = e.student_id
-            WHERE s.status = 'active'
-            GROUP BY s.student_id, s.enrollment_number, u.first_name, u.last_name, d.department_name
-            HAVING AVG(e.attendance_percentage) < :threshold
-            ORDER BY avg_attendance ASC
+            INNER JOIN departments d ON sas.department_id = d.department_id
+            {where_clause}
+            ORDER BY sas.avg_attendance ASC, sas.student_id
+            LIMIT :limit OFFSET :offset
+        """)
+        # Joined to students like the page query: rows of deleted users' students linger until the next rebuild
+        count_query = sql(f"""
+            SELECT COUNT(*) FROM student_attendance_summary sas
+            INNER JOIN students s ON sas.student_id = s.student_id
+            {where_clause}
+        """)
+        snapshot_query = sql("""
+            SELECT 
+                MIN(refreshed_at) as refreshed_at,
+                TIMESTAMPDIFF(SECOND, MIN(refreshed_at), NOW()) as stale_seconds
+            FROM student_attendance_summary
         """)
         
-        students = db.session.execute(query, {'threshold': threshold}).fetchall()
+        students = db.session.execute(query, {**params, 'limit': per_page + 1, 'offset': offset}).fetchall()
+        more = has_more(students, per_page)
+        total = db.session.execute(count_query, params).scalar()
+        snapshot = db.session.execute(snapshot_query).fetchone()
         
         return jsonify({
-            'students': [dict(row._mapping) for row in students],
+            'students': students,
             'threshold': threshold,
-            'count': len(students)
+            'count': total,
+            'page': page,
+            'per_page': per_page,
+            'has_more': more,
+            'refreshed_at': snapshot.refreshed_at,
+            'stale_seconds': snapshot.stale_seconds
         }), 200
         
     except Exception as e:
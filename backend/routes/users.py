@@ -1,9 +1,35 @@
+import logging
+import re
 from flask import Blueprint, request, jsonify
 from database import db
-from sqlalchemy import text
-from werkzeug.security import generate_password_hash
+from statements import sql
+from passwords import hash_password, PasswordHasherBusy
+from config import Config
+from cache import TTLCache, on_write, notify_write
+from writes import written_row
+from pagination import get_page_args, decode_cursor, next_cursor, InvalidCursor, get_total_mode, resolve_total, encode_rank_cursor, decode_rank_cursor
+from columnar import list_response
 
 bp = Blueprint('users', __name__, url_prefix='/api/users')
+logger = logging.getLogger(__name__)
+
+# Search terms shorter than InnoDB's default innodb_ft_min_token_size are not in the FULLTEXT index
+SEARCH_MIN_FULLTEXT_LENGTH = 3
+
+
+def _like_prefix(term):
+    """LIKE pattern matching values that start with `term`, its wildcards taken literally."""
+    return re.sub(r'([\\%_])', r'\\\1', term) + '%'
+
+
+# Recent COUNT(*) results keyed by filter set, cleared on writes
+count_cache = TTLCache(ttl_seconds=Config.COUNT_CACHE_TTL_SECONDS)
+
+
+@on_write('users')
+def _clear_count_cache(table, **keys):
+    count_cache.clear()
+
 
 # CREATE - Add new user using RAW SQL
 @bp.route('/', methods=['POST'])
@@ -19,41 +45,47 @@ def create_user():
                 return jsonify({'error': f'Missing required field: {field}'}), 400
         
         # Check if email already exists using SELECT
-        check_query = text("SELECT user_id FROM users WHERE email = :email")
+        check_query = sql("SELECT user_id FROM users WHERE email = :email")
         existing = db.session.execute(check_query, {'email': data['email']}).fetchone()
         if existing:
             return jsonify({'error': 'Email already exists'}), 400
         
         # RAW SQL INSERT QUERY
-        insert_query = text("""
+        insert_query = sql("""
             INSERT INTO users 
             (email, password_hash, role, first_name, last_name, phone, date_of_birth, is_active, created_at)
             VALUES 
             (:email, :password_hash, :role, :first_name, :last_name, :phone, :date_of_birth, :is_active, NOW())
         """)
         
-        result = db.session.execute(insert_query, {
+        values = {
             'email': data['email'],
-            'password_hash': generate_password_hash(data['password']),
+            'password_hash': hash_password(data['password']),
             'role': data['role'],
             'first_name': data['first_name'],
             'last_name': data['last_name'],
             'phone': data.get('phone'),
             'date_of_birth': data.get('date_of_birth'),
             'is_active': data.get('is_active', True)
-        })
+        }
+        result = db.session.execute(insert_query, values)
         
         db.session.commit()
+        notify_write('users', user_id=result.lastrowid)
         
-        # Get the inserted user using SELECT
-        select_query = text("SELECT user_id, email, role, first_name, last_name, phone, date_of_birth, is_active, created_at FROM users WHERE user_id = :id")
-        user = db.session.execute(select_query, {'id': result.lastrowid}).fetchone()
+        # Echo the written values (never the hash); re-read only for ?return=representation
+        values.pop('password_hash')
+        select_query = sql("SELECT user_id, email, role, first_name, last_name, phone, date_of_birth, is_active, created_at FROM users WHERE user_id = :id")
+        user = written_row({'user_id': result.lastrowid, **values}, select_query, {'id': result.lastrowid})
         
         return jsonify({
             'message': 'User created successfully',
-            'user': dict(user._mapping)
+            'user': user
         }), 201
         
+    except PasswordHasherBusy as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 503
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -64,18 +96,20 @@ def create_user():
 def get_users():
     """Get all users using SELECT with optional filtering"""
     try:
-        print("=== GET /api/users/ called ===")
         role = request.args.get('role')
         is_active = request.args.get('is_active')
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 20, type=int)
-        offset = (page - 1) * per_page
+        after = request.args.get('after')
+        page, per_page, offset = get_page_args()
+        try:
+            total_mode = get_total_mode()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        print(f"Params: role={role}, is_active={is_active}, page={page}, per_page={per_page}")
+        logger.debug('get_users role=%s is_active=%s page=%s per_page=%s after=%s', role, is_active, page, per_page, after)
         
         # Build WHERE clause
         conditions = []
-        params = {'limit': per_page, 'offset': offset}
+        params = {}
         
         if role:
             conditions.append("role = :role")
@@ -84,44 +118,64 @@ def get_users():
             conditions.append("is_active = :is_active")
             params['is_active'] = is_active.lower() == 'true'
         
+        filter_clause = "WHERE " + " AND ".join(conditions) if conditions else ""
+        count_params = dict(params)
+        
+        # Cursor mode seeks past the last (created_at, user_id) seen instead of using OFFSET
+        if after:
+            try:
+                params['cursor_created_at'], params['cursor_id'] = decode_cursor(after)
+            except InvalidCursor as e:
+                return jsonify({'error': str(e)}), 400
+            conditions.append(
+                "(created_at < :cursor_created_at"
+                " OR (created_at = :cursor_created_at AND user_id < :cursor_id))"
+            )
+            limit_clause = "LIMIT :limit"
+        else:
+            limit_clause = "LIMIT :limit OFFSET :offset"
+            params['offset'] = offset
+        params['limit'] = per_page + 1
+        
         where_clause = "WHERE " + " AND ".join(conditions) if conditions else ""
         
         # RAW SQL SELECT
-        query = text(f"""
+        query = sql(f"""
             SELECT user_id, email, role, first_name, last_name, phone, date_of_birth, is_active, created_at
             FROM users
             {where_clause}
-            ORDER BY created_at DESC
-            LIMIT :limit OFFSET :offset
+            ORDER BY created_at DESC, user_id DESC
+            {limit_clause}
         """)
         
-        count_query = text(f"""
+        count_query = sql(f"""
             SELECT COUNT(*) as total 
             FROM users
-            {where_clause}
+            {filter_clause}
         """)
         
-        print(f"Executing query with params: {params}")
         users = db.session.execute(query, params).fetchall()
-        print(f"Fetched {len(users)} users")
+        cursor = next_cursor(users, per_page, 'created_at', 'user_id')
         
-        total = db.session.execute(count_query, {k: v for k, v in params.items() if k not in ['limit', 'offset']}).scalar()
-        print(f"Total count: {total}")
+        total, total_estimated = resolve_total(total_mode, count_query, count_params, count_cache, 'users')
         
         result = {
-            'users': [dict(row._mapping) for row in users],
+            'users': users,
             'total': total,
-            'page': page,
             'per_page': per_page,
-            'pages': (total + per_page - 1) // per_page if total > 0 else 0
+            'next_cursor': cursor
         }
-        print(f"Returning result with {len(result['users'])} users")
-        return jsonify(result), 200
+        if total_estimated:
+            result['total_estimated'] = True
+        if not after:
+            result['page'] = page
+            if total is not None:
+                result['pages'] = (total + per_page - 1) // per_page if total > 0 else 0
+        logger.debug('get_users returning %d users, total=%s', len(result['users']), total)
+        return list_response(result, 'users')
         
     except Exception as e:
-        print(f"ERROR in get_users: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception('get_users failed')
         return jsonify({'error': str(e)}), 500
 
 
@@ -130,7 +184,7 @@ def get_users():
 def get_user(user_id):
     """Get a single user by ID using SELECT"""
     try:
-        query = text("""
+        query = sql("""
             SELECT user_id, email, role, first_name, last_name, phone, date_of_birth, is_active, created_at
             FROM users
             WHERE user_id = :user_id
@@ -160,7 +214,7 @@ def update_user(user_id):
         
         if 'email' in data:
             # Check if email is already taken
-            check_query = text("""
+            check_query = sql("""
                 SELECT user_id FROM users 
                 WHERE email = :email AND user_id != :user_id
             """)
@@ -175,7 +229,7 @@ def update_user(user_id):
         
         if 'password' in data:
             set_clauses.append("password_hash = :password_hash")
-            params['password_hash'] = generate_password_hash(data['password'])
+            params['password_hash'] = hash_password(data['password'])
         
         if 'role' in data:
             set_clauses.append("role = :role")
@@ -200,7 +254,7 @@ def update_user(user_id):
             return jsonify({'error': 'No fields to update'}), 400
         
         # RAW SQL UPDATE
-        update_query = text(f"""
+        update_query = sql(f"""
             UPDATE users 
             SET {', '.join(set_clauses)}
             WHERE user_id = :user_id
@@ -208,19 +262,24 @@ def update_user(user_id):
         
         result = db.session.execute(update_query, params)
         db.session.commit()
+        notify_write('users', user_id=user_id)
         
         if result.rowcount == 0:
             return jsonify({'error': 'User not found'}), 404
         
-        # Get updated user
-        select_query = text("SELECT user_id, email, role, first_name, last_name, phone, date_of_birth, is_active, created_at FROM users WHERE user_id = :user_id")
-        user = db.session.execute(select_query, {'user_id': user_id}).fetchone()
+        # Echo the changed fields (never the hash); re-read only for ?return=representation
+        params.pop('password_hash', None)
+        select_query = sql("SELECT user_id, email, role, first_name, last_name, phone, date_of_birth, is_active, created_at FROM users WHERE user_id = :user_id")
+        user = written_row(params, select_query, {'user_id': user_id})
         
         return jsonify({
             'message': 'User updated successfully',
-            'user': dict(user._mapping)
+            'user': user
         }), 200
         
+    except PasswordHasherBusy as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 503
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -231,14 +290,24 @@ def update_user(user_id):
 def delete_user(user_id):
     """Delete a user using DELETE query"""
     try:
+        # A student's row and enrollments go with the user (ON DELETE CASCADE)
+        student_query = sql("SELECT student_id FROM students WHERE user_id = :user_id")
+        student_ids = [row.student_id for row in db.session.execute(student_query, {'user_id': user_id})]
+        
         # RAW SQL DELETE
-        delete_query = text("""
+        delete_query = sql("""
             DELETE FROM users 
             WHERE user_id = :user_id
         """)
         
         result = db.session.execute(delete_query, {'user_id': user_id})
         db.session.commit()
+        notify_write('users', user_id=user_id)
+        # Linked student/faculty rows go with the user (ON DELETE CASCADE)
+        notify_write('students', student_ids=student_ids)
+        notify_write('faculty')
+        if student_ids:
+            notify_write('enrollments', student_ids=student_ids)
         
         if result.rowcount == 0:
             return jsonify({'error': 'User not found'}), 404
@@ -250,29 +319,69 @@ def delete_user(user_id):
         return jsonify({'error': str(e)}), 500
 
 
-# SEARCH - Search users by name or email using LIKE
+# SEARCH - Ranked search by name or email using the FULLTEXT index
 @bp.route('/search', methods=['GET'])
 def search_users():
-    """Search users by name or email using LIKE operator"""
+    """Search users by name or email with MATCH ... AGAINST and cursor pagination"""
     try:
-        query_string = request.args.get('q', '')
-        
-        if not query_string:
-            return jsonify({'users': []}), 200
-        
-        # RAW SQL with LIKE for search
-        search_query = text("""
-            SELECT user_id, email, role, first_name, last_name, phone, is_active
+        query_string = request.args.get('q', '').strip()
+        limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
+        after = request.args.get('after')
+        
+        terms = re.findall(r'\w+', query_string)
+        if not terms:
+            return jsonify({'users': [], 'next_cursor': None}), 200
+        
+        params = {'limit': limit + 1}
+        if after:
+            try:
+                params['cursor_relevance'], params['cursor_id'] = decode_rank_cursor(after)
+            except InvalidCursor as e:
+                return jsonify({'error': str(e)}), 400
+        
+        indexed_terms = [term for term in terms if len(term) >= SEARCH_MIN_FULLTEXT_LENGTH]
+        if indexed_terms:
+            # Every term must match, each as a word prefix: "ali wil" -> "+ali* +wil*"
+            params['terms'] = ' '.join(f'+{term}*' for term in indexed_terms)
+            relevance = "MATCH(first_name, last_name, email) AGAINST (:terms IN BOOLEAN MODE)"
+            conditions = [relevance]
+            if after:
+                conditions.append(
+                    f"({relevance} < :cursor_relevance"
+                    f" OR ({relevance} = :cursor_relevance AND user_id > :cursor_id))"
+                )
+        else:
+            # Only short terms - each must prefix a column, and a prefix LIKE can still use the column indexes
+            relevance = "0"
+            conditions = []
+            for i, term in enumerate(terms):
+                params[f'prefix_{i}'] = _like_prefix(term)
+                conditions.append(
+                    f"(email LIKE :prefix_{i} ESCAPE '\\\\' OR first_name LIKE :prefix_{i} ESCAPE '\\\\'"
+                    f" OR last_name LIKE :prefix_{i} ESCAPE '\\\\')"
+                )
+            if after:
+                conditions.append("user_id > :cursor_id")
+        
+        search_query = sql(f"""
+            SELECT user_id, email, role, first_name, last_name, phone, is_active,
+                   {relevance} as relevance
             FROM users
-            WHERE email LIKE :search 
-               OR first_name LIKE :search 
-               OR last_name LIKE :search
-            LIMIT 20
+            WHERE {' AND '.join(conditions)}
+            ORDER BY relevance DESC, user_id
+            LIMIT :limit
         """)
         
-        users = db.session.execute(search_query, {'search': f'%{query_string}%'}).fetchall()
+        users = db.session.execute(search_query, params).fetchall()
+        cursor = None
+        if len(users) > limit:
+            users = users[:limit]
+            cursor = encode_rank_cursor(float(users[-1].relevance), users[-1].user_id)
         
-        return jsonify({'users': [dict(row._mapping) for row in users]}), 200
+        return jsonify({
+            'users': [{k: v for k, v in row._mapping.items() if k != 'relevance'} for row in users],
+            'next_cursor': cursor
+        }), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -0,0 +1,105 @@
+"""Coalesce concurrent identical requests into one execution of the view"""
+import logging
+import threading
+from functools import wraps
+
+from flask import current_app, make_response, request
+
+from cache import TTLCache
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    """One in-flight execution that other requests can wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Runs a function once per key no matter how many threads ask for it at the same time.
+
+    The first caller for a key (the leader) runs it; callers arriving
+    while it runs wait for its result, or its exception, and share it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def in_flight(self, key):
+        with self._lock:
+            return key in self._calls
+
+    def do(self, key, fn):
+        """Return (result, shared); `shared` is False only for the caller that ran `fn`."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            if call.done.wait(Config.SINGLE_FLIGHT_WAIT_SECONDS):
+                if call.error is not None:
+                    raise call.error
+                return call.result, True
+            logger.warning('Gave up waiting for in-flight %s; running it again', key[0])
+            return fn(), False
+
+        try:
+            call.result = fn()
+            return call.result, False
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+flights = SingleFlight()
+
+
+def _request_key():
+    user = getattr(request, 'user', None)
+    role = user['role'] if user else None
+    return request.endpoint, request.full_path, request.headers.get('Accept', ''), role
+
+
+def _capture(response):
+    # Responses are not shareable across requests; their body, status and headers are
+    return response.get_data(), response.status_code, list(response.headers.items())
+
+
+def single_flight(stale_seconds=0):
+    """Share one run of the view between concurrent identical requests.
+
+    Requests are identical when they hit the same endpoint with the same
+    path, query string, Accept header and caller role. With
+    `stale_seconds`, a request arriving while a refresh runs gets the
+    previous successful response at once, if it is at most that old,
+    instead of waiting. Coalescing happens per worker process.
+    """
+    recent = TTLCache(ttl_seconds=stale_seconds) if stale_seconds > 0 else None
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            key = _request_key()
+            captured = None
+            if recent is not None and flights.in_flight(key):
+                captured = recent.get(key)
+            if captured is None:
+                captured, shared = flights.do(key, lambda: _capture(make_response(view(*args, **kwargs))))
+                if recent is not None and not shared and captured[1] == 200:
+                    recent.set(key, captured)
+            body, status, headers = captured
+            return current_app.response_class(body, status=status, headers=headers)
+        return wrapper
+    return decorator
@@ -0,0 +1,133 @@
+"""Per-request SQL statement counts and timings, Server-Timing header and slow-query log"""
+import logging
+import re
+import threading
+import time
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from config import Config
+
+slow_query_log = logging.getLogger('university.slow_query')
+
+# Endpoint name used for requests that match no route
+UNMATCHED_ENDPOINT = '<unmatched>'
+
+_WHITESPACE = re.compile(r'\s+')
+# Expanded IN lists of any length collapse to one shape
+_PLACEHOLDER_LIST = re.compile(r'\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))*\s*\)')
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_STRING = re.compile(r"'(?:[^'\\]|\\.|'')*'")
+
+
+def normalize_sql(statement):
+    """Collapse whitespace, literals and IN lists so equal query shapes compare equal."""
+    statement = _STRING.sub('?', statement)
+    statement = _NUMBER.sub('?', statement)
+    statement = _PLACEHOLDER_LIST.sub('(...)', statement)
+    return _WHITESPACE.sub(' ', statement).strip()
+
+
+class EndpointStats:
+    """Request, statement and time totals per Flask endpoint for this worker."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def record(self, endpoint, queries, db_seconds, total_seconds):
+        with self._lock:
+            stats = self._stats.setdefault(endpoint, {
+                'requests': 0, 'queries': 0, 'max_queries': 0, 'db_ms': 0.0, 'total_ms': 0.0
+            })
+            stats['requests'] += 1
+            stats['queries'] += queries
+            stats['max_queries'] = max(stats['max_queries'], queries)
+            stats['db_ms'] += db_seconds * 1000
+            stats['total_ms'] += total_seconds * 1000
+
+    def snapshot(self):
+        with self._lock:
+            rows = []
+            for endpoint, stats in self._stats.items():
+                requests = stats['requests']
+                rows.append({
+                    'endpoint': endpoint,
+                    'requests': requests,
+                    'queries_per_request': round(stats['queries'] / requests, 2),
+                    'max_queries': stats['max_queries'],
+                    'db_ms_per_request': round(stats['db_ms'] / requests, 3),
+                    'total_ms_per_request': round(stats['total_ms'] / requests, 3),
+                    'db_ms_total': round(stats['db_ms'], 3),
+                })
+        return sorted(rows, key=lambda row: row['db_ms_total'], reverse=True)
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+endpoint_stats = EndpointStats()
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Kept on the execution context, which is dropped with the statement whether or not it succeeds
+    if context is not None:
+        context._sql_metrics_started = time.perf_counter()
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    _record(statement, context)
+
+
+@event.listens_for(Engine, 'handle_error')
+def _handle_error(exception_context):
+    # A failed statement (a lock wait timeout, say) still spent its time in the database
+    _record(exception_context.statement, exception_context.execution_context)
+
+
+def _record(statement, context):
+    started = getattr(context, '_sql_metrics_started', None)
+    if started is None:
+        return
+    context._sql_metrics_started = None
+    elapsed = time.perf_counter() - started
+    in_request = has_request_context()
+    if in_request and 'sql_queries' in g:
+        g.sql_queries += 1
+        g.sql_seconds += elapsed
+
+    threshold_ms = Config.SLOW_QUERY_MS
+    if threshold_ms > 0 and elapsed * 1000 >= threshold_ms:
+        endpoint = request.endpoint if in_request else threading.current_thread().name
+        slow_query_log.warning('%.1f ms endpoint=%s sql=%s', elapsed * 1000, endpoint, normalize_sql(statement),
+                               extra={'duration_ms': round(elapsed * 1000, 1), 'endpoint': endpoint})
+
+
+def _start_request_timer():
+    g.request_started = time.perf_counter()
+    g.sql_queries = 0
+    g.sql_seconds = 0.0
+
+
+def _finish_request_timer(response):
+    if 'request_started' not in g:
+        return response
+    total = time.perf_counter() - g.request_started
+    response.headers['Server-Timing'] = (
+        f'db;dur={g.sql_seconds * 1000:.1f};desc="{g.sql_queries} queries", '
+        f'app;dur={total * 1000:.1f}'
+    )
+    # One shared key for 404s: raw paths from scanners would add an entry each
+    endpoint_stats.record(request.endpoint or UNMATCHED_ENDPOINT, g.sql_queries, g.sql_seconds, total)
+    return response
+
+
+def init_sql_metrics(app):
+    """Time every request and its SQL; call before the auth and replica before_request hooks are registered."""
+    app.before_request(_start_request_timer)
+    app.after_request(_finish_request_timer)
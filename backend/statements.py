@@ -0,0 +1,24 @@
+"""Registry of prepared SQL statements shared by the blueprints"""
+from functools import lru_cache
+
+from sqlalchemy import bindparam, text
+
+# Distinct statements kept; covers every filter/column combination the routes build
+STATEMENT_CACHE_SIZE = 2048
+
+
+@lru_cache(maxsize=STATEMENT_CACHE_SIZE)
+def sql(statement, *expanding):
+    """Return the text() clause for `statement`, built once per distinct SQL string.
+
+    Building a text() clause parses the string for :params on every call.
+    Handing back the same clause for the same SQL skips that and lets
+    SQLAlchemy's compiled cache hit, so dynamic WHERE/SET builders cost one
+    parse per filter or column combination. Names in `expanding` are bound
+    as expanding IN-list parameters. Clauses are immutable and safe to share
+    across threads.
+    """
+    clause = text(statement)
+    if expanding:
+        clause = clause.bindparams(*(bindparam(name, expanding=True) for name in expanding))
+    return clause
@@ -0,0 +1,37 @@
+"""Chunked NDJSON responses for large listings"""
+from flask import Response, current_app, request, stream_with_context
+
+from config import Config
+from database import db
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+
+def wants_ndjson():
+    """True when the client asked for ?format=ndjson or Accept: application/x-ndjson."""
+    if request.args.get('format') == 'ndjson':
+        return True
+    return request.accept_mimetypes.best == NDJSON_MIMETYPE
+
+
+def stream_ndjson(query, params=None, transform=None):
+    """Stream the rows of `query` as one JSON object per line.
+
+    Rows are read from a server-side cursor in batches of STREAM_BATCH_SIZE
+    and written as each batch arrives, so memory use does not grow with
+    the size of the result. `transform`, if given, is applied to each
+    batch of rows before it is written.
+    """
+    # yield_per is ignored for text() statements, so ask for the server-side cursor and batch size directly
+    batch_size = Config.STREAM_BATCH_SIZE
+    query = query.execution_options(stream_results=True, max_row_buffer=batch_size)
+
+    def generate():
+        result = db.session.execute(query, params or {})
+        dumps = current_app.json.dumps
+        for batch in result.partitions(batch_size):
+            if transform is not None:
+                batch = transform(batch)
+            yield ''.join(dumps(row) + '\n' for row in batch)
+
+    return Response(stream_with_context(generate()), mimetype=NDJSON_MIMETYPE)
@@ -0,0 +1,77 @@
+"""Low-attendance summary: scheduled rebuilds, writes landing during a rebuild, and cascading deletes"""
+
+
+def summary(query):
+    rows = query('SELECT student_id, avg_attendance, total_courses FROM student_attendance_summary ORDER BY student_id')
+    return {row[0]: (float(row[1]), row[2]) for row in rows}
+
+
+def mark_everyone(client, headers, student_ids):
+    for course_id in (1, 2):
+        body = {'course_id': course_id, 'attendance_date': '2024-09-02', 'marked_by': 1,
+                'records': [{'student_id': student_id, 'status': 'present'} for student_id in student_ids]}
+        assert client.post('/api/attendance/bulk', json=body, headers=headers).status_code == 200
+
+
+class WriteDuringRebuild:
+    """Connection wrapper that runs `action` right after refresh_all commits the staging table."""
+
+    def __init__(self, conn, action):
+        self.conn = conn
+        self.action = action
+
+    def execution_options(self, **options):
+        self.conn.execution_options(**options)
+        return self
+
+    def execute(self, *args, **kwargs):
+        return self.conn.execute(*args, **kwargs)
+
+    def commit(self):
+        self.conn.commit()
+        if self.action is not None:
+            action, self.action = self.action, None
+            action()
+
+
+def test_scheduled_rebuild_skips_a_fresh_table(mysql, app):
+    from attendance_report import refresh_all_once
+
+    with app.app_context():
+        assert refresh_all_once() is True
+        # Another worker rebuilt it moments ago
+        assert refresh_all_once(max_age=3600) is False
+        assert refresh_all_once() is True
+
+
+def test_enrollments_removed_during_a_rebuild_leave_the_summary(mysql, app, client, auth, query):
+    from attendance_report import refresh_all
+    from database import db
+
+    headers = auth(1, 'admin')
+    mark_everyone(client, headers, mysql['student_ids'])
+    assert summary(query)[1] == (100.0, 2)
+
+    def drop_student_1():
+        for course_id in (1, 2):
+            assert client.delete(f'/api/enrollments/1/{course_id}', headers=headers).status_code == 200
+
+    with app.app_context():
+        with db.engine.connect() as conn:
+            refresh_all(WriteDuringRebuild(conn, drop_student_1))
+
+    # The staging copy was built before the deletes; the post-swap pass must drop the row
+    assert 1 not in summary(query)
+    assert set(summary(query)) == set(mysql['student_ids'][1:])
+
+
+def test_cascading_deletes_refresh_the_summary(mysql, client, auth, query):
+    headers = auth(1, 'admin')
+    mark_everyone(client, headers, mysql['student_ids'])
+
+    assert client.delete('/api/courses/2', headers=headers).status_code == 200
+    assert set(summary(query).values()) == {(100.0, 1)}
+
+    # User 10 is student 1
+    assert client.delete('/api/users/10', headers=headers).status_code == 200
+    assert 1 not in summary(query)
@@ -0,0 +1,97 @@
+"""Bearer token checks: one verification per request and the verified-token LRU"""
+import time
+
+import jwt
+import pytest
+
+import auth_utils
+from auth_utils import generate_access_token, verify_access_token
+
+
+@pytest.fixture
+def decodes(app, monkeypatch):
+    """Count jwt decodes; start from an empty verified-token cache."""
+    calls = []
+    decode = auth_utils.decode_access_token
+
+    def counting(token):
+        calls.append(token)
+        return decode(token)
+
+    monkeypatch.setattr(auth_utils, 'decode_access_token', counting)
+    auth_utils._verified_tokens.clear()
+    yield calls
+    auth_utils._verified_tokens.clear()
+
+
+def token(app, user_id=1, role='admin', expires_in_seconds=300):
+    with app.app_context():
+        return generate_access_token(user_id, role, expires_in_seconds)
+
+
+def test_repeated_token_is_decoded_once(app, decodes):
+    access_token = token(app)
+    with app.app_context():
+        first = verify_access_token(access_token)
+        assert verify_access_token(access_token) == first
+    assert len(decodes) == 1
+
+
+def test_cached_payload_is_dropped_once_expired(app, decodes):
+    access_token = token(app, expires_in_seconds=1)
+    with app.app_context():
+        verify_access_token(access_token)
+        time.sleep(1.1)
+        with pytest.raises(jwt.ExpiredSignatureError):
+            verify_access_token(access_token)
+    assert len(decodes) == 2
+    assert not auth_utils._verified_tokens
+
+
+def test_cache_is_bounded_least_recently_used_first(app, decodes, monkeypatch):
+    monkeypatch.setitem(app.config, 'TOKEN_CACHE_SIZE', 2)
+    tokens = [token(app, user_id) for user_id in (1, 2, 3)]
+    with app.app_context():
+        verify_access_token(tokens[0])
+        verify_access_token(tokens[1])
+        verify_access_token(tokens[0])
+        verify_access_token(tokens[2])
+        assert len(auth_utils._verified_tokens) == 2
+        verify_access_token(tokens[0])
+        verify_access_token(tokens[1])
+    # tokens[1] was the least recently used when tokens[2] arrived, so only it is decoded again
+    assert decodes.count(tokens[1]) == 2
+    assert decodes.count(tokens[0]) == 1
+
+
+def test_cache_can_be_turned_off(app, decodes, monkeypatch):
+    monkeypatch.setitem(app.config, 'TOKEN_CACHE_SIZE', 0)
+    access_token = token(app)
+    with app.app_context():
+        verify_access_token(access_token)
+        verify_access_token(access_token)
+    assert len(decodes) == 2
+
+
+def test_decorated_view_verifies_the_token_once_per_request(app, client, decodes, monkeypatch):
+    # Without the cache every verification is a decode, so this counts verifications
+    monkeypatch.setitem(app.config, 'TOKEN_CACHE_SIZE', 0)
+    response = client.get('/api/admin/pool', headers={'Authorization': f'Bearer {token(app)}'})
+    assert response.status_code == 200
+    assert len(decodes) == 1
+
+
+@pytest.mark.parametrize('headers, status, error', [
+    ({}, 401, 'Authorization token is missing'),
+    ({'Authorization': 'Bearer '}, 401, 'Authorization token is missing'),
+    ({'Authorization': 'Bearer not.a.jwt'}, 401, 'Invalid token'),
+])
+def test_rejected_tokens(client, decodes, headers, status, error):
+    response = client.get('/api/admin/pool', headers=headers)
+    assert response.status_code == status
+    assert response.get_json() == {'error': error}
+
+
+def test_role_is_checked_after_verification(app, client, decodes):
+    response = client.get('/api/admin/pool', headers={'Authorization': f'Bearer {token(app, 10, "student")}'})
+    assert response.status_code == 403
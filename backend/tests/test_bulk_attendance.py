@@ -0,0 +1,129 @@
+"""POST /api/attendance/bulk: validation, per-row outcomes and repeated or concurrent submissions"""
+import threading
+
+import pytest
+
+from attendance_counters import _delta
+
+SESSION = {'course_id': 1, 'attendance_date': '2024-09-02', 'marked_by': 1}
+
+
+@pytest.mark.parametrize('old, new, delta', [
+    (None, 'present', (1, 1, 0, 0)),
+    (None, 'absent', (1, 0, 0, 0)),
+    ('present', 'absent', (0, -1, 0, 0)),
+    ('late', 'excused', (0, 0, -1, 1)),
+    ('absent', 'absent', (0, 0, 0, 0)),
+    ('present', None, (-1, -1, 0, 0)),
+])
+def test_counter_delta(old, new, delta):
+    assert _delta(old, new) == delta
+
+
+@pytest.mark.parametrize('body, error', [
+    ({'course_id': 1, 'attendance_date': '2024-09-02', 'records': []}, 'Missing required field: marked_by'),
+    ({**SESSION, 'records': []}, 'records must be a non-empty list'),
+    ({**SESSION, 'records': {'student_id': 1}}, 'records must be a non-empty list'),
+])
+def test_rejects_malformed_sessions(client, auth, body, error):
+    response = client.post('/api/attendance/bulk', json=body, headers=auth(1, 'admin'))
+    assert response.status_code == 400
+    assert response.get_json()['error'] == error
+
+
+def test_reports_every_invalid_row(client, auth):
+    records = [{'student_id': '1', 'status': 'present'}, {'student_id': 2, 'status': 'asleep'}, 'x']
+    response = client.post('/api/attendance/bulk', json={**SESSION, 'records': records}, headers=auth(1, 'admin'))
+    assert response.status_code == 400
+    body = response.get_json()
+    assert body['error'] == 'No valid attendance records'
+    assert [result['outcome'] for result in body['results']] == ['error'] * 3
+    assert body['results'][1]['error'].startswith('status must be one of')
+
+
+def session(statuses, **extra):
+    return {**SESSION, **extra, 'records': [{'student_id': student_id, 'status': status}
+                                            for student_id, status in statuses.items()]}
+
+
+def counters(query, course_id=1):
+    rows = query("""
+        SELECT student_id, classes_held, classes_attended, classes_late, classes_excused
+        FROM enrollments WHERE course_id = :course_id ORDER BY student_id
+    """, course_id=course_id)
+    return {row[0]: tuple(row[1:]) for row in rows}
+
+
+def test_marks_then_updates_a_session(mysql, client, auth, query):
+    headers = auth(1, 'admin')
+    statuses = {1: 'present', 2: 'absent', 3: 'late', 4: 'excused', 5: 'present'}
+    body = session({**statuses, 99: 'present'})
+    response = client.post('/api/attendance/bulk', json=body, headers=headers)
+    assert response.status_code == 200
+    assert {key: response.get_json()[key] for key in ('created', 'updated', 'failed')} == \
+        {'created': 5, 'updated': 0, 'failed': 1}
+    assert response.get_json()['results'][-1]['error'] == 'Student is not enrolled in this course'
+    assert counters(query)[1] == (1, 1, 0, 0)
+    assert counters(query)[3] == (1, 0, 1, 0)
+
+    # Correcting the session changes statuses without counting the class twice
+    response = client.post('/api/attendance/bulk', json=session({1: 'absent', 3: 'present'}), headers=headers)
+    assert response.get_json()['updated'] == 2
+    assert counters(query)[1] == (1, 0, 0, 0)
+    assert counters(query)[3] == (1, 1, 0, 0)
+    assert query('SELECT COUNT(*) FROM attendance') == [(5,)]
+
+
+def test_concurrent_submissions_count_the_class_once(mysql, app, auth, query):
+    """A double-clicked submit arriving on several workers at once must leave classes_held at 1."""
+    headers = auth(1, 'admin')
+    body = session({student_id: 'present' for student_id in mysql['student_ids']})
+    callers = 8
+    barrier = threading.Barrier(callers)
+    responses = []
+
+    def submit():
+        barrier.wait()
+        response = app.test_client().post('/api/attendance/bulk', json=body, headers=headers)
+        responses.append((response.status_code, response.get_json()))
+
+    threads = [threading.Thread(target=submit) for _ in range(callers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert [status for status, _ in responses] == [200] * callers
+    assert sorted(result['created'] for _, result in responses) == [0] * (callers - 1) + [5]
+    assert set(counters(query).values()) == {(1, 1, 0, 0)}
+    assert query('SELECT COUNT(*) FROM attendance') == [(5,)]
+
+
+def test_concurrent_sessions_of_courses_sharing_students(mysql, app, auth, query):
+    """Bulk marks of two courses with the same students, racing each other, must all commit."""
+    headers = auth(1, 'admin')
+    rounds = 5
+    barrier = threading.Barrier(2)
+    statuses = []
+
+    def mark(course_id):
+        client = app.test_client()
+        for day in range(rounds):
+            body = session({student_id: 'present' if day % 2 else 'absent' for student_id in mysql['student_ids']},
+                           course_id=course_id, attendance_date=f'2024-09-{day + 2:02d}')
+            barrier.wait()
+            statuses.append(client.post('/api/attendance/bulk', json=body, headers=headers).status_code)
+
+    threads = [threading.Thread(target=mark, args=(course_id,)) for course_id in (1, 2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert statuses == [200] * 2 * rounds
+    for course_id in (1, 2):
+        assert set(counters(query, course_id).values()) == {(rounds, rounds // 2, 0, 0)}
+    # The summary was refreshed after each commit: both courses at 40%
+    summary = query('SELECT student_id, avg_attendance, total_courses FROM student_attendance_summary')
+    assert {(float(avg), total) for _, avg, total in summary} == {(40.0, 2)}
+    assert len(summary) == len(mysql['student_ids'])
@@ -0,0 +1,203 @@
+"""Incremental CGPA sums: per-row deltas, and agreement with a full recompute after grade writes"""
+import random
+import threading
+
+import pytest
+
+from cgpa import _delta
+from grading import GRADE_POINTS, calculate_letter_grade
+
+
+@pytest.mark.parametrize('old, new, delta', [
+    (None, 'A', (27, 3)),
+    ('A', None, (-27, -3)),
+    ('A', 'B+', (-3, 0)),
+    (None, 'F', (0, 3)),
+    ('F', None, (0, -3)),
+    ('B', 'B', (0, 0)),
+    (None, None, (0, 0)),
+])
+def test_delta(old, new, delta):
+    assert _delta(3, old, new) == delta
+
+
+def test_deltas_sum_to_the_final_letter():
+    rng = random.Random(3)
+    letters = list(GRADE_POINTS) + [None]
+    for _ in range(200):
+        history = [rng.choice(letters) for _ in range(rng.randrange(1, 8))]
+        points = graded = 0
+        for old, new in zip([None] + history[:-1], history):
+            step = _delta(4, old, new)
+            points, graded = points + step[0], graded + step[1]
+        final = history[-1]
+        expected = (4 * GRADE_POINTS[final], 4) if final else (0, 0)
+        assert (points, graded) == pytest.approx(expected)
+
+
+def marks(total):
+    """Grade body fields whose total_marks is `total` (internals average to half of it)."""
+    return {'internal1_marks': total / 2, 'internal2_marks': total / 2, 'external_marks': total / 2}
+
+
+def sums(query):
+    rows = query('SELECT student_id, grade_points_total, graded_credits, cgpa FROM students ORDER BY student_id')
+    return {row[0]: (float(row[1]), int(row[2]), float(row[3])) for row in rows}
+
+
+def recomputed(app, student_ids):
+    """The sums recompute_students would write, read back and rolled away."""
+    from sqlalchemy import text
+    from cgpa import recompute_students
+    from database import db
+
+    with app.app_context():
+        recompute_students(student_ids)
+        rows = db.session.execute(text(
+            'SELECT student_id, grade_points_total, graded_credits, cgpa FROM students ORDER BY student_id'
+        )).fetchall()
+        db.session.rollback()
+    return {row[0]: (float(row[1]), int(row[2]), float(row[3])) for row in rows}
+
+
+def test_grade_writes_keep_the_sums(mysql, app, client, auth, query):
+    headers = auth(mysql['admin_user_id'], 'admin')
+
+    def post(student_id, course_id, total):
+        body = {'student_id': student_id, 'course_id': course_id, **marks(total)}
+        return client.post('/api/grades/', json=body, headers=headers)
+
+    assert post(1, 1, 80).status_code == 201
+    assert post(1, 2, 20).status_code == 201
+    points = 3 * GRADE_POINTS[calculate_letter_grade(80)] + 4 * GRADE_POINTS[calculate_letter_grade(20)]
+    assert sums(query)[1] == (points, 7, round(points / 7, 2))
+
+    # Regrading to the same credits changes only the points; deleting takes the course out entirely
+    assert client.put('/api/grades/1/1', json=marks(95), headers=headers).status_code == 200
+    assert client.delete('/api/grades/1/2', headers=headers).status_code == 200
+    letter = calculate_letter_grade(95)
+    assert sums(query)[1] == (3 * GRADE_POINTS[letter], 3, GRADE_POINTS[letter])
+    assert sums(query) == recomputed(app, mysql['student_ids'])
+
+
+def test_random_writes_match_a_full_recompute(mysql, app, client, auth, query):
+    headers = auth(mysql['admin_user_id'], 'admin')
+    rng = random.Random(11)
+    graded = set()
+    for _ in range(60):
+        key = (rng.choice(mysql['student_ids']), rng.choice((1, 2)))
+        path = '/api/grades/{}/{}'.format(*key)
+        total = rng.choice((0, 15, 45, 62, 71, 88, 100))
+        if key not in graded:
+            response = client.post('/api/grades/', json={'student_id': key[0], 'course_id': key[1], **marks(total)},
+                                   headers=headers)
+            graded.add(key)
+        elif rng.random() < 0.3:
+            response = client.delete(path, headers=headers)
+            graded.discard(key)
+        else:
+            response = client.put(path, json=marks(total), headers=headers)
+        assert response.status_code in (200, 201)
+    assert sums(query) == recomputed(app, mysql['student_ids'])
+
+    # A credit change reweights every grade of the course
+    assert client.put('/api/courses/2', json={'credits': 2}, headers=headers).status_code == 200
+    assert sums(query) == recomputed(app, mysql['student_ids'])
+
+
+def test_concurrent_regrades_of_one_student(mysql, app, auth, query):
+    """Regrades of one student's two courses arriving together must both land in the sums."""
+    headers = auth(mysql['admin_user_id'], 'admin')
+    client = app.test_client()
+    for course_id in (1, 2):
+        client.post('/api/grades/', json={'student_id': 1, 'course_id': course_id, **marks(50)}, headers=headers)
+
+    rounds = 10
+    barrier = threading.Barrier(2)
+    statuses = []
+
+    def regrade(course_id, totals):
+        local = app.test_client()
+        for total in totals:
+            barrier.wait()
+            statuses.append(local.put(f'/api/grades/1/{course_id}', json=marks(total), headers=headers).status_code)
+
+    threads = [threading.Thread(target=regrade, args=(course_id, [40 + 6 * n for n in range(rounds)]))
+               for course_id in (1, 2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert statuses == [200] * 2 * rounds
+    assert sums(query) == recomputed(app, mysql['student_ids'])
+
+
+def test_cohort_recompute_rebuilds_every_student(mysql, app, client, auth, query):
+    from sqlalchemy import text
+    from cgpa import recompute_cohort
+    from database import db
+
+    headers = auth(mysql['admin_user_id'], 'admin')
+    for student_id in mysql['student_ids']:
+        for course_id in (1, 2):
+            client.post('/api/grades/', json={'student_id': student_id, 'course_id': course_id,
+                                              **marks(40 + 10 * student_id + course_id)}, headers=headers)
+    expected = sums(query)
+    with app.app_context():
+        with db.engine.begin() as conn:
+            conn.execute(text('UPDATE students SET grade_points_total = 0, graded_credits = 0, cgpa = 0'))
+
+    assert recompute_cohort(app, chunk_size=2, workers=3) == len(mysql['student_ids'])
+    assert sums(query) == expected
+
+
+def run_together(*calls):
+    """Run each call on its own thread, released together; return their status codes."""
+    barrier = threading.Barrier(len(calls))
+    statuses = []
+
+    def run(call):
+        barrier.wait()
+        statuses.append(call().status_code)
+
+    threads = [threading.Thread(target=run, args=(call,)) for call in calls]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return statuses
+
+
+def test_concurrent_imports_of_two_courses(mysql, app, auth, query):
+    """Imports sharing students but grouping them by delta in opposite orders must not deadlock."""
+    headers = auth(mysql['admin_user_id'], 'admin')
+    students = mysql['student_ids']
+
+    def importer(course_id, totals):
+        client = app.test_client()
+        body = {'course_id': course_id, 'records': [{'student_id': student_id, **marks(total)}
+                                                    for student_id, total in zip(students, totals)]}
+        return lambda: client.post('/api/grades/import', json=body, headers=headers)
+
+    for round_number in range(5):
+        totals = [95, 75, 55, 95, 75] if round_number % 2 else [55, 95, 75, 55, 95]
+        statuses = run_together(importer(1, totals), importer(2, totals[::-1]))
+        assert statuses == [200, 200]
+    assert sums(query) == recomputed(app, students)
+
+
+def test_credit_change_during_regrades(mysql, app, client, auth, query):
+    """A credit change and regrades of the same course both land, whichever locks the course first."""
+    headers = auth(mysql['admin_user_id'], 'admin')
+    for student_id in mysql['student_ids']:
+        client.post('/api/grades/', json={'student_id': student_id, 'course_id': 1, **marks(50)}, headers=headers)
+
+    for credits in (4, 2, 5):
+        regrader, editor = app.test_client(), app.test_client()
+        statuses = run_together(
+            lambda: regrader.put('/api/grades/3/1', json=marks(30 + 10 * credits), headers=headers),
+            lambda: editor.put('/api/courses/1', json={'credits': credits}, headers=headers),
+        )
+        assert statuses == [200, 200]
+        assert sums(query) == recomputed(app, mysql['student_ids'])
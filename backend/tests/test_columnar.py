@@ -0,0 +1,118 @@
+"""Columnar, dictionary-encoded and MessagePack list responses"""
+import decimal
+from datetime import date
+
+import pytest
+from flask import Flask
+from sqlalchemy import create_engine, text
+
+import columnar
+from columnar import COLUMNAR_MIMETYPE, DICTIONARY_MIN_ROWS, list_response, to_columnar
+from json_provider import init_json_provider
+
+STATUSES = ('present', 'absent', 'late')
+
+
+def records(count):
+    return [{'student_id': n, 'status': STATUSES[n % 3], 'remarks': None if n % 3 == 0 else f'note {n}',
+             'course_name': 'Data Structures', 'attendance_date': date(2024, 9, 2)} for n in range(count)]
+
+
+def expand(body):
+    """Rebuild the row dicts a client would from a columnar body."""
+    dictionaries = body.get('dictionaries', {})
+    result = []
+    for row in body['rows']:
+        entry = dict(zip(body['columns'], row))
+        for name, values in dictionaries.items():
+            if entry[name] is not None:
+                entry[name] = values[entry[name]]
+        result.append(entry)
+    return result
+
+
+@pytest.fixture(scope='module')
+def rows():
+    engine = create_engine('sqlite://')
+    with engine.connect() as connection:
+        result = connection.execute(text("SELECT 1 AS course_id, 'CS101' AS course_code UNION ALL SELECT 2, 'CS102'"))
+        rows = result.fetchall()
+    engine.dispose()
+    return rows
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    init_json_provider(app)
+    with app.app_context():
+        yield app
+
+
+def test_empty_and_row_objects(rows):
+    assert to_columnar([]) == {'columns': [], 'rows': []}
+    assert to_columnar(rows) == {'columns': ['course_id', 'course_code'], 'rows': [(1, 'CS101'), (2, 'CS102')]}
+
+
+def test_dictionary_encoding_round_trips():
+    data = records(30)
+    body = to_columnar(data, dictionary=True)
+    assert set(body['dictionaries']) == {'status', 'course_name'}
+    assert body['dictionaries']['status'] == list(STATUSES)
+    # Nulls stay null, and the mostly-distinct remarks column is left as strings
+    assert body['rows'][0][2] is None
+    assert body['rows'][1][2] == 'note 1'
+    assert expand(body) == data
+
+
+def test_small_pages_skip_dictionaries():
+    body = to_columnar(records(DICTIONARY_MIN_ROWS - 1), dictionary=True)
+    assert 'dictionaries' not in body
+    assert expand(body) == records(DICTIONARY_MIN_ROWS - 1)
+
+
+@pytest.mark.parametrize('query, headers, mimetype', [
+    ('', {}, 'application/json'),
+    ('?format=columnar', {}, COLUMNAR_MIMETYPE),
+    ('', {'Accept': COLUMNAR_MIMETYPE}, COLUMNAR_MIMETYPE),
+    ('?format=msgpack', {}, 'application/msgpack'),
+    ('', {'Accept': 'application/x-msgpack'}, 'application/msgpack'),
+])
+def test_negotiates_the_format(app, query, headers, mimetype):
+    with app.test_request_context('/api/attendance/' + query, headers=headers):
+        response, status = list_response({'attendance': records(3), 'page': 1, 'has_more': False}, 'attendance')
+    assert status == 200
+    assert response.mimetype == mimetype
+    assert 'Accept' in response.vary
+
+
+def test_columnar_keeps_paging_fields_and_encodes_like_json(app):
+    data = records(20)
+    data[0]['gpa'] = decimal.Decimal('8.50')
+    for row in data[1:]:
+        row['gpa'] = None
+    with app.test_request_context('/api/attendance/?format=columnar&dictionary=true'):
+        response, _ = list_response({'attendance': data, 'page': 2, 'has_more': True}, 'attendance')
+    with app.test_request_context('/api/attendance/'):
+        plain, _ = list_response({'attendance': data[:1]}, 'attendance')
+    body = response.get_json(force=True)
+    assert (body['page'], body['has_more']) == (2, True)
+    assert expand(body['attendance'])[0] == plain.get_json(force=True)['attendance'][0]
+    assert expand(body['attendance'])[0]['attendance_date'] == 'Mon, 02 Sep 2024 00:00:00 GMT'
+
+
+def test_msgpack_body(app):
+    msgpack = pytest.importorskip('msgpack')
+    with app.test_request_context('/api/attendance/?format=msgpack&dictionary=true'):
+        response, _ = list_response({'attendance': records(20), 'page': 1}, 'attendance')
+    body = msgpack.unpackb(response.get_data())
+    assert body['page'] == 1
+    assert [row['status'] for row in expand(body['attendance'])] == [STATUSES[n % 3] for n in range(20)]
+    assert expand(body['attendance'])[0]['attendance_date'] == 'Mon, 02 Sep 2024 00:00:00 GMT'
+
+
+def test_msgpack_without_the_package_is_406(app, monkeypatch):
+    monkeypatch.setattr(columnar, 'msgpack', None)
+    with app.test_request_context('/api/attendance/?format=msgpack'):
+        response, status = list_response({'attendance': records(3)}, 'attendance')
+    assert status == 406
@@ -0,0 +1,91 @@
+"""conditional(): weak ETags from table versions, 304 revalidation and Cache-Control"""
+import pytest
+from flask import Flask, jsonify
+
+import conditional
+from config import Config
+
+
+class FakeVersions:
+    def __init__(self):
+        self.versions = {'courses': 1, 'departments': 1}
+
+    def get(self, tables):
+        return [self.versions.get(table, 0) for table in tables]
+
+
+@pytest.fixture
+def versions(monkeypatch):
+    fake = FakeVersions()
+    monkeypatch.setattr(conditional, 'table_versions', fake)
+    return fake
+
+
+@pytest.fixture
+def client(versions):
+    app = Flask(__name__)
+    calls = app.config['VIEW_CALLS'] = []
+
+    @app.route('/courses')
+    @conditional.conditional('courses', 'departments')
+    def courses():
+        calls.append('courses')
+        return jsonify({'courses': []})
+
+    @app.route('/cached')
+    @conditional.conditional('courses', cache_control='private, max-age=60')
+    def cached():
+        return jsonify({})
+
+    @app.route('/missing')
+    @conditional.conditional('courses')
+    def missing():
+        return jsonify({'error': 'Not found'}), 404
+
+    return app.test_client()
+
+
+def test_a_matching_etag_gets_a_304_without_running_the_view(client):
+    first = client.get('/courses')
+    assert first.status_code == 200
+    etag = first.headers['ETag']
+    assert etag.startswith('W/"')
+    assert 'Last-Modified' not in first.headers
+
+    second = client.get('/courses', headers={'If-None-Match': etag})
+    assert second.status_code == 304
+    assert second.headers['ETag'] == etag
+    assert second.get_data() == b''
+    assert client.application.config['VIEW_CALLS'] == ['courses']
+
+
+def test_a_write_changes_the_etag(client, versions):
+    etag = client.get('/courses').headers['ETag']
+    versions.versions['departments'] += 1
+    response = client.get('/courses', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+
+
+def test_query_string_and_accept_are_part_of_the_tag(client):
+    etag = client.get('/courses').headers['ETag']
+    assert client.get('/courses?page=2').headers['ETag'] != etag
+    assert client.get('/courses', headers={'Accept': 'application/msgpack'}).headers['ETag'] != etag
+    assert 'Accept' in client.get('/courses').headers['Vary']
+
+
+def test_if_modified_since_alone_never_gets_a_304(client):
+    response = client.get('/courses', headers={'If-Modified-Since': 'Fri, 01 Jan 2100 00:00:00 GMT'})
+    assert response.status_code == 200
+
+
+def test_cache_control(client):
+    assert client.get('/courses').headers['Cache-Control'] == Config.DEFAULT_CACHE_CONTROL
+    etag = client.get('/cached').headers['ETag']
+    assert client.get('/cached', headers={'If-None-Match': etag}).headers['Cache-Control'] == 'private, max-age=60'
+
+
+def test_errors_are_passed_through_untagged(client):
+    response = client.get('/missing')
+    assert response.status_code == 404
+    assert 'ETag' not in response.headers
@@ -0,0 +1,64 @@
+"""Dashboard caches: high-churn writes drop only the dashboards they touch and never bump table_versions"""
+from collections import namedtuple
+
+import pytest
+
+import attendance_report
+import conditional
+import reference
+
+Course = namedtuple('Course', 'course_id course_code course_name faculty_id')
+
+
+@pytest.fixture
+def caches(app, monkeypatch):
+    from routes import faculty, students
+
+    monkeypatch.setattr(attendance_report, 'refresh_committed', lambda student_ids: None)
+    monkeypatch.setattr(conditional.table_versions, 'get', lambda tables: [1] * len(tables))
+    monkeypatch.setattr(conditional.table_versions, 'bump', lambda table: pytest.fail(f'bumped {table}'))
+    monkeypatch.setattr(reference.reference_data, 'lookup', lambda name: {1: Course(1, 'CS101', 'Programming', 7),
+                                                                           2: Course(2, 'CS102', 'Structures', 8)})
+    for cache in (students.dashboard_cache, faculty.dashboard_cache):
+        cache.clear()
+        for key in (1, 2, 7, 8):
+            cache.get_or_build(key, lambda: 'built')
+    yield students.dashboard_cache, faculty.dashboard_cache
+    students.dashboard_cache.clear()
+    faculty.dashboard_cache.clear()
+
+
+def cached(cache):
+    return {key for key in (1, 2, 7, 8) if cache.get_or_build(key, lambda: None) is not None}
+
+
+def test_high_churn_tables_are_not_versioned():
+    assert not {'enrollments', 'attendance', 'grades'} & set(conditional.VERSIONED_TABLES)
+
+
+@pytest.mark.parametrize('table', ['enrollments', 'attendance', 'grades'])
+def test_a_write_drops_one_student_and_one_teacher(caches, table):
+    from cache import notify_write
+
+    student_cache, faculty_cache = caches
+    notify_write(table, student_id=2, course_id=1)
+    assert cached(student_cache) == {1, 7, 8}
+    assert cached(faculty_cache) == {1, 2, 8}
+
+
+def test_a_bulk_write_drops_each_student(caches):
+    from cache import notify_write
+
+    student_cache, faculty_cache = caches
+    notify_write('attendance', course_id=2, student_ids=[1, 7])
+    assert cached(student_cache) == {2, 8}
+    assert cached(faculty_cache) == {1, 2, 7}
+
+
+def test_a_write_without_keys_drops_everything(caches):
+    from cache import notify_write
+
+    student_cache, faculty_cache = caches
+    notify_write('enrollments')
+    assert cached(student_cache) == set()
+    assert cached(faculty_cache) == set()
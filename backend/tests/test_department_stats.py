@@ -0,0 +1,108 @@
+"""Department stats: per-table counts that match the old COUNT(DISTINCT) join without its fan-out"""
+import pytest
+from flask import Flask
+from sqlalchemy import text
+
+import conditional
+from database import db
+
+# The query get_department_stats ran before: students x faculty x courses rows per department
+FAN_OUT_QUERY = """
+    SELECT
+        d.department_id,
+        d.department_name,
+        COUNT(DISTINCT s.student_id) as total_students,
+        COUNT(DISTINCT f.faculty_id) as total_faculty,
+        COUNT(DISTINCT c.course_id) as total_courses
+    FROM departments d
+    LEFT JOIN students s ON d.department_id = s.department_id
+    LEFT JOIN faculty f ON d.department_id = f.department_id
+    LEFT JOIN courses c ON d.department_id = c.department_id
+    GROUP BY d.department_id, d.department_name
+    ORDER BY d.department_name
+"""
+
+# Department id -> (students, faculty, courses)
+COUNTS = {1: (30, 4, 6), 2: (1, 0, 0), 3: (0, 0, 0)}
+
+
+@pytest.fixture
+def stats_app(tmp_path, monkeypatch):
+    from routes import departments
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'stats.db'}"
+    db.init_app(app)
+    app.register_blueprint(departments.bp)
+    with app.app_context():
+        with db.engine.begin() as conn:
+            conn.execute(text('CREATE TABLE table_versions (table_name TEXT, version INT)'))
+            conn.execute(text('INSERT INTO table_versions VALUES (:name, 1)'),
+                         [{'name': name} for name in conditional.VERSIONED_TABLES])
+            conn.execute(text('CREATE TABLE departments (department_id INT, department_name TEXT)'))
+            conn.execute(text('INSERT INTO departments VALUES (1, :a), (2, :b), (3, :c)'),
+                         {'a': 'Computer Science', 'b': 'History', 'c': 'Music'})
+            for number, table in enumerate(('students', 'faculty', 'courses')):
+                key = {'students': 'student_id', 'faculty': 'faculty_id', 'courses': 'course_id'}[table]
+                conn.execute(text(f'CREATE TABLE {table} ({key} INT, department_id INT)'))
+                rows = [{'department_id': department_id}
+                        for department_id, counts in COUNTS.items() for _ in range(counts[number])]
+                for row_id, row in enumerate(rows, start=1):
+                    conn.execute(text(f'INSERT INTO {table} VALUES (:id, :department_id)'), {'id': row_id, **row})
+
+    monkeypatch.setattr(conditional, 'table_versions', conditional.TableVersions())
+    departments.stats_cache.clear()
+    yield app
+    departments.stats_cache.clear()
+    with app.app_context():
+        db.engine.dispose()
+
+
+def expected(department_id, name):
+    students, faculty, courses = COUNTS[department_id]
+    return {'department_id': department_id, 'department_name': name,
+            'total_students': students, 'total_faculty': faculty, 'total_courses': courses}
+
+
+def test_all_departments_match_the_fan_out_query(stats_app):
+    with stats_app.app_context():
+        before = [dict(row._mapping) for row in db.session.execute(text(FAN_OUT_QUERY))]
+        joined_rows = db.session.execute(text("""
+            SELECT COUNT(*) FROM departments d
+            LEFT JOIN students s ON d.department_id = s.department_id
+            LEFT JOIN faculty f ON d.department_id = f.department_id
+            LEFT JOIN courses c ON d.department_id = c.department_id
+            WHERE d.department_id = 1
+        """)).scalar()
+    # What the old query had to aggregate for department 1 alone
+    assert joined_rows == 30 * 4 * 6
+
+    after = stats_app.test_client().get('/api/departments/stats').get_json()['stats']
+    assert after == before
+    assert after[0] == expected(1, 'Computer Science')
+
+
+@pytest.mark.parametrize('department_id, name', [(1, 'Computer Science'), (2, 'History'), (3, 'Music')])
+def test_one_department(stats_app, department_id, name):
+    response = stats_app.test_client().get(f'/api/departments/{department_id}/stats')
+    assert response.get_json()['stats'] == expected(department_id, name)
+
+
+def test_unknown_department_is_a_404(stats_app):
+    assert stats_app.test_client().get('/api/departments/99/stats').status_code == 404
+
+
+def test_cached_until_a_version_moves(stats_app):
+    client = stats_app.test_client()
+    assert client.get('/api/departments/2/stats').get_json()['stats']['total_students'] == 1
+    with stats_app.app_context():
+        with db.engine.begin() as conn:
+            conn.execute(text('INSERT INTO students VALUES (1000, 2)'))
+    assert client.get('/api/departments/2/stats').get_json()['stats']['total_students'] == 1
+
+    # Another worker's write, seen once this worker re-reads table_versions
+    with stats_app.app_context():
+        with db.engine.begin() as conn:
+            conn.execute(text("UPDATE table_versions SET version = version + 1 WHERE table_name = 'students'"))
+    conditional.table_versions._fetched_at = None
+    assert client.get('/api/departments/2/stats').get_json()['stats']['total_students'] == 2
@@ -0,0 +1,34 @@
+"""Enrollment writes: the attendance counters are derived, never taken from the request body"""
+import pytest
+
+from routes.enrollments import COUNTER_FIELDS
+
+
+@pytest.mark.parametrize('field', COUNTER_FIELDS)
+def test_create_rejects_counters(client, auth, field):
+    body = {'student_id': 1, 'course_id': 1, field: 40}
+    response = client.post('/api/enrollments/', json=body, headers=auth(1, 'admin'))
+    assert response.status_code == 400
+    assert field in response.get_json()['error']
+
+
+@pytest.mark.parametrize('field', COUNTER_FIELDS)
+def test_update_rejects_counters(client, auth, field):
+    response = client.put('/api/enrollments/1/1', json={'status': 'completed', field: 40}, headers=auth(1, 'admin'))
+    assert response.status_code == 400
+    assert field in response.get_json()['error']
+
+
+def test_counters_start_at_zero_and_follow_attendance(mysql, client, auth, query):
+    headers = auth(mysql['admin_user_id'], 'admin')
+    assert client.delete('/api/enrollments/1/1', headers=headers).status_code == 200
+    response = client.post('/api/enrollments/', json={'student_id': 1, 'course_id': 1}, headers=headers)
+    assert response.status_code == 201
+    echoed = response.get_json()['enrollment']
+    assert [echoed[field] for field in COUNTER_FIELDS] == [0, 0, 0, 0, 0]
+
+    body = {'student_id': 1, 'course_id': 1, 'attendance_date': '2024-09-02', 'status': 'present', 'marked_by': 1}
+    assert client.post('/api/attendance/', json=body, headers=headers).status_code == 201
+    assert client.put('/api/enrollments/1/1', json={'status': 'completed'}, headers=headers).status_code == 200
+    row = query('SELECT status, classes_attended, classes_held FROM enrollments WHERE student_id = 1 AND course_id = 1')
+    assert tuple(row[0]) == ('completed', 1, 1)
@@ -0,0 +1,62 @@
+"""Faculty dashboard: only admins and the faculty member who owns it may open it"""
+import pytest
+
+import conditional
+
+
+@pytest.fixture
+def dashboards(app, monkeypatch):
+    from routes import faculty
+
+    built = []
+
+    def build(faculty_id):
+        built.append(faculty_id)
+        # Faculty 1 is user 2 and faculty 2 is user 3, as in the MySQL fixture
+        owners = {1: 2, 2: 3}
+        if faculty_id not in owners:
+            return None
+        return {'faculty': {'faculty_id': faculty_id, 'user_id': owners[faculty_id]}, 'courses': []}
+
+    monkeypatch.setattr(conditional.table_versions, 'get', lambda tables: [1] * len(tables))
+    monkeypatch.setattr(faculty, 'build_faculty_dashboard', build)
+    faculty.dashboard_cache.clear()
+    yield built
+    faculty.dashboard_cache.clear()
+
+
+@pytest.mark.parametrize('user_id, role, faculty_id, status', [
+    (2, 'faculty', 1, 200),
+    (3, 'faculty', 2, 200),
+    (3, 'faculty', 1, 403),
+    (2, 'faculty', 2, 403),
+    (1, 'admin', 1, 200),
+    (1, 'admin', 2, 200),
+    (10, 'student', 1, 403),
+    (1, 'admin', 99, 404),
+])
+def test_dashboard_access(dashboards, client, auth, user_id, role, faculty_id, status):
+    response = client.get(f'/api/faculty/{faculty_id}/dashboard', headers=auth(user_id, role))
+    assert response.status_code == status
+    if status == 200:
+        assert response.get_json()['faculty']['faculty_id'] == faculty_id
+
+
+def test_a_cached_dashboard_is_still_checked(dashboards, client, auth):
+    assert client.get('/api/faculty/1/dashboard', headers=auth(2, 'faculty')).status_code == 200
+    # Served from the cache the owner filled, and still refused to someone else
+    assert client.get('/api/faculty/1/dashboard', headers=auth(3, 'faculty')).status_code == 403
+    assert dashboards == [1]
+
+
+def test_students_are_refused_before_anything_is_built(dashboards, client, auth):
+    assert client.get('/api/faculty/1/dashboard', headers=auth(10, 'student')).status_code == 403
+    assert dashboards == []
+
+
+def test_dashboard_of_another_faculty_member(mysql, client, auth):
+    assert client.get('/api/faculty/1/dashboard', headers=auth(2, 'faculty')).status_code == 200
+    assert client.get('/api/faculty/2/dashboard', headers=auth(2, 'faculty')).status_code == 403
+    body = client.get('/api/faculty/2/dashboard', headers=auth(3, 'faculty')).get_json()
+    assert [course['course_code'] for course in body['courses']] == ['CS102']
+    assert len(body['courses'][0]['students']) == 5
@@ -0,0 +1,151 @@
+"""POST /api/grades/import: input validation, course ownership and concurrent imports"""
+import threading
+
+import pytest
+
+import grading
+from grading import GRADE_POINTS, calculate_letter_grade, compute_grades
+from routes.grades import _parse_id, _parse_marks
+
+
+def ladder(marks):
+    """compute_grades one row at a time, the way create_grade does it."""
+    results = []
+    for internal1, internal2, external in marks:
+        total = (internal1 + internal2) / 2 + external
+        results.append((total, total, calculate_letter_grade(total)) if total > 0 else (total, 0, None))
+    return results
+
+
+MARKS = [(i1, i2, ex) for i1 in (0, 12.5, 30, 50) for i2 in (0, 19, 44.5, 50) for ex in (0, 20, 35.25, 50)]
+
+
+def test_compute_grades_matches_per_row_ladder():
+    assert compute_grades(MARKS) == ladder(MARKS)
+
+
+def test_compute_grades_without_numpy(monkeypatch):
+    monkeypatch.setattr(grading, 'np', None)
+    assert compute_grades(MARKS) == ladder(MARKS)
+
+
+@pytest.mark.parametrize('percentage, letter', [(44.99, 'F'), (45, 'D'), (89.99, 'A'), (90, 'A+'), (100, 'A+')])
+def test_letter_boundaries(percentage, letter):
+    assert calculate_letter_grade(percentage) == letter
+
+
+def test_zero_total_gets_no_letter():
+    assert compute_grades([(0, 0, 0)]) == [(0.0, 0, None)]
+
+
+def test_parse_id():
+    assert _parse_id(7) == 7
+    assert _parse_id('7') == 7
+    assert _parse_id(' 7 ') == 7
+    for value in (None, True, 7.5, '7a', '-7', '', [7]):
+        assert _parse_id(value) is None
+
+
+def test_parse_marks():
+    assert _parse_marks(None) == 0.0
+    assert _parse_marks('') == 0.0
+    assert _parse_marks('42.5') == 42.5
+    for value in ('x', 51, -1, float('nan'), [1]):
+        with pytest.raises(ValueError):
+            _parse_marks(value)
+
+
+@pytest.mark.parametrize('body', [
+    {'course_id': 1, 'records': 5},
+    {'course_id': 1, 'records': {'student_id': 1}},
+    {'course_id': 1, 'records': []},
+    {'course_id': 1},
+    {'course_id': 1, 'records': 'student_id,external_marks'},
+])
+def test_records_must_be_a_non_empty_list(client, auth, body):
+    response = client.post('/api/grades/import', json=body, headers=auth(1, 'admin'))
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'records must be a non-empty list'}
+
+
+@pytest.mark.parametrize('course_id', ['abc', '1.5', None, 1.5, True, [1]])
+def test_course_id_must_be_an_integer(client, auth, course_id):
+    body = {'course_id': course_id, 'records': [{'student_id': 1}]}
+    response = client.post('/api/grades/import', json=body, headers=auth(1, 'admin'))
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'course_id must be an integer'}
+
+
+def test_students_may_not_import(client, auth):
+    body = {'course_id': 1, 'records': [{'student_id': 1}]}
+    assert client.post('/api/grades/import', json=body, headers=auth(10, 'student')).status_code == 403
+
+
+def records(marks, student_ids=range(1, 6)):
+    return [{'student_id': student_id, 'internal1_marks': marks, 'internal2_marks': marks, 'external_marks': marks}
+            for student_id in student_ids]
+
+
+def test_faculty_cannot_import_another_faculty_course(mysql, client, auth, query):
+    body = {'course_id': 2, 'records': records(40)}
+    response = client.post('/api/grades/import', json=body, headers=auth(mysql['course_owner_user_id'][1], 'faculty'))
+    assert response.status_code == 403
+    assert query('SELECT COUNT(*) FROM grades') == [(0,)]
+
+
+def test_unknown_course_is_404(mysql, client, auth):
+    body = {'course_id': 99, 'records': records(40)}
+    assert client.post('/api/grades/import', json=body, headers=auth(1, 'admin')).status_code == 404
+
+
+def test_owner_imports_with_string_course_id(mysql, client, auth, query):
+    body = {'course_id': '1', 'records': records(40) + [{'student_id': 'x'}]}
+    response = client.post('/api/grades/import', json=body, headers=auth(mysql['course_owner_user_id'][1], 'faculty'))
+    assert response.status_code == 200
+    assert response.get_json()['created'] == 5
+    assert response.get_json()['failed'] == 1
+
+    rows = query('SELECT letter_grade, COUNT(*) FROM grades WHERE course_id = 1 GROUP BY letter_grade')
+    assert [tuple(row) for row in rows] == [('A-', 5)]
+    credits = mysql['credits'][1]
+    students = query('SELECT grade_points_total, graded_credits, cgpa FROM students')
+    assert {(float(points), graded, float(cgpa)) for points, graded, cgpa in students} == \
+        {(credits * GRADE_POINTS['A-'], credits, GRADE_POINTS['A-'])}
+
+
+def test_concurrent_imports_keep_cgpa_sums_consistent(mysql, app, auth):
+    """Imports of the same course racing each other must leave one import's grades and matching CGPA sums."""
+    headers = auth(mysql['admin_user_id'], 'admin')
+    marks = [10, 20, 30, 40, 50, 25, 35, 45]
+    barrier = threading.Barrier(len(marks))
+    statuses = []
+
+    def run(value):
+        barrier.wait()
+        response = app.test_client().post('/api/grades/import', json={'course_id': 1, 'records': records(value)},
+                                          headers=headers)
+        statuses.append(response.status_code)
+
+    threads = [threading.Thread(target=run, args=(value,)) for value in marks]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert statuses == [200] * len(marks)
+
+    from sqlalchemy import text
+    from cgpa import recompute_students
+    from database import db
+
+    with app.app_context():
+        letters = db.session.execute(text('SELECT DISTINCT letter_grade FROM grades WHERE course_id = 1')).scalars().all()
+        assert len(letters) == 1
+        incremental = db.session.execute(text(
+            'SELECT student_id, grade_points_total, graded_credits FROM students ORDER BY student_id'
+        )).fetchall()
+        recompute_students(mysql['student_ids'])
+        recomputed = db.session.execute(text(
+            'SELECT student_id, grade_points_total, graded_credits FROM students ORDER BY student_id'
+        )).fetchall()
+        db.session.rollback()
+    assert incremental == recomputed
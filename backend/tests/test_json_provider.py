@@ -0,0 +1,108 @@
+"""JSON providers: rows, Decimals and dates encode the same with orjson as with Flask's stdlib encoder"""
+import decimal
+import json
+import random
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+from flask import Flask
+from sqlalchemy import create_engine, text
+from werkzeug.http import http_date
+
+from config import Config
+from json_provider import RowJSONProvider, _http_date, encode_default, init_json_provider
+
+orjson = pytest.importorskip('orjson')
+from json_provider import OrjsonProvider  # noqa: E402
+
+
+@pytest.fixture(scope='module')
+def rows():
+    engine = create_engine('sqlite://')
+    with engine.connect() as connection:
+        result = connection.execute(text(
+            "SELECT 1 AS student_id, 'CS101' AS course_code, 'Müller' AS last_name, 87.5 AS total_marks"
+        ))
+        keys, values = list(result.keys()), result.fetchall()
+    engine.dispose()
+    return keys, values
+
+
+def payload(rows):
+    _, values = rows
+    return {
+        'grades': values,
+        'mappings': [row._mapping for row in values],
+        'gpa': decimal.Decimal('8.75'),
+        'due': date(2024, 9, 2),
+        'marked_at': datetime(2024, 9, 2, 14, 30, 5),
+        'aware': datetime(2024, 9, 2, 20, 0, tzinfo=timezone(timedelta(hours=5, minutes=30))),
+        'by_course': {1: 'CS101', 2: None},
+        'ratio': 0.1 + 0.2,
+    }
+
+
+@pytest.fixture
+def providers():
+    """Stdlib and orjson providers on one app (they only hold a weak reference to it)."""
+    app = Flask(__name__)
+    with app.app_context():
+        yield RowJSONProvider(app), OrjsonProvider(app)
+
+
+def test_http_date_matches_werkzeug():
+    rng = random.Random(7)
+    start = datetime(1990, 1, 1)
+    for _ in range(2000):
+        moment = start + timedelta(seconds=rng.randrange(60 * 365 * 86400))
+        assert _http_date(moment) == http_date(moment)
+        assert _http_date(moment.date()) == http_date(moment.date())
+        aware = moment.replace(tzinfo=timezone(timedelta(hours=rng.randrange(-12, 14))))
+        assert _http_date(aware) == http_date(aware)
+
+
+def test_orjson_output_matches_stdlib(rows, providers):
+    stdlib, fast = providers
+    data = payload(rows)
+    assert json.loads(fast.dumps(data)) == json.loads(stdlib.dumps(data))
+    assert json.loads(fast.dumps(data))['grades'][0] == \
+        {'student_id': 1, 'course_code': 'CS101', 'last_name': 'Müller', 'total_marks': 87.5}
+    # Flask sorts keys; so does the orjson provider
+    assert list(json.loads(fast.dumps(data))) == sorted(data)
+
+
+def test_orjson_response_matches_stdlib(rows, providers):
+    stdlib, fast = providers
+    expected = stdlib.response(payload(rows))
+    actual = fast.response(payload(rows))
+    assert actual.mimetype == expected.mimetype == 'application/json'
+    assert actual.get_data().endswith(b'\n')
+    assert json.loads(actual.get_data()) == json.loads(expected.get_data())
+
+
+def test_encoder_arguments_fall_back_to_stdlib(providers):
+    _, fast = providers
+    assert fast.dumps({'b': 1, 'a': 2}, indent=1) == json.dumps({'a': 2, 'b': 1}, indent=1)
+    assert fast.loads('{"a": 1}') == {'a': 1}
+
+
+def test_unknown_types_are_rejected(providers):
+    _, fast = providers
+    with pytest.raises(TypeError):
+        encode_default(object())
+    with pytest.raises(TypeError):
+        fast.dumps({'value': object()})
+
+
+def test_fast_json_switch(monkeypatch):
+    monkeypatch.setattr(Config, 'FAST_JSON', False)
+    assert type(init_json_provider(Flask(__name__))) is RowJSONProvider
+    monkeypatch.setattr(Config, 'FAST_JSON', True)
+    assert type(init_json_provider(Flask(__name__))) is OrjsonProvider
+
+
+def test_endpoints_use_the_configured_provider(app, client, auth):
+    assert isinstance(app.json, RowJSONProvider)
+    response = client.get('/api/no-such-endpoint', headers=auth(1, 'admin'))
+    assert response.status_code == 404
+    assert response.get_json() == {'error': 'Not found'}
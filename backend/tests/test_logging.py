@@ -0,0 +1,100 @@
+"""Logging pipeline: request ids, level gating and writes on the listener thread"""
+import json
+import logging
+import re
+import threading
+from logging.handlers import QueueHandler
+
+import logging_setup
+from config import Config
+from logging_setup import REQUEST_ID_HEADER, JsonFormatter, RequestIdFilter
+
+
+class Capture(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+        self.threads = []
+
+    def emit(self, record):
+        self.records.append(record)
+        self.threads.append(threading.current_thread())
+
+
+class Loud:
+    """Argument that records whether a message was ever formatted."""
+
+    formatted = False
+
+    def __str__(self):
+        Loud.formatted = True
+        return 'loud'
+
+
+def test_request_id_is_echoed_or_generated(client):
+    response = client.get('/api/health', headers={REQUEST_ID_HEADER: 'abc-123'})
+    assert response.headers[REQUEST_ID_HEADER] == 'abc-123'
+    generated = client.get('/api/health').headers[REQUEST_ID_HEADER]
+    assert re.fullmatch('[0-9a-f]{32}', generated)
+
+
+def test_records_carry_the_request_id(app):
+    record = logging.LogRecord('university', logging.INFO, __file__, 1, 'hello', (), None)
+    RequestIdFilter().filter(record)
+    assert record.request_id == '-'
+    with app.test_request_context(headers={REQUEST_ID_HEADER: 'req-9'}):
+        app.preprocess_request()
+        RequestIdFilter().filter(record)
+    assert record.request_id == 'req-9'
+
+
+def test_json_formatter_includes_extras():
+    record = logging.LogRecord('university.slow_query', logging.WARNING, __file__, 1, '%.1f ms', (250.0,), None)
+    record.request_id = 'req-1'
+    record.endpoint = 'grades.get_grades'
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry['message'] == '250.0 ms'
+    assert entry['request_id'] == 'req-1'
+    assert entry['endpoint'] == 'grades.get_grades'
+    assert entry['level'] == 'WARNING'
+
+
+def test_debug_is_off_and_never_formatted(app):
+    assert Config.LOG_LEVEL == 'INFO'
+    logger = logging.getLogger('university.test')
+    assert not logger.isEnabledFor(logging.DEBUG)
+    Loud.formatted = False
+    logger.debug('value %s', Loud())
+    assert not Loud.formatted
+
+
+def test_writes_happen_on_the_listener_thread(app, monkeypatch):
+    capture = Capture()
+    listener = logging_setup._listener
+    monkeypatch.setattr(listener, 'handlers', (*listener.handlers, capture))
+    assert any(isinstance(handler, QueueHandler) for handler in logging.getLogger().handlers)
+
+    logging.getLogger('university.test').warning('queued %d', 1)
+    # Drain: the sentinel is handled after every record queued before it
+    listener.stop()
+    listener.start()
+
+    assert [record.getMessage() for record in capture.records] == ['queued 1']
+    assert capture.threads[0] is not threading.current_thread()
+
+
+def test_slow_queries_go_to_their_own_file(tmp_path, monkeypatch):
+    slow_file = tmp_path / 'slow.log'
+    monkeypatch.setattr(Config, 'SLOW_QUERY_LOG_FILE', str(slow_file))
+    console, file_handler = logging_setup._output_handlers()
+
+    slow = logging.LogRecord('university.slow_query', logging.WARNING, __file__, 1, 'slow', (), None)
+    other = logging.LogRecord('university.cgpa', logging.WARNING, __file__, 1, 'other', (), None)
+    for record in (slow, other):
+        record.request_id = '-'
+    assert [console.filter(slow), console.filter(other)] == [False, True]
+    assert [file_handler.filter(slow), file_handler.filter(other)] == [True, False]
+
+    file_handler.handle(slow)
+    file_handler.close()
+    assert slow_file.read_text().rstrip().endswith('slow')
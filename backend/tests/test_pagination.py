@@ -0,0 +1,148 @@
+"""Cursor helpers, keyset pagination of GET /api/students/ and the include_total modes"""
+from collections import namedtuple
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+import pagination
+from cache import TTLCache
+from pagination import (InvalidCursor, decode_cursor, decode_rank_cursor, encode_cursor, encode_rank_cursor,
+                        has_more, next_cursor, page_response, resolve_total)
+
+Row = namedtuple('Row', 'student_id created_at')
+
+
+class MappedRow(Row):
+    @property
+    def _mapping(self):
+        return self._asdict()
+
+
+def test_cursor_round_trip():
+    created_at = datetime(2024, 8, 1, 9, 30, 15, 250000)
+    assert decode_cursor(encode_cursor(created_at, 42)) == (created_at, 42)
+    assert decode_rank_cursor(encode_rank_cursor(1.5, 7)) == (1.5, 7)
+
+
+def test_cursor_is_opaque_url_safe_text():
+    token = encode_cursor(datetime(2024, 8, 1), 42)
+    assert '=' not in token and '+' not in token and '/' not in token
+
+
+@pytest.mark.parametrize('token', ['', 'not-base64!', encode_rank_cursor(1.5, 7)[:-2], 'W10', 'WyJ4IiwgMV0'])
+def test_bad_cursor_raises_invalid_cursor(token):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(token)
+
+
+def test_next_cursor_trims_look_ahead_row():
+    rows = [MappedRow(student_id, datetime(2024, 1, student_id)) for student_id in (5, 4, 3)]
+    cursor = next_cursor(rows, 2, 'created_at', 'student_id')
+    assert [row.student_id for row in rows] == [5, 4]
+    assert decode_cursor(cursor) == (datetime(2024, 1, 4), 4)
+
+
+def test_last_page_has_no_cursor():
+    rows = [MappedRow(1, datetime(2024, 1, 1))]
+    assert next_cursor(rows, 2, 'created_at', 'student_id') is None
+    assert has_more(rows, 1) is False
+    assert has_more(rows + rows, 1) is True
+
+
+def test_invalid_cursor_is_a_400(client, auth):
+    response = client.get('/api/students/?after=garbage', headers=auth(1, 'admin'))
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'Invalid cursor'}
+
+
+def test_cursor_walk_matches_offset_pages(mysql, client, auth):
+    """The seeded students share one created_at second, so every step after the first is decided by the id tie-break."""
+    headers = auth(1, 'admin')
+    offset_ids = client.get('/api/students/?per_page=100', headers=headers).get_json()['students']
+    offset_ids = [student['student_id'] for student in offset_ids]
+
+    walked, after = [], None
+    while True:
+        query = {'per_page': 2, **({'after': after} if after else {})}
+        body = client.get('/api/students/', query_string=query, headers=headers).get_json()
+        walked += [student['student_id'] for student in body['students']]
+        after = body['next_cursor']
+        if after is None:
+            break
+
+    assert walked == offset_ids
+    assert sorted(walked) == mysql['student_ids']
+
+
+class CountingSession:
+    """Stands in for db.session: answers COUNT(*) with `count` and TABLE_ROWS with `table_rows`."""
+
+    def __init__(self, count, table_rows):
+        self.count = count
+        self.table_rows = table_rows
+        self.statements = []
+
+    def execute(self, statement, params=None):
+        self.statements.append(str(statement))
+        value = self.table_rows if 'TABLE_ROWS' in str(statement) else self.count
+        return SimpleNamespace(scalar=lambda: value)
+
+
+@pytest.fixture
+def session(monkeypatch):
+    session = CountingSession(count=42, table_rows=40)
+    monkeypatch.setattr(pagination, 'db', SimpleNamespace(session=session))
+    return session
+
+
+def test_total_modes(session):
+    cache = TTLCache(ttl_seconds=60)
+    assert resolve_total('false', 'COUNT', {}, cache, 'students') == (None, False)
+    assert session.statements == []
+
+    assert resolve_total('exact', 'COUNT', {'status': 'active'}, cache, 'students') == (42, False)
+    # An estimate reuses the exact count cached for the same filters
+    assert resolve_total('estimate', 'COUNT', {'status': 'active'}, cache, 'students') == (42, True)
+    assert len(session.statements) == 1
+
+
+def test_unfiltered_estimate_reads_table_statistics(session):
+    assert resolve_total('estimate', 'COUNT', {}, TTLCache(ttl_seconds=60), 'students') == (40, True)
+    assert 'TABLE_ROWS' in session.statements[0]
+
+
+def test_filtered_estimate_counts_once_on_a_miss(session):
+    cache = TTLCache(ttl_seconds=60)
+    assert resolve_total('estimate', 'COUNT', {'batch': '2024'}, cache, 'students') == (42, True)
+    assert cache.get((('batch', '2024'),)) == 42
+
+
+def test_page_response_totals():
+    assert 'total' not in page_response('students', [], 1, 20, False)
+    assert page_response('students', [], 1, 20, False, total=41) == {
+        'students': [], 'page': 1, 'per_page': 20, 'has_more': False, 'total': 41, 'pages': 3
+    }
+    assert page_response('students', [], 1, 20, False, total=0, total_estimated=True)['total_estimated'] is True
+
+
+def test_unknown_total_mode_is_a_400(client, auth):
+    response = client.get('/api/enrollments/?include_total=sometimes', headers=auth(1, 'admin'))
+    assert response.status_code == 400
+    assert 'include_total' in response.get_json()['error']
+
+
+def test_totals_on_a_listing(mysql, client, auth):
+    from routes.enrollments import count_cache
+
+    # Counts cached by earlier tests describe data the fixture has since reseeded
+    count_cache.clear()
+    headers = auth(1, 'admin')
+    assert 'total' not in client.get('/api/enrollments/?per_page=3', headers=headers).get_json()
+
+    exact = client.get('/api/enrollments/?per_page=3&include_total=exact', headers=headers).get_json()
+    assert (exact['total'], exact['pages'], exact['has_more']) == (10, 4, True)
+    assert 'total_estimated' not in exact
+
+    filtered = client.get('/api/enrollments/?course_id=2&include_total=estimate', headers=headers).get_json()
+    assert (filtered['total'], filtered['total_estimated']) == (5, True)
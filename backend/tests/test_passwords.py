@@ -0,0 +1,59 @@
+"""Hashing pool: timeouts surface as PasswordHasherBusy and slots follow the jobs"""
+import threading
+import time
+
+import pytest
+
+import passwords
+from config import Config
+from passwords import PasswordHasherBusy
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    """A one-process hashing pool with a single slot and a one second timeout."""
+    monkeypatch.setattr(Config, 'PASSWORD_HASH_WORKERS', 1)
+    monkeypatch.setattr(Config, 'PASSWORD_HASH_TIMEOUT_SECONDS', 1)
+    monkeypatch.setattr(passwords, '_pool_slots', threading.BoundedSemaphore(1))
+    monkeypatch.setattr(passwords, '_pool', None)
+    yield
+    if passwords._pool is not None:
+        passwords._pool.shutdown(wait=True, cancel_futures=True)
+
+
+def test_inline_hash_round_trip(monkeypatch):
+    monkeypatch.setattr(Config, 'PASSWORD_HASH_WORKERS', 0)
+    monkeypatch.setattr(Config, 'PASSWORD_HASH_METHOD', 'pbkdf2:sha256:1000')
+    stored = passwords.hash_password('s3cret')
+    assert passwords.verify_password(stored, 's3cret')
+    assert not passwords.verify_password(stored, 'wrong')
+    assert not passwords.needs_rehash(stored)
+
+    monkeypatch.setattr(Config, 'PASSWORD_HASH_METHOD', 'pbkdf2:sha256:2000')
+    assert passwords.needs_rehash(stored)
+
+
+def test_pool_hash_round_trip(pool, monkeypatch):
+    monkeypatch.setattr(Config, 'PASSWORD_HASH_METHOD', 'pbkdf2:sha256:1000')
+    stored = passwords.hash_password('s3cret')
+    assert passwords.verify_password(stored, 's3cret')
+
+
+def test_slow_job_raises_busy_not_timeout(pool):
+    with pytest.raises(PasswordHasherBusy):
+        passwords._run(time.sleep, 3)
+
+
+def test_slot_stays_taken_until_the_abandoned_job_ends(pool):
+    passwords._run(time.sleep, 0)  # start the worker process outside the timed part
+
+    started = time.monotonic()
+    with pytest.raises(PasswordHasherBusy):
+        passwords._run(time.sleep, 2.5)
+    # The timed-out job still runs and still owns the only slot
+    with pytest.raises(PasswordHasherBusy):
+        passwords._run(time.sleep, 0)
+    assert time.monotonic() - started < 2.5
+
+    time.sleep(max(0, 3 - (time.monotonic() - started)))
+    assert passwords._run(abs, -1) == 1
@@ -0,0 +1,107 @@
+"""Pool telemetry: histogram buckets, checkout waits and timeouts under concurrent checkouts"""
+import threading
+import time
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from pool_metrics import Histogram, TimedQueuePool, install_pool_listeners, pool_metrics
+
+
+@pytest.fixture
+def engine(tmp_path):
+    """A two-connection TimedQueuePool engine on a scratch sqlite file, reporting as 'test'."""
+    engine = create_engine(f'sqlite:///{tmp_path / "pool.db"}', poolclass=TimedQueuePool,
+                           pool_size=2, max_overflow=0, pool_timeout=0.2)
+    install_pool_listeners(engine, 'test')
+    yield engine
+    engine.dispose()
+    pool_metrics.pop('test')
+
+
+def test_histogram_buckets_are_upper_bounds():
+    histogram = Histogram((1, 5))
+    for value in (0.5, 1, 3, 5, 7):
+        histogram.observe(value)
+    snapshot = histogram.snapshot()
+    assert snapshot['buckets'] == [{'le': 1, 'count': 2}, {'le': 5, 'count': 2}, {'le': '+Inf', 'count': 1}]
+    assert (snapshot['count'], snapshot['sum'], snapshot['max']) == (5, 16.5, 7)
+
+
+def test_counts_checkouts_and_checkins(engine):
+    for _ in range(3):
+        with engine.connect():
+            pass
+    snapshot = pool_metrics['test'].snapshot(engine.pool)
+    assert snapshot['events']['connect'] == 1
+    assert snapshot['events']['checkout'] == snapshot['events']['checkin'] == 3
+    assert snapshot['checkout_wait_ms']['count'] == 3
+    assert snapshot['pool']['size'] == 2
+    assert snapshot['pool']['checked_out'] == 0
+
+
+def test_records_timeouts_once(engine):
+    held = [engine.connect(), engine.connect()]
+    with pytest.raises(PoolTimeoutError):
+        engine.connect()
+    for connection in held:
+        connection.close()
+    metrics = pool_metrics['test']
+    assert metrics.events['timeout'] == 1
+    # Two immediate checkouts and the one that waited out pool_timeout
+    assert metrics.checkout_wait_ms.count == 3
+    assert metrics.checkout_wait_ms.max >= 200
+
+
+def test_concurrent_checkouts_wait_for_the_pool(engine):
+    callers = 8
+    barrier = threading.Barrier(callers)
+
+    def work():
+        barrier.wait()
+        with engine.connect():
+            time.sleep(0.02)
+
+    # Long enough that no caller times out while the others hold both connections
+    engine.pool._timeout = 5
+    threads = [threading.Thread(target=work) for _ in range(callers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    metrics = pool_metrics['test']
+    assert metrics.events['checkout'] == metrics.events['checkin'] == callers
+    assert metrics.events['timeout'] == 0
+    # One wait per checkout even though QueuePool retries internally
+    assert metrics.checkout_wait_ms.count == callers
+    assert metrics.checked_out.max <= 2
+    assert metrics.checkout_wait_ms.max >= 20
+
+
+def test_dispose_keeps_reporting(engine):
+    with engine.connect():
+        pass
+    engine.dispose()
+    with engine.connect():
+        pass
+    assert isinstance(engine.pool, TimedQueuePool)
+    assert pool_metrics['test'].checkout_wait_ms.count == 2
+
+
+def test_reset_starts_a_fresh_window(engine):
+    with engine.connect():
+        pass
+    pool_metrics['test'].reset()
+    snapshot = pool_metrics['test'].snapshot(engine.pool)
+    assert snapshot['events']['checkout'] == 0
+    assert snapshot['checkout_wait_ms']['count'] == 0
+
+
+def test_admin_pool_endpoint(client, auth):
+    response = client.get('/api/admin/pool', headers=auth(1, 'admin'))
+    assert response.status_code == 200
+    body = response.get_json()
+    assert set(body) >= {'pool', 'events', 'checkout_wait_ms', 'replicas', 'replica_pools'}
+    assert client.get('/api/admin/pool', headers=auth(2, 'faculty')).status_code == 403
@@ -0,0 +1,47 @@
+"""reference.attach(): names from the in-process dimension copies, matched like a LEFT JOIN"""
+from collections import namedtuple
+
+import pytest
+
+import reference
+from reference import attach, with_course_names
+
+Course = namedtuple('Course', 'course_id course_code course_name')
+COURSES = {1: Course(1, 'CS101', 'Programming'), 2: Course(2, 'CS102', 'Data Structures')}
+
+
+@pytest.fixture(autouse=True)
+def courses(monkeypatch):
+    monkeypatch.setattr(reference.reference_data, 'lookup', lambda name: {'courses': COURSES}[name])
+
+
+def test_rows_get_course_names():
+    rows = [{'student_id': 7, 'course_id': 2}, {'student_id': 8, 'course_id': 1}]
+    assert with_course_names(rows) == [
+        {'student_id': 7, 'course_id': 2, 'course_code': 'CS102', 'course_name': 'Data Structures'},
+        {'student_id': 8, 'course_id': 1, 'course_code': 'CS101', 'course_name': 'Programming'},
+    ]
+
+
+def test_unknown_key_gets_none_like_a_left_join():
+    assert with_course_names([{'course_id': 99}]) == [{'course_id': 99, 'course_code': None, 'course_name': None}]
+
+
+def test_output_columns_can_be_renamed():
+    assert attach([{'course_id': 1}], 'courses', 'course_id', title='course_name') == \
+        [{'course_id': 1, 'title': 'Programming'}]
+
+
+def test_sqlalchemy_rows_become_dicts():
+    from sqlalchemy import create_engine, text
+
+    with create_engine('sqlite://').connect() as conn:
+        rows = conn.execute(text('SELECT 5 as student_id, 1 as course_id')).fetchall()
+    assert with_course_names(rows) == [
+        {'student_id': 5, 'course_id': 1, 'course_code': 'CS101', 'course_name': 'Programming'}
+    ]
+
+
+def test_empty_page_skips_the_lookup(monkeypatch):
+    monkeypatch.setattr(reference.reference_data, 'lookup', pytest.fail)
+    assert with_course_names([]) == []
@@ -0,0 +1,92 @@
+"""Read replicas: writers stick to the primary, and version reads never see a lagging replica"""
+import time
+from collections import namedtuple
+
+import pytest
+from flask import Flask, g, request
+from sqlalchemy import text
+
+import conditional
+import reference
+import replicas
+from database import db
+
+Response = namedtuple('Response', 'status_code headers')
+
+
+@pytest.fixture
+def replica_app(tmp_path, monkeypatch):
+    """An app whose primary and replica_0 are two sqlite files; the replica is one course rename behind."""
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'primary.db'}"
+    app.config['SQLALCHEMY_BINDS'] = {'replica_0': f"sqlite:///{tmp_path / 'replica.db'}"}
+    db.init_app(app)
+    with app.app_context():
+        copies = ((db.engines[None], 2, 'Programming II'), (db.engines['replica_0'], 1, 'Programming'))
+        for engine, version, name in copies:
+            with engine.begin() as conn:
+                conn.execute(text('CREATE TABLE table_versions (table_name TEXT, version INT, updated_at TIMESTAMP)'))
+                conn.execute(text("INSERT INTO table_versions VALUES ('courses', :v, NULL)"), {'v': version})
+                conn.execute(text('CREATE TABLE courses (course_id INT, course_code TEXT, course_name TEXT, '
+                                  'faculty_id INT)'))
+                conn.execute(text("INSERT INTO courses VALUES (1, 'CS101', :name, 1)"), {'name': name})
+        replica = db.engines['replica_0']
+
+    monkeypatch.setattr(replicas, 'replicas', replicas.ReplicaSet())
+    replicas.replicas.configure([replica])
+    replicas.replicas.mark(replica, True)
+    monkeypatch.setattr(replicas, '_recent_writers', replicas.TTLCache(ttl_seconds=5))
+    monkeypatch.setattr(conditional, 'table_versions', conditional.TableVersions())
+    monkeypatch.setattr(reference, 'table_versions', conditional.table_versions)
+    monkeypatch.setattr(reference, 'reference_data', reference.ReferenceData())
+    yield app, replica
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+def routed(app, method='GET', user_id=None, headers=None):
+    """The engine route_request picks for a request, or None for the primary."""
+    with app.test_request_context('/api/courses/', method=method, headers=headers or {}):
+        request.user = {'user_id': user_id, 'role': 'admin'} if user_id else None
+        replicas.route_request()
+        return g.read_replica
+
+
+def test_reads_go_to_the_replica_until_the_user_writes(replica_app):
+    app, replica = replica_app
+    assert routed(app, user_id=7) is replica
+    assert routed(app, method='POST', user_id=7) is None
+
+    with app.test_request_context('/api/courses/1', method='PUT'):
+        request.user = {'user_id': 7, 'role': 'admin'}
+        response = replicas.record_write(Response(200, {}))
+    assert float(response.headers[replicas.PRIMARY_UNTIL_HEADER]) > time.time()
+
+    # This worker remembers the writer; others follow the echoed header
+    echoed = {replicas.PRIMARY_UNTIL_HEADER: response.headers[replicas.PRIMARY_UNTIL_HEADER]}
+    assert routed(app, user_id=7) is None
+    assert routed(app, user_id=8) is replica
+    assert routed(app, user_id=8, headers=echoed) is None
+    assert routed(app, user_id=8, headers={replicas.PRIMARY_UNTIL_HEADER: str(time.time() - 1)}) is replica
+
+
+def test_failed_writes_do_not_stick(replica_app):
+    app, replica = replica_app
+    with app.test_request_context('/api/courses/1', method='PUT'):
+        request.user = {'user_id': 7, 'role': 'admin'}
+        response = replicas.record_write(Response(400, {}))
+    assert replicas.PRIMARY_UNTIL_HEADER not in response.headers
+    assert routed(app, user_id=7) is replica
+
+
+def test_versions_and_dimensions_come_from_the_primary(replica_app):
+    app, replica = replica_app
+    with app.test_request_context('/api/courses/'):
+        request.user = None
+        replicas.route_request()
+        assert g.read_replica is replica
+        assert db.session.execute(text('SELECT version FROM table_versions')).scalar() == 1
+
+        assert conditional.table_versions.get(('courses',)) == [2]
+        assert reference.reference_data.lookup('courses')[1].course_name == 'Programming II'
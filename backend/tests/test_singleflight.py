@@ -0,0 +1,143 @@
+"""Single-flight coalescing: one execution per burst of identical calls"""
+import threading
+import time
+
+import pytest
+from flask import Flask, jsonify
+
+from config import Config
+from singleflight import SingleFlight, single_flight
+
+CALLERS = 50
+
+
+def run_together(target, count=CALLERS):
+    """Start `count` threads on `target` at the same moment; return their results or exceptions."""
+    barrier = threading.Barrier(count)
+    results = [None] * count
+
+    def worker(i):
+        barrier.wait()
+        try:
+            results[i] = target()
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def slow(value, calls, delay=0.3):
+    def fn():
+        calls.append(1)
+        time.sleep(delay)
+        return value
+    return fn
+
+
+def test_concurrent_callers_share_one_execution():
+    flights = SingleFlight()
+    calls = []
+    results = run_together(lambda: flights.do(('key',), slow('result', calls)))
+
+    assert len(calls) == 1
+    assert all(result == 'result' for result, shared in results)
+    assert sorted(shared for result, shared in results) == [False] + [True] * (CALLERS - 1)
+
+
+def test_exception_reaches_every_waiter():
+    flights = SingleFlight()
+    calls = []
+
+    def fail():
+        calls.append(1)
+        time.sleep(0.3)
+        raise ValueError('boom')
+
+    results = run_together(lambda: flights.do(('key',), fail))
+
+    assert len(calls) == 1
+    assert all(isinstance(result, ValueError) and str(result) == 'boom' for result in results)
+
+
+def test_call_after_completion_runs_again():
+    flights = SingleFlight()
+    calls = []
+    assert flights.do(('key',), slow(1, calls, delay=0)) == (1, False)
+    assert flights.do(('key',), slow(2, calls, delay=0)) == (2, False)
+    assert len(calls) == 2
+    assert not flights.in_flight(('key',))
+
+
+def test_different_keys_do_not_wait_on_each_other():
+    flights = SingleFlight()
+    calls = []
+    results = run_together(lambda: flights.do((threading.get_ident(),), slow('x', calls, delay=0.05)), count=10)
+    assert len(calls) == 10
+    assert all(shared is False for result, shared in results)
+
+
+def test_waiter_runs_fn_itself_after_wait_timeout(monkeypatch):
+    monkeypatch.setattr(Config, 'SINGLE_FLIGHT_WAIT_SECONDS', 0.1)
+    flights = SingleFlight()
+    calls = []
+    results = run_together(lambda: flights.do(('key',), slow('x', calls, delay=0.5)), count=5)
+    assert len(calls) == 5
+    assert all(shared is False for result, shared in results)
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.calls = []
+
+    @app.route('/report')
+    @single_flight()
+    def report():
+        app.calls.append(1)
+        time.sleep(0.3)
+        return jsonify({'call': len(app.calls)})
+
+    @app.route('/stale')
+    @single_flight(stale_seconds=30)
+    def stale():
+        app.calls.append(1)
+        time.sleep(0.3)
+        return jsonify({'call': len(app.calls)})
+
+    return app
+
+
+def test_decorated_view_runs_once_for_identical_requests(app):
+    def get():
+        response = app.test_client().get('/report?term=1')
+        return response.status_code, response.get_json()
+
+    results = run_together(get, count=20)
+    assert len(app.calls) == 1
+    assert results == [(200, {'call': 1})] * 20
+
+
+def test_query_string_is_part_of_the_key(app):
+    results = run_together(lambda: app.test_client().get(f'/report?term={threading.get_ident()}').status_code,
+                           count=5)
+    assert results == [200] * 5
+    assert len(app.calls) == 5
+
+
+def test_stale_response_served_while_refresh_runs(app):
+    client = app.test_client()
+    assert client.get('/stale').get_json() == {'call': 1}
+
+    refresh = threading.Thread(target=lambda: client.get('/stale'))
+    refresh.start()
+    time.sleep(0.1)
+    started = time.monotonic()
+    assert app.test_client().get('/stale').get_json() == {'call': 1}
+    assert time.monotonic() - started < 0.2
+    refresh.join()
+    assert len(app.calls) == 2
@@ -0,0 +1,81 @@
+"""SQL metrics: Server-Timing, per-endpoint counters, failed statements and the slow-query log"""
+import logging
+
+import pytest
+from flask import Flask, jsonify
+from sqlalchemy import create_engine, text
+
+import sql_metrics
+from config import Config
+from sql_metrics import endpoint_stats, init_sql_metrics, normalize_sql
+
+
+@pytest.fixture
+def client():
+    engine = create_engine('sqlite://')
+    app = Flask(__name__)
+    init_sql_metrics(app)
+
+    @app.route('/two')
+    def two():
+        with engine.connect() as conn:
+            conn.execute(text('SELECT 1'))
+            conn.execute(text('SELECT 2'))
+        return jsonify({})
+
+    @app.route('/broken')
+    def broken():
+        with engine.connect() as conn:
+            try:
+                conn.execute(text('SELECT * FROM missing'))
+            except Exception:
+                pass
+            conn.execute(text('SELECT 1'))
+        return jsonify({})
+
+    endpoint_stats.reset()
+    yield app.test_client()
+    endpoint_stats.reset()
+    engine.dispose()
+
+
+def by_endpoint():
+    return {row['endpoint']: row for row in endpoint_stats.snapshot()}
+
+
+def test_server_timing_counts_the_request_queries(client):
+    header = client.get('/two').headers['Server-Timing']
+    assert header.startswith('db;dur=')
+    assert 'desc="2 queries"' in header
+    assert ', app;dur=' in header
+
+
+def test_endpoint_counters(client):
+    for _ in range(3):
+        client.get('/two')
+    client.get('/nowhere')
+    stats = by_endpoint()
+    assert stats['two']['requests'] == 3
+    assert stats['two']['queries_per_request'] == 2
+    assert stats['two']['max_queries'] == 2
+    assert stats[sql_metrics.UNMATCHED_ENDPOINT]['queries_per_request'] == 0
+
+
+def test_a_failed_statement_is_counted_once(client):
+    assert 'desc="2 queries"' in client.get('/broken').headers['Server-Timing']
+    # Nothing from the failure is left behind to be charged to the next statement
+    assert 'desc="2 queries"' in client.get('/two').headers['Server-Timing']
+    assert by_endpoint()['broken']['max_queries'] == 2
+
+
+def test_slow_queries_are_logged_normalized(client, monkeypatch, caplog):
+    monkeypatch.setattr(Config, 'SLOW_QUERY_MS', 0.000001)
+    with caplog.at_level(logging.WARNING, logger='university.slow_query'):
+        client.get('/two')
+    assert [record.endpoint for record in caplog.records] == ['two', 'two']
+    assert caplog.records[0].getMessage().endswith('sql=SELECT ?')
+
+
+def test_normalize_sql():
+    statement = "SELECT *  FROM t\n WHERE a = 5 AND b = 'x' AND c IN (%s, %s, %s)"
+    assert normalize_sql(statement) == 'SELECT * FROM t WHERE a = ? AND b = ? AND c IN (...)'
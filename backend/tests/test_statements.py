@@ -0,0 +1,68 @@
+"""statements.sql(): one shared clause per SQL string, expanding IN lists, compiled-cache hits"""
+import threading
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.engine.interfaces import CacheStats
+
+import statements
+from statements import sql
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine('sqlite://')
+    with engine.begin() as connection:
+        connection.execute(sql('CREATE TABLE courses (course_id INTEGER PRIMARY KEY, course_code TEXT)'))
+        connection.execute(sql('INSERT INTO courses VALUES (:id, :code)'),
+                           [{'id': n, 'code': f'CS{n}'} for n in range(1, 6)])
+    yield engine
+    engine.dispose()
+
+
+def test_same_sql_returns_the_same_clause():
+    statement = 'SELECT * FROM courses WHERE course_id = :course_id'
+    assert sql(statement) is sql(statement)
+    assert sql(statement) is not sql(statement + ' ')
+    # Expanding names are part of the key
+    assert sql('SELECT 1 WHERE 1 IN :ids', 'ids') is not sql('SELECT 1 WHERE 1 IN :ids')
+
+
+def test_expanding_parameters_take_lists(engine):
+    statement = sql('SELECT course_code FROM courses WHERE course_id IN :ids ORDER BY course_id', 'ids')
+    with engine.connect() as connection:
+        assert connection.execute(statement, {'ids': [2, 4]}).scalars().all() == ['CS2', 'CS4']
+        # Different list lengths reuse the same clause
+        assert connection.execute(statement, {'ids': [1, 2, 3]}).scalars().all() == ['CS1', 'CS2', 'CS3']
+
+
+def test_shared_clause_hits_the_compiled_cache(engine):
+    statement = 'SELECT course_code FROM courses WHERE course_id = :course_id'
+    with engine.connect() as connection:
+        connection.execute(sql(statement), {'course_id': 1})
+        result = connection.execute(sql(statement), {'course_id': 2})
+        assert result.context.cache_hit == CacheStats.CACHE_HIT
+        assert result.scalar() == 'CS2'
+
+
+def test_concurrent_callers_share_one_clause():
+    statement = 'SELECT * FROM grades WHERE student_id = :student_id AND course_id = :course_id'
+    barrier = threading.Barrier(16)
+    clauses = []
+
+    def build():
+        barrier.wait()
+        clauses.append(sql(statement))
+
+    threads = [threading.Thread(target=build) for _ in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # lru_cache may build twice on a simultaneous first miss, but keeps one afterwards
+    assert sql(statement) in clauses
+    assert all(str(clause) == statement for clause in clauses)
+
+
+def test_cache_is_bounded():
+    assert sql.cache_info().maxsize == statements.STATEMENT_CACHE_SIZE
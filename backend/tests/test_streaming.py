@@ -0,0 +1,92 @@
+"""NDJSON streaming of large listings, and the page bounds of the paged ones"""
+import json
+
+import pytest
+from flask import Flask
+from sqlalchemy import text
+
+from config import Config
+from database import db
+from pagination import get_page_args
+from streaming import NDJSON_MIMETYPE, stream_ndjson, wants_ndjson
+
+
+@pytest.mark.parametrize('query, accept, expected', [
+    ('?format=ndjson', '', True),
+    ('', NDJSON_MIMETYPE, True),
+    ('', f'application/json, {NDJSON_MIMETYPE};q=0.5', False),
+    ('', '', False),
+    ('?format=columnar', NDJSON_MIMETYPE, True),
+])
+def test_wants_ndjson(query, accept, expected):
+    with Flask(__name__).test_request_context('/api/grades/' + query, headers={'Accept': accept}):
+        assert wants_ndjson() is expected
+
+
+@pytest.mark.parametrize('query, expected', [
+    ('', (1, Config.ITEMS_PER_PAGE, 0)),
+    ('?page=3&per_page=25', (3, 25, 50)),
+    ('?page=0&per_page=0', (1, 1, 0)),
+    ('?page=-4&per_page=-10', (1, 1, 0)),
+    (f'?page=2&per_page={Config.MAX_ITEMS_PER_PAGE * 10}', (2, Config.MAX_ITEMS_PER_PAGE, Config.MAX_ITEMS_PER_PAGE)),
+    ('?page=two&per_page=many', (1, Config.ITEMS_PER_PAGE, 0)),
+])
+def test_page_bounds(query, expected):
+    with Flask(__name__).test_request_context('/api/grades/' + query):
+        assert get_page_args() == expected
+
+
+@pytest.fixture
+def stream_app(tmp_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'stream.db'}"
+    db.init_app(app)
+    with app.app_context():
+        with db.engine.begin() as conn:
+            conn.execute(text('CREATE TABLE grades (student_id INT, letter_grade TEXT)'))
+            conn.execute(text('INSERT INTO grades VALUES (:id, :letter)'),
+                         [{'id': n, 'letter': 'A' if n % 2 else None} for n in range(1, 26)])
+    yield app
+    with app.app_context():
+        db.engine.dispose()
+
+
+def test_stream_writes_one_object_per_line_in_batches(stream_app, monkeypatch):
+    monkeypatch.setattr(Config, 'STREAM_BATCH_SIZE', 10)
+    batches = []
+
+    def transform(rows):
+        batches.append(len(rows))
+        return [dict(row._mapping) for row in rows]
+
+    @stream_app.route('/grades')
+    def grades():
+        return stream_ndjson(text('SELECT * FROM grades ORDER BY student_id'), transform=transform)
+
+    response = stream_app.test_client().get('/grades')
+    assert response.mimetype == NDJSON_MIMETYPE
+    assert response.is_streamed
+    lines = response.get_data(as_text=True).splitlines()
+    assert batches == [10, 10, 5]
+    assert [json.loads(line) for line in lines][:2] == [{'student_id': 1, 'letter_grade': 'A'},
+                                                        {'student_id': 2, 'letter_grade': None}]
+    assert len(lines) == 25
+
+
+def test_an_empty_stream_is_an_empty_body(stream_app):
+    @stream_app.route('/none')
+    def none():
+        return stream_ndjson(text('SELECT * FROM grades WHERE student_id > :id'), {'id': 100})
+
+    response = stream_app.test_client().get('/none')
+    assert response.status_code == 200
+    assert response.get_data() == b''
+
+
+def test_enrollments_stream(mysql, client, auth):
+    response = client.get('/api/enrollments/?format=ndjson', headers=auth(1, 'admin'))
+    assert response.mimetype == NDJSON_MIMETYPE
+    rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    # Every enrollment in one response, with the names attached per batch
+    assert len(rows) == 10
+    assert all(row['course_code'] for row in rows)
@@ -0,0 +1,51 @@
+"""GET /api/users/search: the short-term prefix path"""
+import pytest
+
+from routes.users import _like_prefix
+
+
+def test_like_prefix_escapes_wildcards():
+    assert _like_prefix('al') == 'al%'
+    assert _like_prefix('a_') == 'a\\_%'
+    assert _like_prefix('5%') == '5\\%%'
+    assert _like_prefix('a\\b') == 'a\\\\b%'
+
+
+def test_empty_query_returns_nothing(client, auth):
+    response = client.get('/api/users/search?q=%20-%20', headers=auth(1, 'admin'))
+    assert response.get_json() == {'users': [], 'next_cursor': None}
+
+
+@pytest.fixture
+def people(mysql, app):
+    from sqlalchemy import text
+    from database import db
+
+    people = [
+        (100, 'al@test.edu', 'Alice', 'Williams'),
+        (101, 'ab@test.edu', 'Alice', 'Brown'),
+        (102, 'wi@test.edu', 'Will', 'Allen'),
+        (103, 'a_b@test.edu', 'Ann', 'Bee'),
+        (104, 'axb@test.edu', 'Axel', 'Bo'),
+    ]
+    with app.app_context():
+        db.session.execute(text("""
+            INSERT INTO users (user_id, email, password_hash, role, first_name, last_name)
+            VALUES (:user_id, :email, 'x', 'student', :first_name, :last_name)
+        """), [dict(zip(('user_id', 'email', 'first_name', 'last_name'), person)) for person in people])
+        db.session.commit()
+
+
+def search(client, auth, q):
+    response = client.get('/api/users/search', query_string={'q': q}, headers=auth(1, 'admin'))
+    assert response.status_code == 200
+    return sorted(user['user_id'] for user in response.get_json()['users'])
+
+
+def test_every_short_term_must_prefix_a_column(people, client, auth):
+    # Alice Williams and Will Allen both have an "al" and a "wi" prefix; Alice Brown has no "wi"
+    assert search(client, auth, 'al wi') == [100, 102]
+
+
+def test_underscore_is_matched_literally(people, client, auth):
+    assert search(client, auth, 'a_') == [103]
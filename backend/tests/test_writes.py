@@ -0,0 +1,111 @@
+"""Write responses: the echoed values agree with the row a re-read returns"""
+from datetime import date
+from email.utils import parsedate_to_datetime
+
+import pytest
+from flask import Flask
+
+import writes
+from writes import written_row
+
+
+class FailingSession:
+    def execute(self, *args, **kwargs):
+        raise AssertionError('the echo must not re-read the row')
+
+
+def test_echo_runs_no_query(monkeypatch):
+    monkeypatch.setattr(writes, 'db', type('db', (), {'session': FailingSession()}))
+    with Flask(__name__).test_request_context('/api/courses/'):
+        assert written_row({'course_id': 7}, 'SELECT', {}) == {'course_id': 7}
+
+
+def same(echoed, stored):
+    """Compare an echoed value with the JSON of the stored one.
+
+    The echo carries what the client sent (floats, ISO dates, booleans)
+    where a re-read carries DECIMAL strings, HTTP dates and TINYINTs.
+    """
+    if echoed is None or stored is None:
+        return echoed is None and stored is None
+    if isinstance(echoed, bool) or isinstance(stored, bool):
+        return bool(echoed) == bool(stored)
+    if isinstance(echoed, (int, float)):
+        return float(stored) == pytest.approx(float(echoed))
+    if isinstance(stored, str) and stored.endswith('GMT'):
+        return parsedate_to_datetime(stored).date() == date.fromisoformat(echoed[:10])
+    return echoed == stored
+
+
+def assert_echo_matches(app, query, echoed, statement, **params):
+    rows = query(statement, **params)
+    assert len(rows) == 1
+    with app.app_context():
+        stored = app.json.loads(app.json.dumps(rows[0]))
+    mismatched = {key: (value, stored[key]) for key, value in echoed.items() if not same(value, stored[key])}
+    assert mismatched == {}
+
+
+def test_created_rows_match_a_re_read(mysql, app, client, auth, query):
+    headers = auth(mysql['admin_user_id'], 'admin')
+
+    def post(path, body):
+        response = client.post(path, json=body, headers=headers)
+        assert response.status_code == 201, response.get_json()
+        return response.get_json()
+
+    department = post('/api/departments/', {'department_code': 'EE', 'department_name': 'Electrical'})['department']
+    assert_echo_matches(app, query, department, 'SELECT * FROM departments WHERE department_id = :id',
+                        id=department['department_id'])
+
+    course = post('/api/courses/', {'course_code': 'EE201', 'course_name': 'Circuits', 'semester': 'Fall 2024',
+                                    'department_id': department['department_id'], 'faculty_id': 1})['course']
+    assert_echo_matches(app, query, course, 'SELECT * FROM courses WHERE course_id = :id', id=course['course_id'])
+
+    user = post('/api/users/', {'email': 'new@test.edu', 'password': 'correct horse battery', 'role': 'student',
+                                'first_name': 'New', 'last_name': 'Student', 'date_of_birth': '2005-03-04'})['user']
+    assert 'password_hash' not in user
+    assert_echo_matches(app, query, user, 'SELECT * FROM users WHERE user_id = :id', id=user['user_id'])
+
+    student = post('/api/students/', {'user_id': user['user_id'], 'enrollment_number': 'EN900', 'department_id': 1,
+                                      'batch': '2024-2028', 'admission_date': '2024-08-01'})['student']
+    assert_echo_matches(app, query, student, 'SELECT * FROM students WHERE student_id = :id',
+                        id=student['student_id'])
+
+    keys = {'student_id': student['student_id'], 'course_id': course['course_id']}
+    enrollment = post('/api/enrollments/', keys)['enrollment']
+    assert_echo_matches(app, query, enrollment, 'SELECT * FROM enrollments WHERE student_id = :student_id '
+                        'AND course_id = :course_id', **keys)
+
+    attendance = post('/api/attendance/', {**keys, 'attendance_date': '2024-09-02', 'status': 'late',
+                                           'marked_by': 1})['attendance']
+    assert_echo_matches(app, query, attendance, 'SELECT * FROM attendance WHERE student_id = :student_id '
+                        'AND course_id = :course_id', **keys)
+
+    grade = post('/api/grades/', {**keys, 'internal1_marks': 41.5, 'internal2_marks': 38,
+                                  'external_marks': 44.25})['grade']
+    assert_echo_matches(app, query, grade, 'SELECT * FROM grades WHERE student_id = :student_id '
+                        'AND course_id = :course_id', **keys)
+
+
+def test_updated_rows_match_a_re_read(mysql, app, client, auth, query):
+    headers = auth(mysql['admin_user_id'], 'admin')
+
+    response = client.put('/api/students/2', json={'semester': 3, 'status': 'inactive'}, headers=headers)
+    assert response.status_code == 200
+    assert_echo_matches(app, query, response.get_json()['student'], 'SELECT * FROM students WHERE student_id = 2')
+
+    response = client.put('/api/users/11', json={'first_name': 'Renamed', 'phone': '555-0100'}, headers=headers)
+    assert response.status_code == 200
+    assert_echo_matches(app, query, response.get_json()['user'], 'SELECT * FROM users WHERE user_id = 11')
+
+
+def test_representation_is_the_stored_row(mysql, app, client, auth, query):
+    body = {'course_code': 'CS301', 'course_name': 'Compilers', 'semester': 'Fall 2024', 'department_id': 1,
+            'faculty_id': 2}
+    response = client.post('/api/courses/?return=representation', json=body, headers=auth(1, 'admin'))
+    course = response.get_json()['course']
+    rows = query('SELECT * FROM courses WHERE course_id = :id', id=course['course_id'])
+    with app.app_context():
+        assert course == app.json.loads(app.json.dumps(rows[0]))
+    assert course['created_at'] is not None
@@ -0,0 +1,24 @@
+"""Response bodies for write endpoints without a read-back round-trip"""
+from flask import request
+
+from database import db
+
+
+def wants_representation():
+    """True when the client asked for the stored row with ?return=representation."""
+    return request.args.get('return') == 'representation'
+
+
+def written_row(known, select_query, params):
+    """Return the row a create/update endpoint echoes back.
+
+    By default this is `known`: the values just written plus the generated
+    key and the defaults the endpoint filled in, so no SELECT runs. Values
+    computed by the database (NOW() timestamps) are only included when the
+    client passes ?return=representation, which re-reads the row with
+    `select_query`. Returns None if that re-read finds nothing.
+    """
+    if not wants_representation():
+        return known
+    row = db.session.execute(select_query, params).fetchone()
+    return dict(row._mapping) if row else None
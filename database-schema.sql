@@ -30,7 +30,11 @@ CREATE TABLE users (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     
     INDEX idx_email (email),
-    INDEX idx_role (role)
+    INDEX idx_role (role),
+    INDEX idx_created_at (created_at),
+    INDEX idx_first_name (first_name),
+    INDEX idx_last_name (last_name),
+    FULLTEXT INDEX ft_user_search (first_name, last_name, email)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='User authentication';
 
 -- students
@@ -42,7 +46,9 @@ CREATE TABLE students (
     semester INT NOT NULL DEFAULT 1,
     batch VARCHAR(10) NOT NULL COMMENT '2024-2028',
     admission_date DATE NOT NULL,
-    cgpa DECIMAL(4,2) DEFAULT 0.00,
+    cgpa DECIMAL(4,2) DEFAULT 0.00 COMMENT 'grade_points_total / graded_credits',
+    grade_points_total DECIMAL(10,2) NOT NULL DEFAULT 0.00 COMMENT 'Sum of credits x grade points',
+    graded_credits INT NOT NULL DEFAULT 0 COMMENT 'Credits of the lettered grades',
     status ENUM('active', 'inactive', 'graduated') DEFAULT 'active',
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     
@@ -51,7 +57,8 @@ CREATE TABLE students (
     
     INDEX idx_enrollment_number (enrollment_number),
     INDEX idx_department_id (department_id),
-    INDEX idx_user_id (user_id)
+    INDEX idx_user_id (user_id),
+    INDEX idx_created_at (created_at)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='Student information';
 
 -- faculty
@@ -105,8 +112,10 @@ CREATE TABLE enrollments (
     course_id INT NOT NULL,
     enrollment_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     status ENUM('enrolled', 'completed', 'dropped', 'withdrawn') DEFAULT 'enrolled',
-    classes_attended INT DEFAULT 0,
-    classes_held INT DEFAULT 0,
+    classes_attended INT DEFAULT 0 COMMENT 'Attendance rows marked present',
+    classes_held INT DEFAULT 0 COMMENT 'All attendance rows for the enrollment',
+    classes_late INT DEFAULT 0,
+    classes_excused INT DEFAULT 0,
     attendance_percentage DECIMAL(5,2) DEFAULT 0.00,
     
     -- Composite Primary Key
@@ -167,6 +176,37 @@ CREATE TABLE grades (
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='Final grades - composite key (student_id, course_id). Total = Avg of 2 internals (50) + External (50) = 100';
 
 
+-- student_attendance_summary (precomputed low-attendance report)
+-- Rebuilt on a schedule by the API and refreshed per student after attendance writes.
+-- Full rebuilds fill student_attendance_summary_next and swap it in with RENAME TABLE,
+-- so the pair carries no foreign keys (CREATE TABLE ... LIKE would not copy them)
+CREATE TABLE student_attendance_summary (
+    student_id INT PRIMARY KEY,
+    department_id INT NOT NULL,
+    avg_attendance DECIMAL(5,2) NOT NULL DEFAULT 0.00,
+    total_courses INT NOT NULL DEFAULT 0,
+    refreshed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    
+    INDEX idx_avg_attendance (avg_attendance),
+    INDEX idx_department_avg (department_id, avg_attendance),
+    INDEX idx_refreshed_at (refreshed_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='Per-student average attendance of active students';
+
+CREATE TABLE student_attendance_summary_next LIKE student_attendance_summary;
+
+
+-- table_versions (change counters behind the ETags of the catalog endpoints and the dashboard and stats caches)
+-- Bumped by the API after every committed write to the table
+CREATE TABLE table_versions (
+    table_name VARCHAR(64) PRIMARY KEY,
+    version BIGINT UNSIGNED NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP COMMENT 'Last bump, for operators; not sent to clients'
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='Per-table write counters for HTTP conditional requests';
+
+INSERT INTO table_versions (table_name) VALUES
+('departments'), ('courses'), ('faculty'), ('users'), ('students');
+
+
 -- ============================================================
 -- SAMPLE DATA INSERTION
 -- ============================================================
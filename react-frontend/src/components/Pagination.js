@@ -0,0 +1,38 @@
+import React from 'react';
+
+// Rows per page requested by the paginated admin tables
+export const PAGE_SIZE = 50;
+
+// Previous/Next controls for the offset-paginated listings, driven by their has_more flag
+const Pagination = ({ page, hasMore, onPageChange }) => {
+  if (page === 1 && !hasMore) return null;
+
+  return (
+    <div style={styles.container}>
+      <button
+        onClick={() => onPageChange(page - 1)}
+        disabled={page === 1}
+        style={{ ...styles.button, ...(page === 1 ? styles.disabled : {}) }}
+      >
+        Previous
+      </button>
+      <span style={styles.page}>Page {page}</span>
+      <button
+        onClick={() => onPageChange(page + 1)}
+        disabled={!hasMore}
+        style={{ ...styles.button, ...(!hasMore ? styles.disabled : {}) }}
+      >
+        Next
+      </button>
+    </div>
+  );
+};
+
+const styles = {
+  container: { display: 'flex', justifyContent: 'center', alignItems: 'center', gap: '15px', marginTop: '20px' },
+  button: { padding: '8px 16px', backgroundColor: '#3498db', color: 'white', border: 'none', borderRadius: '4px', cursor: 'pointer' },
+  disabled: { backgroundColor: '#bdc3c7', cursor: 'default' },
+  page: { color: '#2c3e50' },
+};
+
+export default Pagination;
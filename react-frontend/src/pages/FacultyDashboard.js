@@ -3,16 +3,12 @@ import Navbar from '../components/Navbar';
 import { useAuth } from '../context/AuthContext';
 import attendanceService from '../services/attendanceService';
 import gradeService from '../services/gradeService';
-import enrollmentService from '../services/enrollmentService';
-import studentService from '../services/studentService';
 import courseService from '../services/courseService';
 import facultyService from '../services/facultyService';
-import userService from '../services/userService';
 
 const FacultyDashboard = () => {
   const { user } = useAuth();
   const [facultyInfo, setFacultyInfo] = useState(null);
-  const [attendance, setAttendance] = useState([]);
   const [grades, setGrades] = useState([]);
   const [enrollments, setEnrollments] = useState([]);
   const [students, setStudents] = useState([]);
@@ -60,37 +56,47 @@ const FacultyDashboard = () => {
         return;
       }
       
-      // Get faculty info by user_id
-      const facultiesData = await facultyService.getAll();
-      const faculty = facultiesData.faculty?.find(f => f.user_id === user.user_id);
+      // Faculty info, courses, rosters, attendance counters and grades in one call
+      const dashboard = await facultyService.getDashboard(user.faculty_id);
+      const dashboardCourses = dashboard.courses || [];
+      setFacultyInfo(dashboard.faculty);
+      setCourses(dashboardCourses);
       
-      if (faculty) {
-        setFacultyInfo(faculty);
-        console.log('Faculty info loaded:', faculty);
-        
-        // Get courses assigned to this faculty member using faculty_id from user
-        const facultyCoursesData = await facultyService.getCourses(user.faculty_id);
-        setCourses(facultyCoursesData.courses || []);
-        console.log('Faculty courses:', facultyCoursesData.courses?.length);
-        
-        // Fetch other data - use per_page=1000 to get all students
-        const [attendanceData, gradesData, enrollmentsData, studentsData, usersData] = await Promise.all([
-          attendanceService.getAll(),
-          gradeService.getAll(),
-          enrollmentService.getAll(),
-          studentService.getAll({ per_page: 1000 }), // Fetch all students
-          userService.getAll({ per_page: 1000 })      // Fetch all users
-        ]);
-        
-        setAttendance(attendanceData.attendance || []);
-        setGrades(gradesData.grades || []);
-        setEnrollments(enrollmentsData.enrollments || []);
-        setStudents(studentsData.students || []);
-        setUsers(usersData.users || []);
-        
-        console.log('All data loaded successfully');
-        console.log(`Loaded: ${studentsData.students?.length || 0} students, ${enrollmentsData.enrollments?.length || 0} enrollments`);
-      }
+      // Flatten the rosters into the enrollment/student/user/grade lists used below
+      const roster = dashboardCourses.flatMap(course =>
+        course.students.map(s => ({ ...s, course_id: course.course_id }))
+      );
+      const uniqueBy = (items, key) => [...new Map(items.map(item => [item[key], item])).values()];
+      
+      setEnrollments(roster.map(s => ({
+        student_id: s.student_id,
+        course_id: s.course_id,
+        status: s.enrollment_status,
+        classes_held: s.classes_held,
+        classes_attended: s.classes_attended,
+        classes_late: s.classes_late,
+        classes_excused: s.classes_excused,
+        attendance_percentage: s.attendance_percentage
+      })));
+      setStudents(uniqueBy(roster.map(s => ({
+        student_id: s.student_id,
+        user_id: s.user_id,
+        enrollment_number: s.enrollment_number,
+        semester: s.semester
+      })), 'student_id'));
+      setUsers(uniqueBy(roster.map(s => ({
+        user_id: s.user_id,
+        first_name: s.first_name,
+        last_name: s.last_name,
+        email: s.email
+      })), 'user_id'));
+      setGrades(roster.filter(s => s.grade).map(s => ({
+        student_id: s.student_id,
+        course_id: s.course_id,
+        ...s.grade
+      })));
+      
+      console.log(`Loaded: ${dashboardCourses.length} courses, ${roster.length} enrollments`);
     } catch (err) {
       console.error('Failed to fetch data', err);
     } finally {
@@ -149,27 +155,28 @@ const FacultyDashboard = () => {
     }
     
     try {
-      let markedCount = 0;
-      for (const enrollment of enrolledStudents) {
-        const key = `${enrollment.student_id}-${enrollment.course_id}`;
-        const status = attendanceMarks[key] || 'present';
-        const notes = attendanceNotes[key] || '';
-        await attendanceService.create({
-          student_id: enrollment.student_id,
-          course_id: enrollment.course_id,
-          attendance_date: selectedDate,
-          status: status,
-          marked_by: facultyInfo.faculty_id,
-          notes: notes
-        });
-        markedCount++;
-      }
-      alert(`Attendance marked successfully for ${markedCount} students on ${selectedDate}!`);
+      // One request for the whole session; re-marking a date updates the existing marks
+      const result = await attendanceService.bulkMark({
+        course_id: parseInt(selectedCourse),
+        attendance_date: selectedDate,
+        marked_by: facultyInfo.faculty_id,
+        records: enrolledStudents.map(enrollment => {
+          const key = `${enrollment.student_id}-${enrollment.course_id}`;
+          return {
+            student_id: enrollment.student_id,
+            status: attendanceMarks[key] || 'present',
+            notes: attendanceNotes[key] || ''
+          };
+        })
+      });
+      const markedCount = result.created + result.updated;
+      alert(`Attendance marked successfully for ${markedCount} students on ${selectedDate}!` +
+        (result.failed ? ` (${result.failed} failed)` : ''));
       setAttendanceMarks({});
       setAttendanceNotes({});
       fetchData();
     } catch (err) {
-      alert('Failed to mark attendance: ' + err.message);
+      alert('Failed to mark attendance: ' + (err.response?.data?.error || err.message));
     }
   };
 
@@ -655,14 +662,9 @@ const FacultyDashboard = () => {
                             ? `${studentUser.first_name} ${studentUser.last_name}` 
                             : 'Unknown';
                           
-                          // Calculate attendance for this student in this course
-                          const studentAttendance = attendance.filter(
-                            a => a.student_id === enrollment.student_id && a.course_id === enrollment.course_id
-                          );
-                          const totalClasses = studentAttendance.length;
-                          const presentClasses = studentAttendance.filter(
-                            a => a.status === 'present' || a.status === 'late'
-                          ).length;
+                          // Attendance for this student in this course, from the enrollment counters
+                          const totalClasses = enrollment.classes_held || 0;
+                          const presentClasses = (enrollment.classes_attended || 0) + (enrollment.classes_late || 0);
                           const attendancePercentage = totalClasses > 0 
                             ? ((presentClasses / totalClasses) * 100).toFixed(1)
                             : 0;
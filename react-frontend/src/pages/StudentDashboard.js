@@ -1,8 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import Navbar from '../components/Navbar';
 import { useAuth } from '../context/AuthContext';
-import attendanceService from '../services/attendanceService';
-import gradeService from '../services/gradeService';
 import enrollmentService from '../services/enrollmentService';
 import studentService from '../services/studentService';
 import courseService from '../services/courseService';
@@ -52,23 +50,15 @@ const StudentDashboard = () => {
       setCourses(coursesData.courses || []);
       console.log('Courses loaded:', coursesData.courses?.length);
       
-      // Fetch attendance for this student using student_id parameter
-      const attendanceData = await attendanceService.getAll({ student_id: studentId });
-      setAttendance(attendanceData.attendance || []);
-      console.log('Attendance records:', attendanceData.attendance?.length);
-      
-      // Fetch grades for this student using student_id parameter
-      const gradesData = await gradeService.getAll({ student_id: studentId });
-      setGrades(gradesData.grades || []);
-      console.log('Grades:', gradesData.grades?.length);
-      
-      // Fetch enrollments for this student using student_id parameter
-      const enrollmentsData = await enrollmentService.getAll({ student_id: studentId });
-      setEnrollments(enrollmentsData.enrollments || []);
-      console.log('Enrollments:', enrollmentsData.enrollments?.length);
+      // Attendance summaries, grades and enrollments for this student in one call
+      const dashboard = await studentService.getDashboard(studentId);
+      setAttendance(dashboard.attendance || []);
+      setGrades(dashboard.grades || []);
+      setEnrollments(dashboard.enrollments || []);
+      console.log('Enrollments:', dashboard.enrollments?.length, 'Grades:', dashboard.grades?.length);
       
       // Calculate available courses (department courses not yet enrolled in)
-      const enrolledCourseIds = enrollmentsData.enrollments?.map(e => e.course_id) || [];
+      const enrolledCourseIds = dashboard.enrollments?.map(e => e.course_id) || [];
       const departmentCourses = coursesData.courses?.filter(c => 
         c.department_id === student.department_id && !enrolledCourseIds.includes(c.course_id)
       ) || [];
@@ -106,10 +96,14 @@ const StudentDashboard = () => {
     return course ? `${course.course_code} - ${course.course_name}` : `Course ${courseId}`;
   };
 
+  // attendance holds one summary per course; late counts as attended here
+  const countAttended = (summaries) => summaries.reduce((sum, a) => sum + a.present + a.late, 0);
+  const countHeld = (summaries) => summaries.reduce((sum, a) => sum + a.total_classes, 0);
+
   const calculateAttendancePercentage = () => {
-    if (attendance.length === 0) return 0;
-    const present = attendance.filter(a => a.status === 'present' || a.status === 'late').length;
-    return ((present / attendance.length) * 100).toFixed(2);
+    const held = countHeld(attendance);
+    if (held === 0) return 0;
+    return ((countAttended(attendance) / held) * 100).toFixed(2);
   };
 
   const calculateGPA = () => {
@@ -340,7 +334,7 @@ const StudentDashboard = () => {
             <>
               <p style={{ marginBottom: '20px', color: '#555', fontSize: '15px' }}>
                 Overall Attendance: <strong style={{ color: '#27ae60' }}>{calculateAttendancePercentage()}%</strong> | 
-                Classes Attended: <strong>{attendance.filter(a => a.status === 'present' || a.status === 'late').length}</strong> out of <strong>{attendance.length}</strong>
+                Classes Attended: <strong>{countAttended(attendance)}</strong> out of <strong>{countHeld(attendance)}</strong>
               </p>
               
               {/* Course-wise Attendance Summary */}
@@ -357,8 +351,8 @@ const StudentDashboard = () => {
                   {enrollments.map((enrollment) => {
                     const course = courses.find(c => c.course_id === enrollment.course_id);
                     const courseAttendance = attendance.filter(a => a.course_id === enrollment.course_id);
-                    const attended = courseAttendance.filter(a => a.status === 'present' || a.status === 'late').length;
-                    const total = courseAttendance.length;
+                    const attended = countAttended(courseAttendance);
+                    const total = countHeld(courseAttendance);
                     const percentage = total > 0 ? ((attended / total) * 100).toFixed(2) : 0;
                     const key = `${enrollment.student_id}-${enrollment.course_id}`;
                     
@@ -1,9 +1,12 @@
 import React, { useState, useEffect } from 'react';
 import attendanceService from '../../services/attendanceService';
 import Loading from '../../components/Loading';
+import Pagination, { PAGE_SIZE } from '../../components/Pagination';
 
 const ManageAttendance = () => {
   const [attendance, setAttendance] = useState([]);
+  const [page, setPage] = useState(1);
+  const [hasMore, setHasMore] = useState(false);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState('');
   const [showForm, setShowForm] = useState(false);
@@ -17,13 +20,19 @@ const ManageAttendance = () => {
 
   useEffect(() => {
     fetchAttendance();
-  }, []);
+  }, [page]);
 
   const fetchAttendance = async () => {
     try {
       setLoading(true);
-      const data = await attendanceService.getAll();
+      const data = await attendanceService.getAll({ page, per_page: PAGE_SIZE });
+      // Deleting the last row of a page leaves it empty; step back to the previous one
+      if (page > 1 && !(data.attendance || []).length) {
+        setPage(page - 1);
+        return;
+      }
       setAttendance(data.attendance || []);
+      setHasMore(Boolean(data.has_more));
       setError('');
     } catch (err) {
       setError('Failed to fetch attendance records');
@@ -175,6 +184,7 @@ const ManageAttendance = () => {
         </tbody>
       </table>
       {attendance.length === 0 && <p style={styles.noData}>No attendance records found</p>}
+      <Pagination page={page} hasMore={hasMore} onPageChange={setPage} />
     </div>
   );
 };
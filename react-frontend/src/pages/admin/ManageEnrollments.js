@@ -3,9 +3,12 @@ import enrollmentService from '../../services/enrollmentService';
 import studentService from '../../services/studentService';
 import courseService from '../../services/courseService';
 import Loading from '../../components/Loading';
+import Pagination, { PAGE_SIZE } from '../../components/Pagination';
 
 const ManageEnrollments = () => {
   const [enrollments, setEnrollments] = useState([]);
+  const [page, setPage] = useState(1);
+  const [hasMore, setHasMore] = useState(false);
   const [students, setStudents] = useState([]);
   const [courses, setCourses] = useState([]);
   const [loading, setLoading] = useState(true);
@@ -22,17 +25,23 @@ const ManageEnrollments = () => {
 
   useEffect(() => {
     fetchData();
-  }, []);
+  }, [page]);
 
   const fetchData = async () => {
     try {
       setLoading(true);
       const [enrollmentsData, studentsData, coursesData] = await Promise.all([
-        enrollmentService.getAll(),
+        enrollmentService.getAll({ page, per_page: PAGE_SIZE }),
         studentService.getAll(),
         courseService.getAll()
       ]);
+      // Deleting the last row of a page leaves it empty; step back to the previous one
+      if (page > 1 && !(enrollmentsData.enrollments || []).length) {
+        setPage(page - 1);
+        return;
+      }
       setEnrollments(enrollmentsData.enrollments || []);
+      setHasMore(Boolean(enrollmentsData.has_more));
       setStudents(studentsData.students || []);
       setCourses(coursesData.courses || []);
       setError('');
@@ -253,6 +262,7 @@ const ManageEnrollments = () => {
           )}
         </tbody>
       </table>
+      <Pagination page={page} hasMore={hasMore} onPageChange={setPage} />
     </div>
   );
 };
@@ -1,9 +1,12 @@
 import React, { useState, useEffect } from 'react';
 import gradeService from '../../services/gradeService';
 import Loading from '../../components/Loading';
+import Pagination, { PAGE_SIZE } from '../../components/Pagination';
 
 const ManageGrades = () => {
   const [grades, setGrades] = useState([]);
+  const [page, setPage] = useState(1);
+  const [hasMore, setHasMore] = useState(false);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState('');
   const [showForm, setShowForm] = useState(false);
@@ -18,13 +21,19 @@ const ManageGrades = () => {
 
   useEffect(() => {
     fetchGrades();
-  }, []);
+  }, [page]);
 
   const fetchGrades = async () => {
     try {
       setLoading(true);
-      const data = await gradeService.getAll();
+      const data = await gradeService.getAll({ page, per_page: PAGE_SIZE });
+      // Deleting the last row of a page leaves it empty; step back to the previous one
+      if (page > 1 && !(data.grades || []).length) {
+        setPage(page - 1);
+        return;
+      }
       setGrades(data.grades || []);
+      setHasMore(Boolean(data.has_more));
       setError('');
     } catch (err) {
       setError('Failed to fetch grades');
@@ -174,6 +183,7 @@ const ManageGrades = () => {
         </tbody>
       </table>
       {grades.length === 0 && <p style={styles.noData}>No grades found</p>}
+      <Pagination page={page} hasMore={hasMore} onPageChange={setPage} />
     </div>
   );
 };
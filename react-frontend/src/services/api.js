@@ -17,6 +17,11 @@ api.interceptors.request.use(
     if (token) {
       config.headers.Authorization = `Bearer ${token}`;
     }
+    // Read our own recent writes from the primary database, whichever server answers
+    const primaryUntil = sessionStorage.getItem('dbPrimaryUntil');
+    if (primaryUntil && parseFloat(primaryUntil) * 1000 > Date.now()) {
+      config.headers['X-DB-Primary-Until'] = primaryUntil;
+    }
     return config;
   },
   (error) => {
@@ -26,7 +31,13 @@ api.interceptors.request.use(
 
 // Handle response errors
 api.interceptors.response.use(
-  (response) => response,
+  (response) => {
+    const primaryUntil = response.headers['x-db-primary-until'];
+    if (primaryUntil) {
+      sessionStorage.setItem('dbPrimaryUntil', primaryUntil);
+    }
+    return response;
+  },
   (error) => {
     if (error.response?.status === 401) {
       localStorage.removeItem('token');
@@ -25,6 +25,12 @@ const attendanceService = {
     return response.data;
   },
 
+  // Mark attendance for a whole class session in one request
+  bulkMark: async (bulkData) => {
+    const response = await api.post('/attendance/bulk', bulkData);
+    return response.data;
+  },
+
   // Update attendance record
   update: async (student_id, course_id, attendance_date, attendanceData) => {
     const response = await api.put(`/attendance/${student_id}/${course_id}/${attendance_date}`, attendanceData);
@@ -30,6 +30,12 @@ const departmentService = {
     const response = await api.delete(`/departments/${id}`);
     return response.data;
   },
+
+  // Get student, faculty and course counts for every department
+  getAllStats: async () => {
+    const response = await api.get('/departments/stats');
+    return response.data;
+  },
 };
 
 export default departmentService;
@@ -36,6 +36,12 @@ const facultyService = {
     const response = await api.get(`/faculty/${facultyId}/courses`);
     return response.data;
   },
+
+  // Get courses, rosters, attendance counters and grades for a faculty member in one call
+  getDashboard: async (facultyId) => {
+    const response = await api.get(`/faculty/${facultyId}/dashboard`);
+    return response.data;
+  },
 };
 
 export default facultyService;
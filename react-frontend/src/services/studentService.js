@@ -30,6 +30,12 @@ const studentService = {
     const response = await api.delete(`/students/${id}`);
     return response.data;
   },
+
+  // Get profile, enrollments, grades and attendance summaries in one call
+  getDashboard: async (id) => {
+    const response = await api.get(`/students/${id}/dashboard`);
+    return response.data;
+  },
 };
 
 export default studentService;